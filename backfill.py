@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+import joblib
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from features import DUMMY_COLUMNS, encode_model_rows
+from model import MASTER_FILE, get_oof_model_file, game_folds
+from opponent_context import season_from_dates
+from predict import get_model_file
+
+PROCESSED_DATA_DIR = "processed_data"
+# Hive-partitioned predictions table: predictions/TARGET=PTS/SEASON=2024-25/part-*.parquet
+PREDICTIONS_DIR = os.path.join(PROCESSED_DATA_DIR, "predictions")
+STATE_FILE = os.path.join(PREDICTIONS_DIR, "_state.json")
+
+TARGETS = ['PTS', 'AST', 'REB', 'PRA']
+KEY_COLUMNS = ['GAME_ID', 'PLAYER_ID', 'GAME_DATE']
+# Rows per scanned batch; peak memory is bounded by this, not by the master dataset size
+BATCH_ROWS = 50_000
+
+
+def file_digest(path):
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_scorers(targets=TARGETS):
+    """
+    {target: {'full': saved model dict, 'oof': saved out-of-fold dict or None, 'digest': str}}.
+    The digest covers both files so a retrained model invalidates earlier predictions.
+    """
+    scorers = {}
+    for target in targets:
+        model_file = get_model_file(target)
+        if not os.path.exists(model_file):
+            print(f"Model {target} missing at {model_file}; skipping it.")
+            continue
+        oof_file = get_oof_model_file(target)
+        has_oof = os.path.exists(oof_file)
+        scorers[target] = {
+            'full': joblib.load(model_file),
+            'oof': joblib.load(oof_file) if has_oof else None,
+            'digest': file_digest(model_file) + (file_digest(oof_file) if has_oof else ''),
+        }
+        if not has_oof:
+            print(f"No out-of-fold models for {target} (run `python model.py --oof`); "
+                  f"historical rows are scored in-sample by the production model.")
+    return scorers
+
+
+def input_columns(scorers, available):
+    """Only the master columns the scorers need: keys, actuals, baselines and raw feature inputs."""
+    cols = list(KEY_COLUMNS)
+    for target, scorer in scorers.items():
+        cols += [target, f'{target}_5g_avg']
+        feature_lists = [scorer['full']['features']] + ([scorer['oof']['features']] if scorer['oof'] else [])
+        for feats in feature_lists:
+            for feat in feats:
+                if feat in available:
+                    cols.append(feat)
+                else:
+                    cols += [d for d in DUMMY_COLUMNS if feat.startswith(f'{d}_') and d in available]
+    return [c for c in dict.fromkeys(cols) if c in available]
+
+
+def score_chunk(df, target, scorer):
+    """Long-format predictions for one target over one chunk of master rows."""
+    full = scorer['full']
+    preds = full['model'].predict(encode_model_rows(df, full['features'])).astype(float)
+    source = np.full(len(df), 'full', dtype=object)
+
+    oof = scorer['oof']
+    if oof is not None:
+        # Rows the fold models were trained around get the model that never saw their game
+        covered = np.flatnonzero((df['GAME_DATE'] <= pd.Timestamp(oof['max_game_date'])).to_numpy())
+        if len(covered):
+            X_oof = encode_model_rows(df.iloc[covered], oof['features'])
+            folds = game_folds(df['GAME_ID'].iloc[covered], oof['n_folds'])
+            for k, fold_model in enumerate(oof['models']):
+                in_fold = folds == k
+                if in_fold.any():
+                    preds[covered[in_fold]] = fold_model.predict(X_oof[in_fold]).astype(float)
+            source[covered] = 'oof'
+
+    baseline_col = f'{target}_5g_avg'
+    return pd.DataFrame({
+        'GAME_ID': df['GAME_ID'].astype(str).values,
+        'PLAYER_ID': df['PLAYER_ID'].astype(np.int64).values,
+        'GAME_DATE': df['GAME_DATE'].values,
+        'SEASON': season_from_dates(df['GAME_DATE']).values,
+        'PRED': preds,
+        'ACTUAL': pd.to_numeric(df[target], errors='coerce').astype(float).values,
+        'BASELINE': df[baseline_col].astype(float).values if baseline_col in df.columns else np.nan,
+        'MODEL': source,
+    })
+
+
+def write_partitions(pred_df, target, root, part_name):
+    for season, part in pred_df.groupby('SEASON', sort=False):
+        part_dir = os.path.join(root, f"TARGET={target}", f"SEASON={season}")
+        os.makedirs(part_dir, exist_ok=True)
+        # Partition keys live in the directory names, not in the files
+        table = pa.Table.from_pandas(part.drop(columns=['SEASON']), preserve_index=False)
+        pq.write_table(table, os.path.join(part_dir, f"{part_name}.parquet"))
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return None
+    with open(STATE_FILE) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    """Write _state.json via a temp file, so a crash never leaves it half written."""
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def drop_unfinished_run(run_id):
+    """Delete the part files a run published before it crashed; its games are still past the watermark."""
+    removed = 0
+    for dirpath, _, filenames in os.walk(PREDICTIONS_DIR):
+        for name in filenames:
+            if name.startswith(f"part-{run_id}-"):
+                os.remove(os.path.join(dirpath, name))
+                removed += 1
+    print(f"Dropped {removed} part files of the unfinished run {run_id}.")
+
+
+def existing_keys_on(date):
+    """(GAME_ID, PLAYER_ID) pairs already stored for `date`, to dedupe games landing on the watermark day."""
+    dataset = ds.dataset(PREDICTIONS_DIR, format='parquet', partitioning='hive', exclude_invalid_files=True)
+    table = dataset.to_table(columns=['GAME_ID', 'PLAYER_ID'], filter=ds.field('GAME_DATE') == pa.scalar(pd.Timestamp(date)))
+    return set(zip(table.column('GAME_ID').to_pylist(), table.column('PLAYER_ID').to_pylist()))
+
+
+def row_group_has_dates_from(parquet_file, i, watermark):
+    """False only when the row group's GAME_DATE statistics prove every row predates `watermark`."""
+    if not watermark:
+        return True
+    row_group = parquet_file.metadata.row_group(i)
+    for j in range(row_group.num_columns):
+        column = row_group.column(j)
+        if column.path_in_schema == 'GAME_DATE' and column.statistics is not None and column.statistics.has_min_max:
+            return pd.Timestamp(column.statistics.max) >= pd.Timestamp(watermark)
+    return True
+
+
+def run_backfill(full_rebuild=False, batch_rows=BATCH_ROWS, targets=TARGETS):
+    """
+    Score every master row with the saved models and append the results to the
+    partitioned predictions table. Incremental by default: only games after the
+    stored watermark are scored, unless the models changed (or full_rebuild=True),
+    in which case the table is rebuilt. The master dataset is streamed in
+    `batch_rows`-row batches with only the needed columns, so memory stays flat as
+    the dataset grows.
+    """
+    if not os.path.exists(MASTER_FILE):
+        print(f"File {MASTER_FILE} not found. Run features.py first.")
+        return None
+    scorers = load_scorers(targets)
+    if not scorers:
+        print("No models to backfill. Run model.py first.")
+        return None
+    digests = {t: s['digest'] for t, s in scorers.items()}
+
+    state = load_state()
+    if state is not None and not full_rebuild and state.get('models') != digests:
+        print("Saved models changed since the last backfill; rebuilding the predictions table.")
+        full_rebuild = True
+    if full_rebuild or state is None:
+        shutil.rmtree(PREDICTIONS_DIR, ignore_errors=True)
+        state = None
+    os.makedirs(PREDICTIONS_DIR, exist_ok=True)
+
+    # Leftovers of an interrupted run never reached the table; drop them
+    for name in os.listdir(PREDICTIONS_DIR):
+        if name.startswith('_staging_'):
+            shutil.rmtree(os.path.join(PREDICTIONS_DIR, name), ignore_errors=True)
+    # A run that crashed while publishing left some of its files under the old watermark
+    if state is not None and state.get('pending_run'):
+        drop_unfinished_run(state['pending_run'])
+
+    watermark = state['watermark'] if state else None
+    seen_on_watermark = existing_keys_on(watermark) if watermark else set()
+
+    master = pq.ParquetFile(MASTER_FILE)
+    columns = input_columns(scorers, set(master.schema_arrow.names))
+    row_groups = [i for i in range(master.num_row_groups) if row_group_has_dates_from(master, i, watermark)]
+
+    run_id = time.strftime('%Y%m%dT%H%M%S')
+    staging = os.path.join(PREDICTIONS_DIR, f"_staging_{run_id}")
+    start = time.time()
+    n_rows, new_max = 0, None
+    # iter_batches decodes one row group at a time, unlike a dataset scan that buffers ahead
+    for chunk_idx, batch in enumerate(master.iter_batches(batch_size=batch_rows, row_groups=row_groups, columns=columns)):
+        df = batch.to_pandas()
+        df['GAME_DATE'] = pd.to_datetime(df['GAME_DATE'])
+        if watermark:
+            df = df[df['GAME_DATE'] >= pd.Timestamp(watermark)]
+            on_mark = (df['GAME_DATE'] == pd.Timestamp(watermark)).to_numpy()
+            seen = np.array([(str(g), int(p)) in seen_on_watermark
+                             for g, p in zip(df['GAME_ID'].values, df['PLAYER_ID'].values)]) if on_mark.any() else False
+            df = df[~(on_mark & seen)]
+        if df.empty:
+            continue
+
+        for target, scorer in scorers.items():
+            write_partitions(score_chunk(df, target, scorer), target, staging, f"part-{run_id}-{chunk_idx:05d}")
+        n_rows += len(df)
+        batch_max = df['GAME_DATE'].max()
+        new_max = batch_max if new_max is None else max(new_max, batch_max)
+        print(f"  Scored chunk {chunk_idx}: {n_rows} rows so far ({time.time() - start:.1f}s)")
+
+    # Publish the run: record it as pending, move the staged part files into the table,
+    # then advance the watermark. A crash in between is undone by the next run.
+    if os.path.isdir(staging):
+        save_state({'models': digests, 'watermark': watermark, 'pending_run': run_id})
+        for dirpath, _, filenames in os.walk(staging):
+            rel = os.path.relpath(dirpath, staging)
+            for name in filenames:
+                os.makedirs(os.path.join(PREDICTIONS_DIR, rel), exist_ok=True)
+                os.replace(os.path.join(dirpath, name), os.path.join(PREDICTIONS_DIR, rel, name))
+        shutil.rmtree(staging, ignore_errors=True)
+
+    if new_max is not None:
+        watermark = str(max(new_max, pd.Timestamp(watermark)).date() if watermark else new_max.date())
+    save_state({'models': digests, 'watermark': watermark})
+
+    print(f"Backfilled {n_rows} new player-games x {len(scorers)} targets in {time.time() - start:.1f}s "
+          f"-> {PREDICTIONS_DIR} (watermark {watermark})")
+    return n_rows
+
+
+def load_predictions(target=None, season=None):
+    """Read the predictions table (optionally one target/season) back as a DataFrame."""
+    filters = []
+    if target:
+        filters.append(('TARGET', '=', target))
+    if season:
+        filters.append(('SEASON', '=', season))
+    dataset = ds.dataset(PREDICTIONS_DIR, format='parquet', partitioning='hive', exclude_invalid_files=True)
+    expr = None
+    for col, _, value in filters:
+        cond = ds.field(col) == value
+        expr = cond if expr is None else expr & cond
+    return dataset.to_table(filter=expr).to_pandas()
+
+
+def summarize(target=None):
+    """MAE of the models vs the 5-game baseline, split by in-sample vs out-of-fold rows."""
+    df = load_predictions(target)
+    if df.empty:
+        print("No predictions stored yet.")
+        return
+    df = df.dropna(subset=['ACTUAL', 'BASELINE'])
+    df['MODEL_ERR'] = (df['PRED'] - df['ACTUAL']).abs()
+    df['BASE_ERR'] = (df['BASELINE'] - df['ACTUAL']).abs()
+    summary = df.groupby(['TARGET', 'MODEL']).agg(
+        ROWS=('PRED', 'size'), MODEL_MAE=('MODEL_ERR', 'mean'), BASELINE_MAE=('BASE_ERR', 'mean')
+    ).round(3)
+    print(summary.to_string())
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    if '--summary' in args:
+        summarize()
+    else:
+        batch_arg = [int(a.split('=')[1]) for a in args if a.startswith('--batch-rows=')]
+        run_backfill(full_rebuild='--full' in args, batch_rows=batch_arg[0] if batch_arg else BATCH_ROWS)
@@ -0,0 +1,71 @@
+"""
+Per-player feature engineering: the pandas loop in features.py (compute_features
+on every log file, then concat) vs the polars lazy plan in features_polars.py.
+
+Both backends run over the same raw store and their frames must be identical
+(values, dtypes and column order) before any timing is reported. "real" is the
+repo's own data/; numeric scales are synthetic leagues generated into the
+run_benchmarks scratch store.
+
+Usage (from the repo root):
+    python benchmarks/feature_backends.py                    # real, 10x
+    python benchmarks/feature_backends.py --scales=real,1,5 --repeats=3
+"""
+import os
+import sys
+import glob
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+
+def run_scale(label, store, repeats):
+    import features_polars
+
+    os.chdir(store)
+    files = sorted(glob.glob(os.path.join("data", "*_logs.parquet")))
+    if not files:
+        print(f"[{label}] no raw logs in {store}/data; skipping.")
+        return None
+    best_pandas, best_polars = None, None
+    for _ in range(repeats):
+        # Raises if the frames differ in any value, dtype or column
+        pandas_s, polars_s = features_polars.check_equivalence(files)
+        best_pandas = pandas_s if best_pandas is None else min(best_pandas, pandas_s)
+        best_polars = polars_s if best_polars is None else min(best_polars, polars_s)
+    return {'label': label, 'files': len(files), 'pandas_s': best_pandas, 'polars_s': best_polars}
+
+
+def main():
+    import run_benchmarks
+    import polars as pl
+
+    args = sys.argv[1:]
+    scales, repeats, workdir = ['real', '10'], 1, run_benchmarks.DEFAULT_WORKDIR
+    for arg in args:
+        if arg.startswith('--scales='):
+            scales = arg.split('=')[1].split(',')
+        elif arg.startswith('--repeats='):
+            repeats = int(arg.split('=')[1])
+        elif arg.startswith('--workdir='):
+            workdir = arg.split('=')[1]
+
+    results = []
+    for scale in scales:
+        store = REPO_ROOT if scale == 'real' else run_benchmarks.prepare_workdir(workdir, float(scale))
+        label = scale if scale == 'real' else f"{float(scale):g}x"
+        print(f"\n[{label}] {store}")
+        result = run_scale(label, store, repeats)
+        if result is not None:
+            results.append(result)
+
+    print(f"\nPer-player features, best of {repeats} (polars thread pool: {pl.thread_pool_size()}):")
+    print(f"  {'scale':>6}  {'files':>6}  {'pandas':>9}  {'polars':>9}  {'speedup':>7}")
+    for r in results:
+        print(f"  {r['label']:>6}  {r['files']:>6}  {r['pandas_s']:>8.2f}s  {r['polars_s']:>8.2f}s  "
+              f"{r['pandas_s'] / r['polars_s']:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Master dataset layout: pandas' default to_parquet (snappy, one row group) vs the
+layout parquet_layout.py writes (zstd, dictionary pages for low-cardinality columns,
+ROW_GROUP_ROWS-row groups sorted by PLAYER_ID and GAME_DATE within each season).
+A plain (PLAYER_ID, GAME_DATE) sort without the season clustering is included to
+show why the clustering is there: its row groups each span every season, so a
+date-filtered read can't skip any of them.
+
+For each layout: file size, write time, full read time, and filtered reads (one
+player, the last two weeks, one player's last two weeks) with the number of row
+groups their statistics let pyarrow skip. Every filtered read is checked against
+the same filter applied in pandas. "real" is the repo's processed_data/; numeric
+scales are synthetic leagues feature-engineered in the run_benchmarks scratch store.
+
+Usage (from the repo root):
+    python benchmarks/master_layout.py                          # real, 10x
+    python benchmarks/master_layout.py --scales=real --row-groups=4096,8192,32768
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+N_PLAYERS = 5
+RECENT_DAYS = 14
+
+
+def write_layout(name, df, path):
+    import parquet_layout
+    start = time.perf_counter()
+    if name == 'default':
+        df.to_parquet(path, index=False)
+    elif name == 'player sorted':
+        parquet_layout.write_parquet(df, path, cluster_by_season=False, sidecar=False)
+    else:
+        parquet_layout.write_parquet(df, path, sidecar=False)
+    return time.perf_counter() - start
+
+
+def groups_touched(path, player_ids=None, start_date=None):
+    """Row groups whose PLAYER_ID / GAME_DATE statistics don't rule out the filter."""
+    import pandas as pd
+    import pyarrow.parquet as pq
+    meta = pq.ParquetFile(path).metadata
+    names = [meta.schema.column(j).name for j in range(meta.num_columns)]
+    touched = 0
+    for i in range(meta.num_row_groups):
+        stats = {name: meta.row_group(i).column(j).statistics for j, name in enumerate(names)}
+        keep = True
+        if player_ids is not None and stats['PLAYER_ID'] is not None and stats['PLAYER_ID'].has_min_max:
+            lo, hi = stats['PLAYER_ID'].min, stats['PLAYER_ID'].max
+            keep &= any(lo <= p <= hi for p in player_ids)
+        if start_date is not None and stats['GAME_DATE'] is not None and stats['GAME_DATE'].has_min_max:
+            keep &= pd.Timestamp(stats['GAME_DATE'].max) >= start_date
+        touched += keep
+    return touched, meta.num_row_groups
+
+
+def best_of(func, repeats):
+    best, result = None, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_layout(name, tag, df, path, queries, repeats):
+    import pandas as pd
+    import parquet_layout
+
+    write_s = write_layout(name, df, path)
+    full_s, _ = best_of(lambda: pd.read_parquet(path), repeats)
+    result = {'layout': tag, 'size_mb': os.path.getsize(path) / 1e6, 'write_s': write_s, 'full_s': full_s}
+    for label, kwargs, expected in queries:
+        seconds, out = best_of(lambda: parquet_layout.read_parquet(path, **kwargs), repeats)
+        if len(out) != expected:
+            raise AssertionError(f"{tag} / {label}: read {len(out)} rows, expected {expected}")
+        touched, total = groups_touched(path, kwargs.get('player_ids'), kwargs.get('start_date'))
+        result[label] = (seconds, touched, total)
+    return result
+
+
+def run_scale(label, store, layouts, row_groups, repeats):
+    import numpy as np
+    import pandas as pd
+    import parquet_layout
+
+    master = os.path.join(store, "processed_data", "master_dataset.parquet")
+    df = pd.read_parquet(master)
+    rng = np.random.default_rng(0)
+    players = [int(p) for p in rng.choice(df['PLAYER_ID'].unique(), size=N_PLAYERS, replace=False)]
+    recent = df['GAME_DATE'].max() - pd.Timedelta(days=RECENT_DAYS)
+    queries = [
+        ('player', {'player_ids': players[:1]}, int((df['PLAYER_ID'] == players[0]).sum())),
+        (f'{N_PLAYERS} players', {'player_ids': players}, int(df['PLAYER_ID'].isin(players).sum())),
+        (f'last {RECENT_DAYS}d', {'start_date': recent}, int((df['GAME_DATE'] >= recent).sum())),
+        (f'player, last {RECENT_DAYS}d', {'player_ids': players[:1], 'start_date': recent},
+         int(((df['PLAYER_ID'] == players[0]) & (df['GAME_DATE'] >= recent)).sum())),
+    ]
+    print(f"\n[{label}] {len(df)} rows x {df.shape[1]} columns from {master}")
+
+    tmp = tempfile.mkdtemp(prefix="parquet_layout_")
+    results = []
+    shipped = parquet_layout.ROW_GROUP_ROWS
+    try:
+        for name in layouts:
+            sizes = row_groups if name != 'default' else [None]
+            for size in sizes:
+                parquet_layout.ROW_GROUP_ROWS = size or shipped
+                tag = name if size is None else f"{name} ({size})"
+                results.append(run_layout(name, tag, df, os.path.join(tmp, "master.parquet"), queries, repeats))
+    finally:
+        parquet_layout.ROW_GROUP_ROWS = shipped
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"  {'layout':<28} {'size':>8} {'write':>7} {'full':>7}" +
+          "".join(f"  {q[0]:>22}" for q in queries))
+    for r in results:
+        cells = "".join(f"  {r[q[0]][0] * 1000:7.1f}ms {r[q[0]][1]:>4}/{r[q[0]][2]:<4}grp" for q in queries)
+        print(f"  {r['layout']:<28} {r['size_mb']:6.2f}MB {r['write_s']:6.2f}s {r['full_s']:6.2f}s{cells}")
+    return results
+
+
+def main():
+    import run_benchmarks
+    import parquet_layout
+    from memmap_training import ensure_master
+
+    args = sys.argv[1:]
+    scales, repeats, workdir = ['real', '10'], 3, run_benchmarks.DEFAULT_WORKDIR
+    layouts = ['default', 'player sorted', 'season/player sorted']
+    row_groups = [parquet_layout.ROW_GROUP_ROWS]
+    for arg in args:
+        if arg.startswith('--scales='):
+            scales = arg.split('=')[1].split(',')
+        elif arg.startswith('--repeats='):
+            repeats = int(arg.split('=')[1])
+        elif arg.startswith('--workdir='):
+            workdir = arg.split('=')[1]
+        elif arg.startswith('--row-groups='):
+            row_groups = [int(v) for v in arg.split('=')[1].split(',')]
+
+    for scale in scales:
+        if scale == 'real':
+            store, label = REPO_ROOT, 'real'
+        else:
+            store, label = run_benchmarks.prepare_workdir(workdir, float(scale)), f"{float(scale):g}x"
+            ensure_master(store, verbose='--verbose' in args)
+        if not os.path.exists(os.path.join(store, "processed_data", "master_dataset.parquet")):
+            print(f"[{label}] no master dataset in {store}; run features.py first.")
+            continue
+        run_scale(label, store, layouts, row_groups, repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Peak memory of parallel training workers: rebuilding the training frame from
+parquet in every worker vs mapping the shared .npy matrix (training_matrix.py).
+
+Both modes fit the same PTS fold models in N spawned workers against a synthetic
+league (20x by default, generated and feature-engineered in the run_benchmarks
+scratch store on first use). Reported per mode: each worker's peak RSS and PSS
+(proportional set size, which splits shared page-cache pages between the
+processes mapping them) and their sums.
+
+Usage (from the repo root):
+    python benchmarks/memmap_training.py                      # 20x, 2 workers
+    python benchmarks/memmap_training.py --scale=5 --workers=4
+"""
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+TARGET = 'PTS'
+
+
+def parquet_job(job):
+    """The status quo: every worker reads the master dataset and rebuilds the encoded frame."""
+    import numpy as np
+    import pandas as pd
+    from xgboost import XGBRegressor
+    import model as mdl
+    from training_matrix import memory_usage_mb, training_columns
+
+    # Only the columns the builder reads too, so the modes differ in sharing, not in input
+    df = pd.read_parquet(mdl.MASTER_FILE, columns=training_columns([job['target']]))
+    X, y, _ = mdl.prep_for_modeling(df, target_col=job['target'])
+    folds = mdl.game_folds(df.loc[X.index, 'GAME_ID'])
+    del df
+    train_rows = folds != job['fold']
+    xgb_model = XGBRegressor(**dict(mdl.XGB_PARAMS, n_jobs=job['n_jobs']))
+    xgb_model.fit(X[train_rows], y[train_rows])
+    mae = float(np.abs(xgb_model.predict(X[~train_rows]) - y[~train_rows]).mean())
+    peak, pss = memory_usage_mb()
+    return {'fold': job['fold'], 'mae': mae, 'peak_rss_mb': peak, 'pss_mb': pss}
+
+
+def memmap_job(job):
+    from training_matrix import train_job
+    result = train_job(job)
+    result.pop('model')
+    return result
+
+
+def ensure_master(store, verbose=False):
+    import run_benchmarks
+    if not os.path.exists(os.path.join(store, "processed_data", "master_dataset.parquet")):
+        for stage in ['ingest_team_games', 'process_all_files']:
+            print(f"  Running {stage} in {store}...")
+            run_benchmarks.spawn_stage(stage, store, verbose)
+
+
+def build_job(target):
+    """Build the shared matrix in a child, so the parent's peak RSS doesn't crowd the workers."""
+    import training_matrix
+    start = time.perf_counter()
+    training_matrix.build_training_matrices([target], force=True)
+    return time.perf_counter() - start, training_matrix.memory_usage_mb()[0]
+
+
+def run_mode(name, func, n_workers):
+    """Per-worker results, or None when a worker was killed (out of memory, on a small box)."""
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+    jobs = [{'target': TARGET, 'fold': k, 'n_jobs': threads} for k in range(n_workers)]
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(n_workers, mp_context=mp.get_context('spawn')) as pool:
+            results = list(pool.map(func, jobs))
+    except BrokenProcessPool:
+        print(f"\n[{name}] a worker was killed after {time.perf_counter() - start:.1f}s (out of memory?)")
+        return None
+    elapsed = time.perf_counter() - start
+    print(f"\n[{name}] {n_workers} workers in {elapsed:.1f}s")
+    for r in results:
+        print(f"  fold {r['fold']}: MAE {r['mae']:.3f}  peak RSS {r['peak_rss_mb']:7.0f} MB  PSS {r['pss_mb'] or 0:7.0f} MB")
+    total_rss = sum(r['peak_rss_mb'] for r in results)
+    total_pss = sum(r['pss_mb'] or 0 for r in results)
+    print(f"  total: peak RSS {total_rss:.0f} MB, PSS {total_pss:.0f} MB")
+    return results
+
+
+def main():
+    import run_benchmarks
+
+    args = sys.argv[1:]
+    scale, n_workers, workdir = 20.0, 2, run_benchmarks.DEFAULT_WORKDIR
+    for arg in args:
+        if arg.startswith('--scale='):
+            scale = float(arg.split('=')[1])
+        elif arg.startswith('--workers='):
+            n_workers = int(arg.split('=')[1])
+        elif arg.startswith('--workdir='):
+            workdir = arg.split('=')[1]
+
+    store = run_benchmarks.prepare_workdir(workdir, scale)
+    ensure_master(store, verbose='--verbose' in args)
+    os.chdir(store)
+
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(1, mp_context=mp.get_context('spawn')) as pool:
+        seconds, peak = pool.submit(build_job, TARGET).result()
+    print(f"Built shared matrix once in {seconds:.1f}s (builder peak RSS {peak:.0f} MB)")
+
+    parquet = run_mode("parquet per worker", parquet_job, n_workers)
+    mapped = run_mode("shared memmap", memmap_job, n_workers)
+    if parquet is None or mapped is None:
+        print(f"\nNot every mode fit in memory at {scale:g}x with {n_workers} workers.")
+        return
+
+    for a, b in zip(parquet, mapped):
+        if abs(a['mae'] - b['mae']) > 1e-3:
+            print(f"WARNING: fold {a['fold']} MAE differs between modes ({a['mae']} vs {b['mae']})")
+    saved = sum(r['peak_rss_mb'] for r in parquet) - sum(r['peak_rss_mb'] for r in mapped)
+    print(f"\nShared matrix saves {saved:.0f} MB of summed worker peak RSS at {scale:g}x.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark for the vectorized over/under engine in prop_probabilities.py.
+
+Simulates a full slate (every player x samples x PTS/REB/AST in one tensor) and
+prices a line for every target. Uses the fitted residual model when present,
+otherwise a synthetic correlated residual set so the benchmark runs anywhere.
+
+Usage (from the repo root):
+    python benchmarks/monte_carlo.py
+    python benchmarks/monte_carlo.py --players=500 --samples=10000 --budget-s=5
+"""
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import numpy as np
+import pandas as pd
+import prop_probabilities as pp
+
+
+def synthetic_residual_model(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    corr = np.array([[1.0, 0.35, 0.2], [0.35, 1.0, 0.25], [0.2, 0.25, 1.0]])
+    z = rng.multivariate_normal(np.zeros(3), corr, size=n).astype(np.float32)
+    return {'stats': pp.SIM_STATS, 'z': z, 'corr': corr}
+
+
+def synthetic_slate(n_players, seed=0):
+    rng = np.random.default_rng(seed)
+    pts = rng.uniform(4, 32, n_players)
+    reb = rng.uniform(1, 12, n_players)
+    ast = rng.uniform(0.5, 10, n_players)
+    proj = pd.DataFrame({
+        'PLAYER_NAME': [f"Player {i}" for i in range(n_players)],
+        'PREDICTED_PTS': pts.round(1),
+        'PREDICTED_REB': reb.round(1),
+        'PREDICTED_AST': ast.round(1),
+        'PREDICTED_PRA': (pts + reb + ast).round(1),
+    })
+    lines = pd.DataFrame({'PLAYER_NAME': proj['PLAYER_NAME']})
+    for t in pp.LINE_TARGETS:
+        lines[f'LINE_{t}'] = np.floor(proj[f'PREDICTED_{t}']) + 0.5
+    return proj, lines
+
+
+def main():
+    n_players, n_samples, budget_s = 500, 10000, 5.0
+    for arg in sys.argv[1:]:
+        if arg.startswith('--players='):
+            n_players = int(arg.split('=')[1])
+        elif arg.startswith('--samples='):
+            n_samples = int(arg.split('=')[1])
+        elif arg.startswith('--budget-s='):
+            budget_s = float(arg.split('=')[1])
+
+    residual_model = pp.load_residual_model()
+    source = pp.RESIDUAL_MODEL_FILE
+    if residual_model is None:
+        residual_model = synthetic_residual_model()
+        source = "synthetic residuals"
+    proj, lines = synthetic_slate(n_players)
+
+    print(f"Slate: {n_players} players x {n_samples} samples x {len(pp.SIM_STATS)} stats ({source})")
+
+    start = time.perf_counter()
+    draws = pp.simulate_slate(proj[[f'PREDICTED_{s}' for s in pp.SIM_STATS]].to_numpy(), residual_model['z'], n_samples=n_samples)
+    sim_s = time.perf_counter() - start
+    print(f"  simulate_slate:     {sim_s:.3f} s  (tensor {draws.shape}, {draws.nbytes / 1e6:.0f} MB)")
+    del draws
+
+    start = time.perf_counter()
+    priced = pp.attach_over_under(proj, lines, residual_model, n_samples=n_samples)
+    total_s = time.perf_counter() - start
+    draws_per_s = n_players * n_samples * len(pp.SIM_STATS) / total_s
+    print(f"  attach_over_under:  {total_s:.3f} s  ({draws_per_s / 1e6:.1f} M stat draws/s)")
+
+    # Lines sit at floor(pred) + 0.5, so the average over probability should be close to a coin flip
+    print(f"  mean P_OVER_PTS at floor(pred)+0.5 lines: {priced['P_OVER_PTS'].mean():.3f}")
+
+    if total_s > budget_s:
+        print(f"FAIL: full slate took {total_s:.2f} s (budget {budget_s:.1f} s)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
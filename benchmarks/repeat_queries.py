@@ -0,0 +1,88 @@
+"""
+Slate prep asks predict.py about the same players over and over. This times
+predict_player_points for a handful of players against a fixed opponent: the
+first (uncached) pass, a repeat in the same process (in-memory LRU) and a
+repeat from a fresh cache object (what a new `python predict.py` run sees, served
+from the sqlite file). Cached and uncached output must match before any timing is
+reported.
+
+The cache is written to a scratch file, never the repo's processed_data/. The
+first pass includes the live fetch, so without network access it also includes
+the retries before the local logs are used.
+
+Usage (from the repo root):
+    python benchmarks/repeat_queries.py
+    python benchmarks/repeat_queries.py --players="LeBron James,Jayson Tatum" --opponent=MIA
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import tempfile
+import contextlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_PLAYERS = ['LeBron James', 'Stephen Curry', 'Giannis Antetokounmpo', 'Jayson Tatum', 'Anthony Edwards']
+
+
+def timed_pass(players, opponent, target):
+    """Seconds per player and the printed output of each predict_player_points call."""
+    import predict
+    seconds, outputs = [], []
+    for player in players:
+        buffer = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(buffer):
+            predict.predict_player_points(player, opponent, target=target)
+        seconds.append(time.perf_counter() - start)
+        outputs.append(buffer.getvalue())
+    return seconds, outputs
+
+
+def prediction_block(output):
+    """The feature dump and prediction box, without the progress lines around them."""
+    return output[output.index("[DEBUG] Final features"):] if "[DEBUG] Final features" in output else output
+
+
+def main():
+    import prediction_cache
+
+    args = sys.argv[1:]
+    players, opponent, target = DEFAULT_PLAYERS, 'BOS', 'PTS'
+    for arg in args:
+        if arg.startswith('--players='):
+            players = [p.strip() for p in arg.split('=', 1)[1].split(',')]
+        elif arg.startswith('--opponent='):
+            opponent = arg.split('=')[1]
+        elif arg.startswith('--target='):
+            target = arg.split('=')[1].upper()
+
+    os.chdir(REPO_ROOT)
+    scratch = tempfile.mkdtemp(prefix="prediction_cache_")
+    path = os.path.join(scratch, "prediction_cache.sqlite")
+    try:
+        prediction_cache._cache = prediction_cache.PredictionCache(path=path)
+        cold, cold_out = timed_pass(players, opponent, target)
+        memory, memory_out = timed_pass(players, opponent, target)
+        prediction_cache._cache = prediction_cache.PredictionCache(path=path)
+        disk, disk_out = timed_pass(players, opponent, target)
+
+        for player, a, b, c in zip(players, cold_out, memory_out, disk_out):
+            if not prediction_block(a) == prediction_block(b) == prediction_block(c):
+                raise AssertionError(f"Cached prediction for {player} differs from the computed one")
+
+        print(f"\npredict_player_points for {len(players)} players vs {opponent} ({target}):")
+        print(f"  {'pass':<22} {'total':>8} {'per player':>11}")
+        for label, seconds in [('uncached', cold), ('repeat (memory)', memory), ('new process (disk)', disk)]:
+            print(f"  {label:<22} {sum(seconds):>7.2f}s {1000 * sum(seconds) / len(seconds):>9.1f}ms")
+        stats = prediction_cache._cache.stats()
+        print(f"  Cache: {stats['entries']} entries, {prediction_cache.format_stats(stats['total'])}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
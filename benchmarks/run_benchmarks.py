@@ -0,0 +1,332 @@
+"""
+Scaling benchmark harness for the player pipeline.
+
+For every requested scale (1x = today's ~525 players over 4 seasons) a synthetic
+league is generated with synthetic_league.py into a scratch directory laid out like
+the repo (data/, processed_data/). Each stage then runs in its own fresh interpreter
+with that directory as cwd, so its peak RSS is measured in isolation:
+
+    process_all_files -> prep_for_modeling -> train_and_evaluate
+    -> load_latest_features -> prepare_and_run_projections -> backfill_predictions
+
+Results are compared against benchmarks/baseline.json; a stage whose throughput
+drops, or whose peak memory grows, by more than --tolerance fails the run, as does
+a stage that stops completing (e.g. is OOM-killed). A failed stage is recorded
+with the reason and the stages after it at that scale are skipped.
+
+Usage (from the repo root):
+    python benchmarks/run_benchmarks.py                      # 1x,5x,20x
+    python benchmarks/run_benchmarks.py --scales=1,5 --tolerance=0.3
+    python benchmarks/run_benchmarks.py --scales=1 --save-baseline
+"""
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), "hackalytics_bench")
+
+STAGES = [
+    'process_all_files',
+    'prep_for_modeling',
+    'train_and_evaluate',
+    'load_latest_features',
+    'prepare_and_run_projections',
+    'backfill_predictions',
+]
+# Run before a stage but not recorded: team game logs (from the synthetic league's
+# local endpoint files) feed the as-of opponent join, and prepare_projections needs
+# every target's model
+SETUP_STAGES = {
+    'process_all_files': 'ingest_team_games',
+    'prepare_and_run_projections': 'train_remaining_models',
+    'backfill_predictions': 'train_remaining_models',
+}
+
+# Files copied from the real store so opponent context behaves like production
+SHARED_ARTIFACTS = [
+    os.path.join("processed_data", "team_clusters.parquet"),
+    os.path.join("processed_data", "team_scaler.joblib"),
+    os.path.join("processed_data", "team_kmeans.joblib"),
+]
+
+LATEST_FEATURES_PLAYERS = 50
+RESULT_PREFIX = "BENCH_RESULT "
+
+
+# ---------------------------------------------------------------------------
+# Child side: run one stage inside the scratch store and report JSON
+# ---------------------------------------------------------------------------
+def synthetic_roster():
+    """{player_id: name} recovered from the generated file names."""
+    roster = {}
+    for f in os.listdir("data"):
+        if f.endswith('_logs.parquet'):
+            parts = f[:-len('_logs.parquet')].rsplit('_', 1)
+            roster[int(parts[1])] = parts[0].replace('_', ' ')
+    return roster
+
+
+def master_rows():
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(os.path.join("processed_data", "master_dataset.parquet")).metadata.num_rows
+
+
+def peak_rss_mb():
+    """
+    This process's peak RSS. VmHWM is preferred: ru_maxrss survives exec on Linux, so a
+    child spawned after the parent generated a large league would inherit its peak.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is reported in KB on Linux (bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_child_stage(stage):
+    sys.path.insert(0, REPO_ROOT)
+
+    if stage == 'ingest_team_games':
+        import team_ingestion
+        start = time.perf_counter()
+        df = team_ingestion.run_team_game_log_ingestion(team_ingestion.SEASONS)
+        elapsed = time.perf_counter() - start
+        rows = 0 if df is None else len(df)
+
+    elif stage == 'process_all_files':
+        import features
+        start = time.perf_counter()
+        features.process_all_files()
+        elapsed = time.perf_counter() - start
+        rows = master_rows()
+
+    elif stage == 'prep_for_modeling':
+        import model
+        df = model.load_data()
+        start = time.perf_counter()
+        model.prep_for_modeling(df, target_col='PTS')
+        elapsed = time.perf_counter() - start
+        rows = len(df)
+
+    elif stage == 'train_and_evaluate':
+        import model
+        start = time.perf_counter()
+        model.train_and_evaluate(target='PTS')
+        elapsed = time.perf_counter() - start
+        rows = master_rows()
+
+    elif stage == 'train_remaining_models':
+        import model
+        start = time.perf_counter()
+        for target in ['AST', 'REB', 'PRA']:
+            model.train_and_evaluate(target=target)
+        elapsed = time.perf_counter() - start
+        rows = master_rows()
+
+    elif stage == 'load_latest_features':
+        import joblib
+        import predict
+        # Never hit the live API from a benchmark
+        predict.fetch_live_player_logs = lambda *args, **kwargs: None
+        expected = joblib.load(predict.get_model_file('PTS'))['features']
+        player_ids = sorted(synthetic_roster())[:LATEST_FEATURES_PLAYERS]
+        start = time.perf_counter()
+        for pid in player_ids:
+            predict.load_latest_features(pid, next_opponent='BOS', expected_features=expected)
+        elapsed = time.perf_counter() - start
+        rows = len(player_ids)
+
+    elif stage == 'prepare_and_run_projections':
+        import prepare_projections
+        roster = synthetic_roster()
+        prepare_projections.get_active_rotational_players = lambda: roster
+        start = time.perf_counter()
+        prepare_projections.prepare_and_run_projections()
+        elapsed = time.perf_counter() - start
+        rows = len(roster)
+
+    elif stage == 'backfill_predictions':
+        import backfill
+        start = time.perf_counter()
+        backfill.run_backfill(full_rebuild=True)
+        elapsed = time.perf_counter() - start
+        rows = master_rows()
+
+    else:
+        raise ValueError(f"Unknown stage {stage}")
+
+    peak_mb = peak_rss_mb()
+    result = {
+        'seconds': round(elapsed, 3),
+        'rows': int(rows),
+        'rows_per_s': round(rows / elapsed, 2) if elapsed > 0 else None,
+        'peak_rss_mb': round(peak_mb, 1),
+    }
+    print(RESULT_PREFIX + json.dumps(result))
+
+
+# ---------------------------------------------------------------------------
+# Parent side: prepare scratch stores, spawn children, compare to baseline
+# ---------------------------------------------------------------------------
+def prepare_workdir(workdir, scale):
+    sys.path.insert(0, REPO_ROOT)
+    import synthetic_league
+
+    store = os.path.join(workdir, f"scale_{scale:g}x")
+    marker = os.path.join(store, ".generated.json")
+    # Stores generated before the team game log endpoint files existed are rebuilt
+    if not (os.path.exists(marker) and os.path.isdir(os.path.join(store, "data", "local_endpoints"))):
+        shutil.rmtree(store, ignore_errors=True)
+        print(f"\nGenerating {scale:g}x synthetic league in {store}...")
+        summary = synthetic_league.generate_league(store, scale=scale)
+        with open(marker, 'w') as f:
+            json.dump(summary, f)
+
+    os.makedirs(os.path.join(store, "processed_data"), exist_ok=True)
+    for rel in SHARED_ARTIFACTS:
+        src = os.path.join(REPO_ROOT, rel)
+        if os.path.exists(src):
+            shutil.copy2(src, os.path.join(store, rel))
+    return store
+
+
+def spawn_stage(stage, store, verbose=False):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), f"--child={stage}"],
+        cwd=store, capture_output=True, text=True
+    )
+    if verbose:
+        print(proc.stdout)
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    if proc.returncode < 0:
+        # SIGKILL with no traceback is almost always the kernel's OOM killer
+        reason = f"killed by signal {-proc.returncode}" + (" (out of memory?)" if proc.returncode == -9 else "")
+    else:
+        reason = f"exit code {proc.returncode}"
+    raise RuntimeError(f"{stage} failed: {reason}\n{proc.stdout[-2000:]}\n{proc.stderr[-3000:]}")
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions."""
+    regressions = []
+    for scale_key, stages in results.items():
+        for stage, metrics in stages.items():
+            base = baseline.get(scale_key, {}).get(stage)
+            if not base:
+                continue
+            # A stage that no longer completes is a regression; one that now does is not
+            if metrics.get('failed'):
+                if not base.get('failed'):
+                    regressions.append(f"{scale_key} {stage}: {metrics['failed']}")
+                continue
+            if base.get('failed'):
+                continue
+            if base.get('rows_per_s') and metrics.get('rows_per_s') is not None \
+                    and metrics['rows_per_s'] < base['rows_per_s'] * (1 - tolerance):
+                regressions.append(
+                    f"{scale_key} {stage}: throughput {metrics['rows_per_s']:.1f}/s vs baseline {base['rows_per_s']:.1f}/s"
+                )
+            if base.get('peak_rss_mb') and metrics.get('peak_rss_mb') is not None \
+                    and metrics['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+                regressions.append(
+                    f"{scale_key} {stage}: peak RSS {metrics['peak_rss_mb']:.0f} MB vs baseline {base['peak_rss_mb']:.0f} MB"
+                )
+    return regressions
+
+
+def main():
+    args = sys.argv[1:]
+    child = [a.split('=', 1)[1] for a in args if a.startswith('--child=')]
+    if child:
+        run_child_stage(child[0])
+        return
+
+    scales = [1.0, 5.0, 20.0]
+    tolerance = 0.3
+    workdir = DEFAULT_WORKDIR
+    stages = list(STAGES)
+    for arg in args:
+        if arg.startswith('--scales='):
+            scales = [float(s) for s in arg.split('=')[1].split(',')]
+        elif arg.startswith('--tolerance='):
+            tolerance = float(arg.split('=')[1])
+        elif arg.startswith('--workdir='):
+            workdir = arg.split('=')[1]
+        elif arg.startswith('--stages='):
+            stages = arg.split('=')[1].split(',')
+    save_baseline = '--save-baseline' in args
+    verbose = '--verbose' in args
+
+    results = {}
+    for scale in scales:
+        store = prepare_workdir(workdir, scale)
+        scale_key = f"{scale:g}x"
+        results[scale_key] = {}
+        setups_done = set()
+        failed = None
+        print(f"\n=== {scale_key} ({store}) ===")
+        for stage in STAGES:
+            if stage not in stages:
+                continue
+            # Each stage reads what the ones before it wrote, so a failure ends the scale
+            if failed is not None:
+                results[scale_key][stage] = {'failed': f"skipped: {failed} failed"}
+                print(f"  {stage:<30} skipped ({failed} failed)")
+                continue
+            try:
+                if stage in SETUP_STAGES and SETUP_STAGES[stage] not in setups_done:
+                    spawn_stage(SETUP_STAGES[stage], store, verbose)
+                    setups_done.add(SETUP_STAGES[stage])
+                metrics = spawn_stage(stage, store, verbose)
+            except RuntimeError as e:
+                failed = stage
+                reason = str(e).splitlines()[0].split(' failed: ', 1)[-1]
+                results[scale_key][stage] = {'failed': reason}
+                print(f"  {stage:<30} FAILED: {reason}")
+                if verbose:
+                    print(str(e))
+                continue
+            results[scale_key][stage] = metrics
+            # rows_per_s is None when a stage finishes too fast to time
+            throughput = f"{metrics['rows_per_s']:12.1f}" if metrics.get('rows_per_s') is not None else f"{'-':>12}"
+            print(f"  {stage:<30} {metrics['seconds']:9.2f} s  {throughput} rows/s  {metrics['peak_rss_mb']:8.0f} MB peak")
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+
+    if save_baseline:
+        for scale_key, stage_results in results.items():
+            baseline.setdefault(scale_key, {}).update(stage_results)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nSaved baseline to {BASELINE_FILE}")
+        return
+
+    regressions = compare(results, baseline, tolerance)
+    if regressions:
+        print("\nFAIL: regressions past baseline (tolerance {:.0%}):".format(tolerance))
+        for r in regressions:
+            print(f"  - {r}")
+        sys.exit(1)
+    print("\nNo regressions against baseline." if baseline else "\nNo baseline recorded yet (use --save-baseline).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Startup-time benchmark for the predict.py CLI.
+
+Runs each scenario in a fresh interpreter with `python -X importtime`, parses the
+per-module import log and reports the total import cost plus the slowest modules.
+The bare CLI scenario also fails if any heavy dependency sneaks back in at import time.
+
+Usage (from the repo root):
+    python benchmarks/startup.py
+    python benchmarks/startup.py --budget-ms=500 --top=15
+"""
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must NOT be loaded just by importing predict.py
+HEAVY_MODULES = ['pandas', 'numpy', 'xgboost', 'sklearn', 'matplotlib', 'shap', 'nba_api.stats.endpoints']
+
+SCENARIOS = {
+    # What every CLI invocation pays before doing any work
+    'cli_import': "import predict",
+    # The common "predict one player with a cached model" path up to the live fetch
+    'cached_model': (
+        "import os, predict, joblib, pandas\n"
+        "f = predict.get_model_file('PTS')\n"
+        "joblib.load(f) if os.path.exists(f) else None"
+    ),
+}
+
+
+def run_importtime(code):
+    """Run `code` in a fresh interpreter and return (wall_seconds, {module: cumulative_us})."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"Scenario failed:\n{proc.stderr[-2000:]}")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        # Format: "import time:   self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        cumulative = int(parts[1].strip())
+        name = parts[2].rstrip()
+        # Indentation encodes nesting; only top-level imports add up to the total
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (cumulative, depth)
+    return wall, modules
+
+
+def report(name, wall, modules, top):
+    total_us = sum(cum for cum, depth in modules.values() if depth == 0)
+    print(f"\n--- {name} ---")
+    print(f"Interpreter wall time: {wall * 1000:.0f} ms | import time: {total_us / 1000:.0f} ms")
+    slowest = sorted(modules.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    for mod, (cum, depth) in slowest:
+        print(f"  {cum / 1000:8.1f} ms  {mod}")
+    return total_us / 1000
+
+
+def main():
+    budget_ms = 1000.0
+    top = 10
+    for arg in sys.argv[1:]:
+        if arg.startswith('--budget-ms='):
+            budget_ms = float(arg.split('=')[1])
+        elif arg.startswith('--top='):
+            top = int(arg.split('=')[1])
+
+    failed = False
+    for name, code in SCENARIOS.items():
+        wall, modules = run_importtime(code)
+        import_ms = report(name, wall, modules, top)
+
+        if name == 'cli_import':
+            leaked = [m for m in HEAVY_MODULES if m in modules]
+            if leaked:
+                print(f"FAIL: heavy modules imported at CLI startup: {leaked}")
+                failed = True
+            if import_ms > budget_ms:
+                print(f"FAIL: CLI import took {import_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+                failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
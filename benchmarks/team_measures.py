@@ -0,0 +1,129 @@
+"""
+Team metrics ingestion: the old loop (Advanced only, one season at a time with a
+sleep before each request) vs team_ingestion.fetch_team_season_stats pulling
+Advanced, Four Factors and Opponent for every season through worker threads that
+share one RateLimiter, then the reruns the cache serves: a mid-season refresh
+(only the current season's measures are fetched again) and a fully warm cache.
+
+stats.nba.com isn't called: a simulated endpoint sleeps --latency seconds per
+request and returns frames with each measure's column layout, built from the
+repo's data/team_defensive_metrics.parquet. The request interval and latency are
+scaled down from production (2 s between requests, several seconds per response)
+so the run is quick; the ratios are what matter. Everything is written under a
+scratch directory, never the repo's data/.
+
+Usage (from the repo root):
+    python benchmarks/team_measures.py
+    python benchmarks/team_measures.py --interval=0.5 --latency=2
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+SHARED = ['TEAM_ID', 'TEAM_NAME', 'GP', 'W', 'L', 'W_PCT', 'MIN']
+FOUR_FACTORS = ['EFG_PCT', 'FTA_RATE', 'TM_TOV_PCT', 'OREB_PCT',
+                'OPP_EFG_PCT', 'OPP_FTA_RATE', 'OPP_TOV_PCT', 'OPP_OREB_PCT']
+OPPONENT = ['OPP_FGM', 'OPP_FGA', 'OPP_FG_PCT', 'OPP_FG3M', 'OPP_FG3A', 'OPP_FG3_PCT', 'OPP_FTM', 'OPP_FTA',
+            'OPP_FT_PCT', 'OPP_OREB', 'OPP_DREB', 'OPP_REB', 'OPP_AST', 'OPP_TOV', 'OPP_STL', 'OPP_BLK',
+            'OPP_PF', 'OPP_PTS', 'PLUS_MINUS']
+
+
+def simulated_endpoint(advanced, latency):
+    """fetch(measure, season) returning frames shaped like each LeagueDashTeamStats measure."""
+    import zlib
+    import numpy as np
+
+    def fetch(measure, season):
+        time.sleep(latency)
+        base = advanced[advanced['SEASON'] == season].drop(columns=['SEASON']).reset_index(drop=True)
+        if measure == 'Advanced':
+            return base
+        rng = np.random.default_rng(zlib.crc32(f'{measure}|{season}'.encode()))
+        extra = FOUR_FACTORS if measure == 'Four Factors' else OPPONENT
+        df = base[SHARED].copy()
+        for col in extra:
+            df[col] = base[col] if col in base.columns else np.round(rng.normal(0.5, 0.1, len(df)), 3)
+            df[f'{col}_RANK'] = df[col].rank(method='min').astype(int)
+        return df
+    return fetch
+
+
+def legacy_fetch(seasons, fetch, interval):
+    """The old fetch_advanced_team_stats timing: sleep, then one Advanced request, per season."""
+    import pandas as pd
+    frames = []
+    for season in seasons:
+        time.sleep(interval)
+        df = fetch('Advanced', season)
+        df['SEASON'] = season
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    import pandas as pd
+
+    args = sys.argv[1:]
+    interval, latency = 0.2, 0.5
+    for arg in args:
+        if arg.startswith('--interval='):
+            interval = float(arg.split('=')[1])
+        elif arg.startswith('--latency='):
+            latency = float(arg.split('=')[1])
+
+    source = os.path.join(REPO_ROOT, "data", "team_defensive_metrics.parquet")
+    advanced = pd.read_parquet(source)
+    seasons = sorted(advanced['SEASON'].unique())
+    fetch = simulated_endpoint(advanced, latency)
+
+    scratch = tempfile.mkdtemp(prefix="team_measures_")
+    os.chdir(scratch)
+    import team_ingestion as ti
+    try:
+        start = time.perf_counter()
+        legacy = legacy_fetch(seasons, fetch, interval)
+        legacy_s = time.perf_counter() - start
+
+        runs = {}
+        modes = [('sequential', 1), ('concurrent', ti.MAX_WORKERS),
+                 ('current season refresh', ti.MAX_WORKERS), ('warm cache', ti.MAX_WORKERS)]
+        for label, workers in modes:
+            if label in ('sequential', 'concurrent'):
+                shutil.rmtree(ti.TEAM_STATS_CACHE_DIR, ignore_errors=True)
+            elif label == 'current season refresh':
+                # What a mid-season rerun sees once the current season's entries expire
+                for measure in ti.TEAM_MEASURES:
+                    os.remove(ti.team_stats_cache_path(measure, max(seasons)))
+            start = time.perf_counter()
+            frames = ti.fetch_team_season_stats(seasons, fetch=fetch, max_workers=workers,
+                                                limiter=ti.RateLimiter(interval))
+            wide = ti.merge_team_measures(frames)
+            runs[label] = (time.perf_counter() - start, wide)
+
+        reference = runs['sequential'][1]
+        for label, (_, wide) in runs.items():
+            pd.testing.assert_frame_equal(wide, reference, check_exact=True)
+
+        n_requests = len(seasons) * len(ti.TEAM_MEASURES)
+        print(f"\nTeam metrics for {len(seasons)} seasons (request interval {interval}s, latency {latency}s):")
+        print(f"  {'mode':<34} {'requests':>8} {'time':>8} {'table':>12}")
+        print(f"  {'legacy (Advanced, sleep + fetch)':<34} {len(seasons):>8} {legacy_s:>7.2f}s "
+              f"{f'{legacy.shape[0]}x{legacy.shape[1]}':>12}")
+        for label, (seconds, wide) in runs.items():
+            requests = {'warm cache': 0, 'current season refresh': len(ti.TEAM_MEASURES)}.get(label, n_requests)
+            print(f"  {label:<34} {requests:>8} {seconds:>7.2f}s "
+                  f"{f'{wide.shape[0]}x{wide.shape[1]}':>12}")
+        dtypes = {k: int(v) for k, v in reference.dtypes.astype(str).value_counts().items()}
+        print(f"  Wide table dtypes: {dtypes}")
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Serving benchmark for the NumPy tree evaluator (tree_export.py) vs xgboost.
+
+Reports, for one saved model:
+  * cold load: a fresh interpreter loading the model the old way (joblib, which
+    imports xgboost) vs loading the exported arrays (numpy only)
+  * batch throughput of XGBRegressor.predict vs CompiledTrees.predict on rows
+    from the master dataset, and the largest absolute difference between them
+
+The model is copied and exported into a scratch directory, so the repo's
+processed_data/ is only read. Exits non-zero if predictions differ by more
+than --tolerance.
+
+Usage (from the repo root, after model.py and features.py):
+    python benchmarks/tree_eval.py
+    python benchmarks/tree_eval.py --target=PRA --repeats=5
+"""
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+BATCH_SIZES = [1, 100, 10_000, None]  # None = every master row
+
+
+def cold_load_seconds(code, repeats):
+    """Best-of-`repeats` wall time of running `code` in a fresh interpreter."""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-W', 'ignore', '-c', code], cwd=REPO_ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def throughput(predict, X, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        preds = predict(X)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(X) / best, preds
+
+
+def main():
+    import warnings
+    warnings.filterwarnings('ignore')
+    import numpy as np
+    import pandas as pd
+    import joblib
+    from features import encode_model_rows
+    from predict import get_model_file, MASTER_FILE
+    import tree_export
+
+    args = sys.argv[1:]
+    target, repeats, tolerance = 'PTS', 3, 1e-3
+    for arg in args:
+        if arg.startswith('--target='):
+            target = arg.split('=')[1].upper()
+        elif arg.startswith('--repeats='):
+            repeats = int(arg.split('=')[1])
+        elif arg.startswith('--tolerance='):
+            tolerance = float(arg.split('=')[1])
+
+    source = os.path.join(REPO_ROOT, get_model_file(target))
+    scratch = tempfile.mkdtemp(prefix="tree_eval_")
+    try:
+        model_file = os.path.join(scratch, os.path.basename(source))
+        shutil.copy(source, model_file)
+        tree_export.export_model(model_file)
+
+        print(f"\nCold load of the {target} model (fresh interpreter, best of {repeats}):")
+        baseline = cold_load_seconds("pass", repeats)
+        t_joblib = cold_load_seconds(f"import joblib; joblib.load({model_file!r})", repeats)
+        t_numpy = cold_load_seconds(
+            f"from tree_export import load_serving_model; load_serving_model({model_file!r})", repeats)
+        print(f"  interpreter only       {baseline * 1000:8.0f} ms")
+        print(f"  joblib + xgboost       {t_joblib * 1000:8.0f} ms")
+        print(f"  exported NumPy trees   {t_numpy * 1000:8.0f} ms  ({(t_joblib - baseline) / max(t_numpy - baseline, 1e-9):.1f}x less load overhead)")
+
+        saved = joblib.load(model_file)
+        compiled = tree_export.load_serving_model(model_file)['model']
+        master = pd.read_parquet(os.path.join(REPO_ROOT, MASTER_FILE))
+        X_all = encode_model_rows(master, saved['features']).astype(np.float32)
+
+        print(f"\nBatch throughput (rows/s, best of {repeats}):")
+        print(f"  {'rows':>8}  {'xgboost':>12}  {'numpy':>12}  {'max |diff|':>10}")
+        worst = 0.0
+        for size in BATCH_SIZES:
+            X = X_all if size is None else X_all.iloc[:size]
+            xgb_rate, xgb_preds = throughput(saved['model'].predict, X, repeats)
+            np_rate, np_preds = throughput(compiled.predict, X, repeats)
+            diff = float(np.abs(xgb_preds - np_preds).max())
+            worst = max(worst, diff)
+            print(f"  {len(X):>8}  {xgb_rate:>12,.0f}  {np_rate:>12,.0f}  {diff:>10.2e}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if worst > tolerance:
+        print(f"\nFAIL: exported trees differ from xgboost by {worst:.2e} (> {tolerance:g})")
+        sys.exit(1)
+    print(f"\nExported trees match xgboost within {worst:.2e}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import os
+import numpy as np
+import pandas as pd
+
+DATA_DIR = "data"
+PROCESSED_DATA_DIR = "processed_data"
+MASTER_FILE = os.path.join(PROCESSED_DATA_DIR, "master_dataset.parquet")
+CONFORMAL_FILE = os.path.join(PROCESSED_DATA_DIR, "conformal_intervals.joblib")
+PROJECTIONS_FILE = os.path.join(DATA_DIR, "upcoming_projections.csv")
+
+INTERVAL_TARGETS = ['PTS', 'AST', 'REB', 'PRA']
+# Nominal coverages stored in the tables; PRED_LOW_/PRED_HIGH_ columns use INTERVAL_COVERAGE
+COVERAGE_LEVELS = [0.5, 0.8, 0.9]
+INTERVAL_COVERAGE = 0.8
+# Trailing minutes (mean of the previous MIN_WINDOW games) pick the bucket: bench and
+# starter errors are very different sizes
+MIN_WINDOW = 5
+MIN_BUCKET_EDGES = [0, 15, 25, 32]
+# Buckets with fewer calibration rows use the target's all-minutes row
+MIN_BUCKET_ROWS = 200
+
+
+def trailing_minutes(df):
+    """Mean MIN over each player's previous MIN_WINDOW games (the game itself excluded)."""
+    ordered = df.sort_values(['PLAYER_ID', 'GAME_DATE'])
+    minutes = pd.to_numeric(ordered['MIN'], errors='coerce')
+    trailing = minutes.groupby(ordered['PLAYER_ID']).transform(
+        lambda s: s.shift(1).rolling(MIN_WINDOW, min_periods=1).mean())
+    return trailing.reindex(df.index)
+
+
+def minutes_bucket(minutes):
+    """Row index into a quantile table: one per MIN_BUCKET_EDGES bucket, then the all-minutes row."""
+    minutes = np.asarray(minutes, dtype=float)
+    bucket = np.searchsorted(MIN_BUCKET_EDGES, np.nan_to_num(minutes, nan=-1.0), side='right') - 1
+    return np.where(np.isnan(minutes) | (bucket < 0), len(MIN_BUCKET_EDGES), bucket)
+
+
+def conformal_quantiles(residuals, coverage):
+    """
+    (low, high) offsets for a two-sided split-conformal interval from signed residuals
+    y - pred, with the (n + 1) finite-sample correction on each tail.
+    """
+    n = len(residuals)
+    alpha = 1 - coverage
+    lo_level = np.floor((n + 1) * alpha / 2) / n
+    hi_level = min(np.ceil((n + 1) * (1 - alpha / 2)) / n, 1.0)
+    return np.quantile(residuals, [max(lo_level, 0.0), hi_level])
+
+
+def quantile_table(residuals, buckets, coverage):
+    """(n_buckets + 1, 2) array of (low, high) offsets, the last row calibrated on every bucket."""
+    n_rows = len(MIN_BUCKET_EDGES) + 1
+    table = np.empty((n_rows, 2))
+    table[-1] = conformal_quantiles(residuals, coverage)
+    for b in range(n_rows - 1):
+        in_bucket = residuals[buckets == b]
+        table[b] = conformal_quantiles(in_bucket, coverage) if len(in_bucket) >= MIN_BUCKET_ROWS else table[-1]
+    return table
+
+
+def fit_conformal_intervals(holdout_frac=0.2):
+    """
+    Calibrate split-conformal intervals on a held-out temporal slice.
+
+    Like prop_probabilities.fit_residual_model: each target's production XGBoost
+    configuration is refit on the earliest (1 - holdout_frac) of game dates and scored
+    on the most recent slice, whose signed residuals become per-minutes-bucket quantile
+    tables. Coverage is checked by calibrating on the first half of the slice and
+    scoring the second before the saved tables are fit on all of it.
+    """
+    import joblib
+    from xgboost import XGBRegressor
+    import model as mdl
+
+    if not os.path.exists(MASTER_FILE):
+        print(f"File {MASTER_FILE} not found. Run features.py first.")
+        return None
+
+    df = pd.read_parquet(MASTER_FILE)
+    cutoff = df['GAME_DATE'].quantile(1 - holdout_frac)
+    minutes = trailing_minutes(df)
+    print(f"Calibrating conformal intervals on games after {pd.Timestamp(cutoff).date()}...")
+
+    tables, sizes = {}, {}
+    for target in INTERVAL_TARGETS:
+        X, y, _ = mdl.prep_for_modeling(df, target_col=target)
+        game_dates = df.loc[X.index, 'GAME_DATE']
+        is_holdout = (game_dates > cutoff).values
+
+        xgb_model = XGBRegressor(**mdl.XGB_PARAMS)
+        xgb_model.fit(X[~is_holdout], y[~is_holdout])
+        preds = xgb_model.predict(X[is_holdout])
+        residuals = y[is_holdout].to_numpy() - preds
+        buckets = minutes_bucket(minutes.loc[X.index[is_holdout]])
+
+        # Honest coverage: calibrate on the earlier half of the slice, score the later half
+        split = (game_dates[is_holdout] > game_dates[is_holdout].median()).values
+        report = []
+        for coverage in COVERAGE_LEVELS:
+            check = quantile_table(residuals[~split], buckets[~split], coverage)
+            covered = ((residuals[split] >= check[buckets[split], 0]) &
+                       (residuals[split] <= check[buckets[split], 1])).mean()
+            report.append(f"{coverage:.0%} -> {covered:.1%}")
+        print(f"  {target}: {is_holdout.sum()} held-out games | later-half coverage {', '.join(report)}")
+
+        tables[target] = {coverage: quantile_table(residuals, buckets, coverage) for coverage in COVERAGE_LEVELS}
+        sizes[target] = np.bincount(buckets, minlength=len(MIN_BUCKET_EDGES) + 1)
+
+    intervals = {
+        'tables': tables,
+        'bucket_rows': sizes,
+        'min_bucket_edges': MIN_BUCKET_EDGES,
+        'min_window': MIN_WINDOW,
+        'cutoff': str(pd.Timestamp(cutoff).date()),
+    }
+    joblib.dump(intervals, CONFORMAL_FILE)
+    print(f"Saved conformal interval tables to {CONFORMAL_FILE}")
+    return intervals
+
+
+def load_conformal_intervals():
+    import joblib
+    if not os.path.exists(CONFORMAL_FILE):
+        return None
+    return joblib.load(CONFORMAL_FILE)
+
+
+def attach_intervals(projections_df, intervals, coverage=INTERVAL_COVERAGE):
+    """Add PRED_LOW_/PRED_HIGH_ columns: one table lookup per row, no model evaluation."""
+    df = projections_df.copy()
+    minutes = df['MIN_5G_AVG'] if 'MIN_5G_AVG' in df.columns else pd.Series(np.nan, index=df.index)
+    buckets = minutes_bucket(minutes)
+    for target, by_coverage in intervals['tables'].items():
+        pred_col = f'PREDICTED_{target}'
+        if pred_col not in df.columns or coverage not in by_coverage:
+            continue
+        offsets = by_coverage[coverage][buckets]
+        preds = df[pred_col].to_numpy(dtype=float)
+        df[f'PRED_LOW_{target}'] = np.round(np.clip(preds + offsets[:, 0], 0, None), 1)
+        df[f'PRED_HIGH_{target}'] = np.round(preds + offsets[:, 1], 1)
+    return df
+
+
+def add_prediction_intervals(projections_df, coverage=INTERVAL_COVERAGE):
+    """
+    Hook used by prepare_projections and watcher: attach intervals if the tables have
+    been calibrated, otherwise return the input unchanged.
+    """
+    intervals = load_conformal_intervals()
+    if intervals is None:
+        print(f"No conformal tables at {CONFORMAL_FILE}; skipping intervals (run conformal.py to calibrate).")
+        return projections_df
+    return attach_intervals(projections_df, intervals, coverage)
+
+
+if __name__ == "__main__":
+    import sys
+    if '--apply' in sys.argv[1:]:
+        if not os.path.exists(PROJECTIONS_FILE):
+            print(f"File {PROJECTIONS_FILE} missing! Run prepare_projections.py first.")
+        else:
+            proj_df = add_prediction_intervals(pd.read_csv(PROJECTIONS_FILE))
+            proj_df.to_csv(PROJECTIONS_FILE, index=False)
+            print(f"Updated {PROJECTIONS_FILE} with {INTERVAL_COVERAGE:.0%} prediction intervals.")
+    else:
+        fit_conformal_intervals()
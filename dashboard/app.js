@@ -90,35 +90,80 @@ async function initDashboard() {
     }
 }
 
-async function loadGames() {
+// Data comes from dashboard_server.py's /api/ when it is running (compressed,
+// ETag-validated, delta-updated); a plain static server falls back to the CSVs.
+const API_BASE = '/api';
+const PROJECTIONS_CACHE_KEY = 'projectionsCache';
+const PROJECTION_KEY_COLUMNS = ['PLAYER_NAME', 'TEAM', 'GAME_DATE'];
+
+function parseCSV(url) {
     return new Promise((resolve, reject) => {
-        Papa.parse('../data/upcoming_games.csv?v=' + new Date().getTime(), {
+        Papa.parse(url, {
             download: true,
             header: true,
             skipEmptyLines: true,
-            complete: (results) => {
-                // Filter out Unknown_None games
-                gamesData = results.data.filter(g => g.HOME_TEAM !== 'Unknown_None');
-                resolve();
-            },
+            complete: (results) => resolve(results.data),
             error: reject
         });
     });
 }
 
+async function fetchAPI(path) {
+    const res = await fetch(API_BASE + path);
+    if (!res.ok) throw new Error(`${path} returned ${res.status}`);
+    return { data: await res.json(), version: parseInt(res.headers.get('X-Data-Version'), 10) };
+}
+
+function projectionKey(p) {
+    return PROJECTION_KEY_COLUMNS.map(c => p[c] ?? '').join('|');
+}
+
+async function loadGames() {
+    let games;
+    try {
+        games = (await fetchAPI('/games')).data;
+    } catch (err) {
+        games = await parseCSV('../data/upcoming_games.csv?v=' + new Date().getTime());
+    }
+    // Filter out Unknown_None games
+    gamesData = games.filter(g => g.HOME_TEAM !== 'Unknown_None');
+}
+
 async function loadProjections() {
-    return new Promise((resolve, reject) => {
-        Papa.parse('../data/upcoming_projections.csv?v=' + new Date().getTime(), {
-            download: true,
-            header: true,
-            skipEmptyLines: true,
-            complete: (results) => {
-                projectionsData = results.data;
-                resolve();
-            },
-            error: reject
-        });
-    });
+    try {
+        projectionsData = await loadProjectionsFromAPI();
+    } catch (err) {
+        projectionsData = await parseCSV('../data/upcoming_projections.csv?v=' + new Date().getTime());
+    }
+}
+
+async function loadProjectionsFromAPI() {
+    let cached = null;
+    try {
+        cached = JSON.parse(localStorage.getItem(PROJECTIONS_CACHE_KEY));
+    } catch (err) { /* unreadable cache: do a full load */ }
+
+    let rows, version;
+    if (cached && cached.version && Array.isArray(cached.rows)) {
+        // Only what changed since the version we already hold
+        const { data: delta } = await fetchAPI(`/projections?since=${cached.version}`);
+        if (delta.full) {
+            rows = delta.rows;
+        } else {
+            const byKey = new Map(cached.rows.map(p => [projectionKey(p), p]));
+            delta.removed.forEach(key => byKey.delete(key));
+            delta.changed.forEach(p => byKey.set(projectionKey(p), p));
+            rows = [...byKey.values()];
+        }
+        version = delta.version;
+    } else {
+        ({ data: rows, version } = await fetchAPI('/projections'));
+    }
+
+    try {
+        localStorage.setItem(PROJECTIONS_CACHE_KEY, JSON.stringify({ version, rows }));
+    } catch (err) { /* storage full or disabled: next load is a full one */ }
+    return rows;
 }
 
 function setupEventListeners() {
@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import gzip
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from publish import PUBLISH_DIR, MANIFEST_FILE, version_dir, row_key
+
+DEFAULT_PORT = 8000
+# On-the-fly responses (deltas) smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+CONTENT_TYPES = {'.json': 'application/json', '.csv': 'text/csv; charset=utf-8'}
+# Precompressed siblings written by publish.py, in order of preference
+ENCODINGS = [('br', '.br', '-br'), ('gzip', '.gz', '-gz')]
+
+
+class PublishedData:
+    """The current manifest plus parsed projection rows, reloaded whenever publish.py swaps the manifest."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.manifest = None
+        self.projections = None
+
+    def current(self):
+        try:
+            mtime = os.stat(MANIFEST_FILE).st_mtime_ns
+        except OSError:
+            return None, None
+        with self.lock:
+            if mtime != self.mtime:
+                with open(MANIFEST_FILE) as f:
+                    manifest = json.load(f)
+                with open(os.path.join(version_dir(manifest['version']), "projections.json")) as f:
+                    projections = json.load(f)
+                self.manifest, self.projections, self.mtime = manifest, projections, mtime
+            return self.manifest, self.projections
+
+
+DATA = PublishedData()
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        q = re.search(r'q=([0-9.]+)', params)
+        if token and (q is None or float(q.group(1)) > 0):
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+class DashboardHandler(SimpleHTTPRequestHandler):
+    """
+    Static files from the repo root (so /dashboard/ and the raw CSVs still work),
+    plus the published data under /api/:
+
+      /api/manifest                    current version and team list
+      /api/projections[.csv]           all projections (JSON rows or CSV)
+      /api/projections?since=<version> only rows changed/removed after <version>
+      /api/games[.csv]                 the upcoming schedule
+      /api/teams/<TEAM>                one team's projections and games
+
+    Published files are served precompressed with ETag/Last-Modified validation.
+    """
+
+    def do_GET(self):
+        if self.path.startswith('/api/'):
+            self.handle_api(send_body=True)
+        else:
+            super().do_GET()
+
+    def do_HEAD(self):
+        if self.path.startswith('/api/'):
+            self.handle_api(send_body=False)
+        else:
+            super().do_HEAD()
+
+    def handle_api(self, send_body):
+        url = urlparse(self.path)
+        manifest, projections = DATA.current()
+        if manifest is None:
+            return self.send_json({'error': "Nothing published yet. Run prepare_projections.py or publish.py."},
+                                  status=503, send_body=send_body)
+
+        route = url.path[len('/api/'):].strip('/')
+        query = parse_qs(url.query)
+        if route == 'manifest':
+            info = {k: manifest[k] for k in ['version', 'published', 'teams', 'encodings']}
+            return self.send_json(info, manifest, send_body=send_body)
+        if route == 'projections' and 'since' in query:
+            return self.send_delta(manifest, projections, query['since'][0], send_body)
+
+        name = {
+            'projections': 'projections.json', 'projections.csv': 'projections.csv',
+            'games': 'games.json', 'games.csv': 'games.csv',
+        }.get(route)
+        if name is None and route.startswith('teams/'):
+            team = route[len('teams/'):].upper()
+            name = f'teams/{team}.json' if team in manifest['teams'] else None
+        if name is None:
+            return self.send_json({'error': f"Unknown endpoint /api/{route}"}, status=404, send_body=send_body)
+        self.send_published(manifest, name, send_body)
+
+    def not_modified(self, etag, manifest):
+        """True when the client's cached copy (If-None-Match, else If-Modified-Since) is current."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            tags = [t.strip().removeprefix('W/') for t in if_none_match.split(',')]
+            return '*' in tags or etag in tags or any(
+                t.startswith(etag[:-1] + '-') for t in tags)
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= int(manifest['published'])
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_common_headers(self, manifest, etag=None):
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('X-Data-Version', str(manifest['version']))
+        self.send_header('Last-Modified', formatdate(manifest['published'], usegmt=True))
+        if etag:
+            self.send_header('ETag', etag)
+
+    def send_published(self, manifest, name, send_body):
+        etag = f'"{manifest["files"][name]}"'
+        if self.not_modified(etag, manifest):
+            self.send_response(304)
+            self.send_common_headers(manifest, etag)
+            return self.end_headers()
+
+        path = os.path.join(version_dir(manifest['version']), *name.split('/'))
+        accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+        encoding = None
+        for enc, suffix, tag_suffix in ENCODINGS:
+            if enc in accepted and os.path.exists(path + suffix):
+                path, encoding, etag = path + suffix, enc, etag[:-1] + tag_suffix + '"'
+                break
+        with open(path, 'rb') as f:
+            body = f.read()
+
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES[os.path.splitext(name)[1]])
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_common_headers(manifest, etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_delta(self, manifest, projections, since, send_body):
+        try:
+            since = int(since)
+        except ValueError:
+            return self.send_json({'error': "since must be a published version number"}, status=400, send_body=send_body)
+
+        if since > manifest['version'] or since < manifest.get('oldest', 1):
+            # The client's version is from before a reset, older than the tombstones
+            # still kept, or bogus: resend everything
+            payload = {'version': manifest['version'], 'since': since, 'full': True, 'rows': projections}
+        else:
+            versions = manifest['rows']
+            payload = {
+                'version': manifest['version'],
+                'since': since,
+                'full': False,
+                'changed': [r for r in projections if versions[row_key(r)]['version'] > since],
+                'removed': [k for k, v in manifest['removed'].items() if v > since],
+            }
+        self.send_json(payload, manifest, etag=f'"delta-{since}-{manifest["version"]}"', send_body=send_body)
+
+    def send_json(self, payload, manifest=None, etag=None, status=200, send_body=True):
+        if manifest is not None and etag and self.not_modified(etag, manifest):
+            self.send_response(304)
+            self.send_common_headers(manifest, etag)
+            return self.end_headers()
+
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        compress = 'gzip' in accepted_encodings(self.headers.get('Accept-Encoding')) and len(body) >= MIN_COMPRESS_BYTES
+        if compress:
+            body = gzip.compress(body, mtime=0)
+            etag = etag[:-1] + '-gz"' if etag else None
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        if manifest is not None:
+            self.send_common_headers(manifest, etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def serve(port=DEFAULT_PORT):
+    server = ThreadingHTTPServer(('', port), DashboardHandler)
+    print(f"Serving the dashboard at http://localhost:{port}/dashboard/ (data API under /api/, artifacts in {PUBLISH_DIR})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import sys
+    port_arg = [int(a.split('=')[1]) for a in sys.argv[1:] if a.startswith('--port=')]
+    serve(port_arg[0] if port_arg else DEFAULT_PORT)
@@ -0,0 +1,296 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+PROCESSED_DATA_DIR = "processed_data"
+MODEL_FILES = {
+    'PTS': os.path.join(PROCESSED_DATA_DIR, "xgb_pts_model.joblib"),
+    'AST': os.path.join(PROCESSED_DATA_DIR, "xgb_ast_model.joblib"),
+    'REB': os.path.join(PROCESSED_DATA_DIR, "xgb_reb_model.joblib"),
+    'PRA': os.path.join(PROCESSED_DATA_DIR, "xgb_pra_model.joblib"),
+}
+DRIFT_STATE_FILE = os.path.join(PROCESSED_DATA_DIR, "drift_state.json")
+DRIFT_REPORT_FILE = os.path.join(PROCESSED_DATA_DIR, "drift_report.json")
+
+# Histogram sketch: bins cut at the training deciles, so every feature costs a fixed
+# number of counters however many games are observed
+PROFILE_QUANTILES = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+# Population stability index bands (the usual credit-scoring rule of thumb)
+PSI_WARN = 0.1
+PSI_DRIFT = 0.25
+# Live games needed before a feature's drift is reported
+MIN_LIVE_COUNT = 50
+# Projections whose game never shows up in the logs (DNP, trade) are dropped after this
+PENDING_DAYS = 14
+
+
+def summarize(values, edges=None):
+    """Moments, extremes and sketch counts of a batch of values (NaNs ignored)."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    n = len(values)
+    mean = float(values.mean()) if n else 0.0
+    stats = {
+        'count': n,
+        'mean': mean,
+        'm2': float(((values - mean) ** 2).sum()) if n else 0.0,
+        'min': float(values.min()) if n else None,
+        'max': float(values.max()) if n else None,
+    }
+    if edges is not None:
+        stats['counts'] = np.bincount(np.searchsorted(edges, values, side='right'),
+                                      minlength=len(edges) + 1).tolist()
+    return stats
+
+
+def merge_stats(a, b):
+    """Combine two summaries exactly (Chan et al.'s parallel form of Welford's update)."""
+    if b['count'] == 0:
+        return a
+    if a['count'] == 0:
+        return b
+    n = a['count'] + b['count']
+    delta = b['mean'] - a['mean']
+    merged = {
+        'count': n,
+        'mean': a['mean'] + delta * b['count'] / n,
+        'm2': a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / n,
+        'min': min(a['min'], b['min']),
+        'max': max(a['max'], b['max']),
+    }
+    if 'counts' in a and 'counts' in b:
+        merged['counts'] = [x + y for x, y in zip(a['counts'], b['counts'])]
+    return merged
+
+
+def std(stats):
+    return float(np.sqrt(stats['m2'] / (stats['count'] - 1))) if stats['count'] > 1 else 0.0
+
+
+def sketch_quantile(stats, edges, q):
+    """Approximate quantile from the histogram sketch, interpolating linearly inside a bin."""
+    counts = np.asarray(stats.get('counts', []), dtype=float)
+    if stats['count'] == 0 or counts.sum() == 0:
+        return None
+    bounds = [stats['min']] + list(edges) + [stats['max']]
+    target = q * counts.sum()
+    cumulative = np.cumsum(counts)
+    b = int(np.searchsorted(cumulative, target))
+    lo, hi = bounds[b], bounds[b + 1]
+    lo, hi = max(lo, stats['min']), min(hi, stats['max'])
+    before = cumulative[b - 1] if b else 0.0
+    frac = (target - before) / counts[b] if counts[b] else 0.0
+    return float(lo + frac * (hi - lo))
+
+
+def psi(expected_counts, actual_counts, eps=1e-4):
+    expected = np.asarray(expected_counts, dtype=float)
+    actual = np.asarray(actual_counts, dtype=float)
+    expected = np.clip(expected / expected.sum(), eps, None)
+    actual = np.clip(actual / actual.sum(), eps, None)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def training_profile(X, residuals):
+    """
+    The training distribution a model's live inputs and errors are compared against:
+    per-feature moments plus decile edges and counts, and the same for its held-out
+    residuals. Stored in the model artifact by model.py.
+    """
+    def column_profile(values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(values, PROFILE_QUANTILES)).tolist() if len(values) else []
+        stats = summarize(values, edges)
+        stats['edges'] = edges
+        stats['median'] = float(np.median(values)) if len(values) else None
+        return stats
+
+    return {
+        'features': {c: column_profile(X[c].to_numpy(dtype=float)) for c in X.columns},
+        'residual': column_profile(residuals),
+    }
+
+
+def load_training_profiles():
+    """(profiles, signatures) per target; a profile is None for models saved before profiling."""
+    from tree_export import load_serving_model, model_signature
+    profiles, signatures = {}, {}
+    for target, mfile in MODEL_FILES.items():
+        if not os.path.exists(mfile):
+            continue
+        profiles[target] = load_serving_model(mfile).get('training_profile')
+        signatures[target] = model_signature(mfile)
+    return profiles, signatures
+
+
+class DriftMonitor:
+    """
+    Running statistics of what the live models see and how wrong they are.
+
+    Each projection's model inputs and predictions wait in `pending` until the game's
+    box score lands (in the refreshed logs or from the watcher). The game is then folded
+    into per-feature and per-residual summaries, which are fixed-size whatever the
+    history. Re-projecting a game replaces its pending entry, so every game counts
+    once. A target's statistics restart when its model file changes.
+    """
+
+    def __init__(self, path=DRIFT_STATE_FILE):
+        self.path = path
+        self.profiles, signatures = load_training_profiles()
+        state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+        self.targets = {}
+        for target, signature in signatures.items():
+            saved = state.get('targets', {}).get(target)
+            if saved is None or saved.get('signature') != signature:
+                saved = {'signature': signature, 'features': {}, 'residual': None}
+            self.targets[target] = saved
+        self.pending = state.get('pending', {})
+
+    def edges(self, target, feature=None):
+        profile = self.profiles.get(target)
+        if profile is None:
+            return None
+        section = profile['residual'] if feature is None else profile['features'].get(feature)
+        return section['edges'] if section else None
+
+    def record_projection(self, player_id, game_date, inputs, preds):
+        """Remember what each model saw and predicted for this player's upcoming game."""
+        key = f"{int(player_id)}|{pd.Timestamp(game_date).date()}"
+        self.pending[key] = {
+            'inputs': {c: (None if pd.isna(v) else round(float(v), 4)) for c, v in inputs.items()},
+            'preds': {t: round(float(p), 3) for t, p in preds.items()},
+        }
+
+    def resolve(self, rows):
+        """
+        Fold every pending projection whose game appears in `rows` (player log rows with
+        PLAYER_ID, GAME_DATE and box-score stats) into the running statistics.
+        """
+        if not self.pending or rows is None or rows.empty:
+            return 0
+        pending_players = {int(k.split('|')[0]) for k in self.pending}
+        rows = rows[rows['PLAYER_ID'].astype(int).isin(pending_players)].copy()
+        if rows.empty:
+            return 0
+        rows['KEY'] = (rows['PLAYER_ID'].astype(int).astype(str) + '|' +
+                       pd.to_datetime(rows['GAME_DATE']).dt.date.astype(str))
+        rows = rows[rows['KEY'].isin(self.pending.keys())].drop_duplicates('KEY')
+        if rows.empty:
+            return 0
+
+        rows = rows.set_index('KEY')
+        for stat in ['PTS', 'REB', 'AST']:
+            rows[stat] = pd.to_numeric(rows[stat], errors='coerce')
+        rows['PRA'] = rows['PTS'] + rows['REB'] + rows['AST']
+        entries = [self.pending.pop(key) for key in rows.index]
+
+        for target, tracked in self.targets.items():
+            actual = rows[target].to_numpy(dtype=float)
+            pred = np.array([e['preds'].get(target, np.nan) for e in entries], dtype=float)
+            tracked['residual'] = merge_stats(tracked['residual'] or summarize([], self.edges(target)),
+                                              summarize(actual - pred, self.edges(target)))
+            features = self.profiles[target]['features'] if self.profiles.get(target) else entries[0]['inputs']
+            for feature in features:
+                values = [e['inputs'].get(feature) for e in entries]
+                values = np.array([np.nan if v is None else v for v in values], dtype=float)
+                current = tracked['features'].get(feature) or summarize([], self.edges(target, feature))
+                tracked['features'][feature] = merge_stats(current, summarize(values, self.edges(target, feature)))
+        return len(entries)
+
+    def save(self):
+        # Unresolvable projections (player sat, got traded) must not pile up; measured from
+        # the newest projected game so replaying an old season prunes the same way
+        if self.pending:
+            dates = {k: pd.Timestamp(k.split('|')[1]) for k in self.pending}
+            cutoff = max(dates.values()) - pd.Timedelta(days=PENDING_DAYS)
+            self.pending = {k: v for k, v in self.pending.items() if dates[k] >= cutoff}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'targets': self.targets, 'pending': self.pending}, f)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        """Per target: live vs training residual and every feature's shift, sorted by PSI."""
+        report = {}
+        for target, tracked in self.targets.items():
+            profile = self.profiles.get(target)
+            entry = {'live_games': tracked['residual']['count'] if tracked['residual'] else 0,
+                     'pending': len(self.pending), 'residual': None, 'features': []}
+            residual = tracked['residual']
+            if residual and residual['count']:
+                entry['residual'] = {
+                    'live_bias': round(residual['mean'], 3),
+                    'live_std': round(std(residual), 3),
+                    'train_bias': round(profile['residual']['mean'], 3) if profile else None,
+                    'train_std': round(std(profile['residual']), 3) if profile else None,
+                    'psi': (round(psi(profile['residual']['counts'], residual['counts']), 4)
+                            if profile and residual['count'] >= MIN_LIVE_COUNT else None),
+                }
+            for feature, live in tracked['features'].items():
+                train = profile['features'].get(feature) if profile else None
+                if not train or live['count'] < MIN_LIVE_COUNT:
+                    continue
+                train_std = std(train)
+                entry['features'].append({
+                    'feature': feature,
+                    'live_count': live['count'],
+                    'train_mean': round(train['mean'], 4),
+                    'live_mean': round(live['mean'], 4),
+                    # Mean shift in training standard deviations
+                    'shift_sd': round((live['mean'] - train['mean']) / train_std, 3) if train_std else 0.0,
+                    'train_median': train['median'],
+                    'live_median': sketch_quantile(live, train['edges'], 0.5),
+                    'psi': round(psi(train['counts'], live['counts']), 4),
+                })
+            entry['features'].sort(key=lambda f: f['psi'], reverse=True)
+            report[target] = entry
+        return report
+
+    def print_summary(self, top=5):
+        report = self.report()
+        for target, entry in report.items():
+            if self.profiles.get(target) is None:
+                print(f"  {target}: model saved without a training profile; retrain (model.py) to compare drift.")
+                continue
+            if not entry['live_games']:
+                print(f"  {target}: no resolved games yet ({entry['pending']} projections pending).")
+                continue
+            residual = entry['residual']
+            drifting = [f for f in entry['features'] if f['psi'] >= PSI_WARN]
+            print(f"  {target}: {entry['live_games']} live games | bias {residual['live_bias']:+.2f} "
+                  f"(train {residual['train_bias']:+.2f}) | error sd {residual['live_std']:.2f} "
+                  f"(train {residual['train_std']:.2f}) | residual PSI {residual['psi'] if residual['psi'] is not None else 'n/a'} "
+                  f"| {len(drifting)} features with PSI >= {PSI_WARN}")
+            for f in drifting[:top]:
+                level = 'DRIFT' if f['psi'] >= PSI_DRIFT else 'warn'
+                print(f"      [{level}] {f['feature']}: PSI {f['psi']:.3f}, mean {f['train_mean']:.2f} -> "
+                      f"{f['live_mean']:.2f} ({f['shift_sd']:+.2f} sd)")
+        return report
+
+    def write_report(self):
+        report = self.report()
+        tmp_path = DRIFT_REPORT_FILE + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, DRIFT_REPORT_FILE)
+        return report
+
+
+if __name__ == "__main__":
+    import sys
+    if '--reset' in sys.argv[1:]:
+        if os.path.exists(DRIFT_STATE_FILE):
+            os.remove(DRIFT_STATE_FILE)
+        print(f"Cleared {DRIFT_STATE_FILE}.")
+    else:
+        monitor = DriftMonitor()
+        print("Drift against each model's training distribution:")
+        monitor.print_summary(top=10)
+        monitor.write_report()
+        print(f"Full report written to {DRIFT_REPORT_FILE} "
+              f"(state {os.path.getsize(DRIFT_STATE_FILE) if os.path.exists(DRIFT_STATE_FILE) else 0} bytes).")
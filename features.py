@@ -55,65 +55,225 @@ def haversine(lat1, lon1, lat2, lon2):
     return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
 
-def engineered_features_for_player(df):
-    """
-    Given a raw DataFrame of a player's game logs (e.g., from nba_api), 
-    engineer the required features.
-    """
-    df = df.copy()
-    # Sort chronologically
-    df['GAME_DATE'] = pd.to_datetime(df['GAME_DATE'])
-    df = df.sort_values('GAME_DATE').reset_index(drop=True)
-    
-    # Target variables: PTS, FG3M, AST, REB, and PRA (Points + Rebounds + Assists)
-    # Ensure they are numeric
-    for stat in ['PTS', 'REB', 'AST', 'FG3M']:
-        if stat in df.columns:
-            df[stat] = pd.to_numeric(df[stat], errors='coerce').fillna(0)
-            
+# Target stats that get trailing rolling averages
+TARGETS = ['PTS', 'FG3M', 'AST', 'REB', 'PRA']
+# Trailing windows (in games) for every target; 'season' means season-to-date.
+# EWM_SPANS adds exponentially weighted means ({target}_ewm{span}). Every extra entry
+# costs one vectorized pass over the per-player cumulative sums, not a new rolling call.
+ROLLING_WINDOWS = [3, 5, 10]
+EWM_SPANS = []
+
+# Model inputs shared by the training (model.prep_for_modeling) and serving
+# (predict.py / prepare_projections.py) paths so they can never drift apart
+CONTEXT_FEATURES = ['B2B_FLAG', 'GAMES_LAST_7D', 'ALTITUDE', 'HIGH_ALTITUDE_FLAG', 'TRAVEL_DIST']
+OPP_METRIC_FEATURES = ['OPP_PACE', 'OPP_DEF_RATING', 'OPP_EFG_PCT', 'OPP_TM_TOV_PCT', 'OPP_DREB_PCT']
+DUMMY_COLUMNS = ['TRAVEL_DIR', 'TZ_SHIFT', 'OPP_ARCHETYPE', 'PLAYER_ROLE', 'ROLE_ARCHETYPE']
+# Categoricals whose 'None' (not yet known) value gets no dummy of its own
+UNKNOWN_DUMMY_COLUMNS = ['OPP_ARCHETYPE', 'PLAYER_ROLE', 'ROLE_ARCHETYPE']
+# Cross-player features from teammates.py; the serving paths (one player's frame) get
+# his team's expected availability for its next game instead
+TEAMMATE_FEATURES = ['TEAM_MIN_ABSENT', 'TEAM_USG_ABSENT', 'TOP2_SCORER_OUT']
+# Nodes whose output for a game depends on that game's MATCHUP (where it's played and
+# against whom); predict.py's scenario grid recomputes only these per scenario
+MATCHUP_NODES = ['arena', 'travel', 'opponent', 'role_matchup']
+# Nodes whose output for a game depends only on the dates of the games around it;
+# season_projections runs these and MATCHUP_NODES over the scheduled (future) rows
+SCHEDULE_NODES = ['rest', 'games_last_7d']
+# Nodes process_all_files runs once on the concatenated master instead of per player
+# (both backends share them; features_polars has no expressions for them)
+LEAGUE_WIDE_NODES = ['opponent', 'player_role', 'role_matchup', 'teammates']
+# process_all_files concatenates this many players' frames at a time while it loops.
+# Thousands of small frames left alive until one final concat fragment the heap, so
+# the memory they free is never handed back for the master's large arrays
+MASTER_CHUNK_PLAYERS = 256
+
+
+def rolling_column_name(target, window):
+    if window == 'season':
+        return f'{target}_season_avg'
+    return f'{target}_{window}g_avg'
+
+
+def rolling_feature_names(target):
+    names = [rolling_column_name(target, w) for w in ROLLING_WINDOWS]
+    return names + [f'{target}_ewm{span}' for span in EWM_SPANS]
+
+
+# -------------------------------------------------------------
+# Feature Registry
+# -------------------------------------------------------------
+# Every engineered feature group is a node that declares the columns it produces,
+# the nodes it depends on and the function that computes it. compute_features()
+# resolves the requested columns to the minimal sub-graph and runs only that, in
+# registration order (which is always a valid topological order, since a node can
+# only depend on nodes registered before it).
+FEATURE_REGISTRY = {}
+
+
+def register_feature(name, inputs=(), outputs=(), prefixes=()):
+    def decorator(func):
+        for dep in inputs:
+            if dep not in FEATURE_REGISTRY:
+                raise ValueError(f"Feature node '{name}' depends on unregistered node '{dep}'")
+        FEATURE_REGISTRY[name] = {
+            'inputs': list(inputs),
+            'outputs': list(outputs),
+            'prefixes': list(prefixes),
+            'compute': func,
+        }
+        return func
+    return decorator
+
+
+def node_for_column(col):
+    """Find the node producing `col`, including dummy-encoded names like TRAVEL_DIR_Westward."""
+    for name, node in FEATURE_REGISTRY.items():
+        if col in node['outputs']:
+            return name
+    for dummy_col in DUMMY_COLUMNS:
+        if col.startswith(f'{dummy_col}_'):
+            return node_for_column(dummy_col)
+    for name, node in FEATURE_REGISTRY.items():
+        if any(col.startswith(p) for p in node['prefixes']):
+            return name
+    return None
+
+
+def resolve_feature_nodes(columns=None):
+    """Return the node names (in run order) needed to produce `columns`; None means everything."""
+    if columns is None:
+        return list(FEATURE_REGISTRY)
+    needed = set()
+    stack = [n for n in (node_for_column(c) for c in columns) if n is not None]
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(FEATURE_REGISTRY[name]['inputs'])
+    return [name for name in FEATURE_REGISTRY if name in needed]
+
+
+@register_feature('PRA', outputs=['PRA'])
+def compute_pra(df):
     # Create PRA if AST and REB exist
     if 'AST' in df.columns and 'REB' in df.columns and 'PTS' in df.columns:
         df['PRA'] = df['PTS'] + df['REB'] + df['AST']
-        
-    # 1. Rolling averages (shifted to avoid leakage)
-    targets = ['PTS', 'FG3M', 'AST', 'REB', 'PRA']
-    for target in targets:
-        if target in df.columns:
-            # shift by 1 to make sure current game stats are not included in rolling average
-            df[f'{target}_3g_avg'] = df[target].shift(1).rolling(window=3, min_periods=1).mean()
-            df[f'{target}_5g_avg'] = df[target].shift(1).rolling(window=5, min_periods=1).mean()
-            df[f'{target}_10g_avg'] = df[target].shift(1).rolling(window=10, min_periods=1).mean()
-        
-    # 2. Fatigue Indicators
+    return df
+
+
+def trailing_window_means(values, windows, ewm_spans=(), segment_ids=None):
+    """
+    Rolling-stat kernel: trailing means of every column of `values` (n_games x n_stats,
+    chronological) that exclude the current game, i.e. the same numbers as
+    `series.shift(1).rolling(w, min_periods=1).mean()` and `series.shift(1).ewm(span=s).mean()`.
+
+    All windows come from one exclusive cumulative sum (and count, so NaNs are skipped
+    like pandas does): the mean over the previous w games is (cs[i] - cs[i-w]) / count.
+    The 'season' window uses the first row of each `segment_ids` run as its lower bound.
+    Returns {window_or_('ewm', span): n_games x n_stats array}.
+    """
+    values = np.asarray(values, dtype=float)
+    n = values.shape[0]
+    valid = ~np.isnan(values)
+
+    # cs[i] = sum of games 0..i-1 -> already "shifted by one game"
+    cs = np.zeros((n + 1,) + values.shape[1:])
+    np.cumsum(np.where(valid, values, 0.0), axis=0, out=cs[1:])
+    cnt = np.zeros((n + 1,) + values.shape[1:])
+    np.cumsum(valid, axis=0, out=cnt[1:])
+
+    idx = np.arange(n)
+    out = {}
+    for w in windows:
+        if w == 'season':
+            if segment_ids is None:
+                lo = np.zeros(n, dtype=int)
+            else:
+                seg = np.asarray(segment_ids)
+                is_start = np.ones(n, dtype=bool)
+                is_start[1:] = seg[1:] != seg[:-1]
+                lo = np.maximum.accumulate(np.where(is_start, idx, 0))
+        else:
+            lo = np.maximum(idx - int(w), 0)
+        total = cs[idx] - cs[lo]
+        count = cnt[idx] - cnt[lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[w] = np.where(count > 0, total / count, np.nan)
+
+    if ewm_spans:
+        # y_t = x_t + decay * y_{t-1} is a first-order IIR filter; lfilter runs it in C
+        from scipy.signal import lfilter
+        shifted = np.full_like(values, np.nan)
+        shifted[1:] = values[:-1]
+        shifted_valid = ~np.isnan(shifted)
+        for span in ewm_spans:
+            decay = 1.0 - 2.0 / (span + 1.0)
+            num = lfilter([1.0], [1.0, -decay], np.where(shifted_valid, shifted, 0.0), axis=0)
+            den = lfilter([1.0], [1.0, -decay], shifted_valid.astype(float), axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[('ewm', span)] = np.where(den > 0, num / den, np.nan)
+    return out
+
+
+# 1. Rolling averages (shifted to avoid leakage), all targets in one kernel pass
+@register_feature('rolling', inputs=['PRA'], outputs=[c for t in TARGETS for c in rolling_feature_names(t)])
+def compute_rolling(df):
+    targets = [t for t in TARGETS if t in df.columns]
+    if not targets:
+        return df
+    segments = df['SEASON_ID'].to_numpy() if 'SEASON_ID' in df.columns else None
+    stats = trailing_window_means(df[targets].to_numpy(dtype=float), ROLLING_WINDOWS, EWM_SPANS, segments)
+
+    new_cols = {}
+    for j, target in enumerate(targets):
+        for w in ROLLING_WINDOWS:
+            new_cols[rolling_column_name(target, w)] = stats[w][:, j]
+        for span in EWM_SPANS:
+            new_cols[f'{target}_ewm{span}'] = stats[('ewm', span)][:, j]
+    for col, arr in new_cols.items():
+        df[col] = arr
+    return df
+
+
+# 2. Fatigue Indicators
+@register_feature('rest', outputs=['DAYS_REST', 'B2B_FLAG'])
+def compute_rest(df):
     df['DAYS_REST'] = df['GAME_DATE'].diff().dt.days
     df['B2B_FLAG'] = (df['DAYS_REST'] == 1).astype(int) # 1 day difference means back-to-back
-    
+    return df
+
+
+@register_feature('games_last_7d', outputs=['GAMES_LAST_7D'])
+def compute_games_last_7d(df):
     # Trailing 7-day games played (including current game, up to yesterday would be 6 days)
     # We want trailing games in previous 7 days
     # Since rolling on datetimes is tricky with irregular intervals, we can use a custom approach:
     # Set index to datetime to use '7D' rolling sum
-    
     temp_df = df[['GAME_DATE']].copy()
     temp_df['count'] = 1
     temp_df = temp_df.set_index('GAME_DATE')
     # Rolling 7 days, shift by 1 day (so it only counts games in the last 7 days excluding today)
     temp_df = temp_df.rolling('7D').sum()
     df['GAMES_LAST_7D'] = temp_df['count'].values - 1 # subtract current game
-    
-    # 3. Geospatial & Travel Burden
-    # Determine the home team of the current game to get lat/lon
+    return df
+
+
+# 3. Geospatial & Travel Burden
+def get_arena_team(matchup):
     # MATCHUP format: 'LAL vs. BOS' (home) or 'LAL @ BOS' (away)
-    def get_arena_team(row):
-        matchup = row['MATCHUP']
-        # The team playing at home is the one after '@', or if it's 'vs.' it's the team before 'vs.'
-        if '@' in matchup:
-            parts = matchup.split(' @ ')
-            return parts[1]
-        else:
-            parts = matchup.split(' vs. ')
-            return parts[0]
-            
-    df['HOME_TEAM'] = df.apply(get_arena_team, axis=1)
+    # The team playing at home is the one after '@', or if it's 'vs.' it's the team before 'vs.'
+    if '@' in matchup:
+        parts = matchup.split(' @ ')
+        return parts[1]
+    else:
+        parts = matchup.split(' vs. ')
+        return parts[0]
+
+
+@register_feature('arena', outputs=['HOME_TEAM', 'LAT', 'LON', 'ALTITUDE', 'TZ', 'HIGH_ALTITUDE_FLAG'])
+def compute_arena(df):
+    # Determine the home team of the current game to get lat/lon
+    df['HOME_TEAM'] = df['MATCHUP'].map(get_arena_team)
     
     # Map coordinates
     df['LAT'] = df['HOME_TEAM'].map(lambda x: ARENAS.get(x, {}).get('lat', np.nan))
@@ -123,125 +283,360 @@ def engineered_features_for_player(df):
     
     # High altitude flag
     df['HIGH_ALTITUDE_FLAG'] = df['HOME_TEAM'].isin(['DEN', 'UTA']).astype(int)
-    
+    return df
+
+
+@register_feature('travel', inputs=['arena'], outputs=['PREV_LAT', 'PREV_LON', 'PREV_TZ', 'TRAVEL_DIST', 'TRAVEL_DIR', 'TZ_SHIFT'])
+def compute_travel(df):
     # Calculate Travel Distance and Direction
     df['PREV_LAT'] = df['LAT'].shift(1)
     df['PREV_LON'] = df['LON'].shift(1)
     df['PREV_TZ'] = df['TZ'].shift(1)
     
-    def calc_dist(row):
-        if pd.isna(row['PREV_LAT']) or pd.isna(row['LAT']):
-            return 0.0
-        return haversine(row['PREV_LAT'], row['PREV_LON'], row['LAT'], row['LON'])
-        
-    df['TRAVEL_DIST'] = df.apply(calc_dist, axis=1)
+    # Games are only ever played in ~30 arenas, so the distance is computed once per
+    # distinct (previous arena, arena) pair rather than once per row
+    dist = np.zeros(len(df))
+    moved = (df['PREV_LAT'].notna() & df['LAT'].notna()).to_numpy()
+    if moved.any():
+        codes, pairs = pd.MultiIndex.from_frame(df.loc[moved, ['PREV_LAT', 'PREV_LON', 'LAT', 'LON']]).factorize()
+        dist[moved] = np.array([haversine(*pair) for pair in pairs])[codes]
+    df['TRAVEL_DIST'] = dist
     
     # Eastward vs Westward travel
-    # Lon difference: positive means went East, negative means went West
-    def calc_direction(row):
-        if pd.isna(row['PREV_LON']) or pd.isna(row['LON']):
-            return 'None'
-        diff = row['LON'] - row['PREV_LON']
-        if diff > 0.5:
-            return 'Eastward'
-        elif diff < -0.5:
-            return 'Westward'
-        return 'None'
-        
-    df['TRAVEL_DIR'] = df.apply(calc_direction, axis=1)
+    # Lon difference: positive means went East, negative means went West (NaN: 'None')
+    diff = (df['LON'] - df['PREV_LON']).to_numpy()
+    df['TRAVEL_DIR'] = np.select([diff > 0.5, diff < -0.5], ['Eastward', 'Westward'], 'None').astype(object)
     
     # Time zone shift bucketing {0, 1, 2, 3+}
-    def calc_tz_shift(row):
-        if pd.isna(row['PREV_TZ']) or pd.isna(row['TZ']):
-            return '0'
-        shift = abs(row['TZ'] - row['PREV_TZ'])
-        if shift >= 3:
-            return '3+'
-        return str(int(shift))
-        
-    df['TZ_SHIFT'] = df.apply(calc_tz_shift, axis=1)
+    shift = (df['TZ'] - df['PREV_TZ']).abs()
+    buckets = shift.fillna(0).clip(upper=3).astype(int).astype(str).to_numpy(dtype=object)
+    df['TZ_SHIFT'] = np.where(shift.to_numpy() >= 3, '3+', buckets).astype(object)
+    return df
+
+
+# -------------------------------------------------------------
+# OPTION A: Team-Level Defensive Archetypes
+# -------------------------------------------------------------
+TEAM_CLUSTERS_FILE = os.path.join(PROCESSED_DATA_DIR, "team_clusters.parquet")
+_team_context_cache = {}
+
+
+def load_team_context():
+    """
+    Load (abbr_to_id, prefixed team cluster table) once per process instead of once
+    per player. Returns None when team_clustering.py hasn't been run yet.
+    """
+    if not os.path.exists(TEAM_CLUSTERS_FILE):
+        return None
+    mtime = os.path.getmtime(TEAM_CLUSTERS_FILE)
+    cached = _team_context_cache.get(TEAM_CLUSTERS_FILE)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    from nba_api.stats.static import teams
+    nba_teams = teams.get_teams()
+    abbr_to_id = {t['abbreviation']: t['id'] for t in nba_teams}
     
-    # -------------------------------------------------------------
-    # OPTION A: Team-Level Defensive Archetypes
-    # -------------------------------------------------------------
-    team_cache_file = os.path.join(PROCESSED_DATA_DIR, "team_clusters.parquet")
-    if os.path.exists(team_cache_file):
-        try:
-            from nba_api.stats.static import teams
-            nba_teams = teams.get_teams()
-            abbr_to_id = {t['abbreviation']: t['id'] for t in nba_teams}
-            
-            def get_season_str(date_obj):
-                year = date_obj.year
-                if date_obj.month >= 10:
-                    return f"{year}-{str(year+1)[-2:]}"
-                else:
-                    return f"{year-1}-{str(year)[-2:]}"
-                    
-            df['SEASON'] = df['GAME_DATE'].apply(get_season_str)
-            
-            def get_opp_abbr(row):
-                matchup = row.get('MATCHUP', '')
-                if ' @ ' in matchup:
-                    return matchup.split(' @ ')[1].strip()
-                elif ' vs. ' in matchup:
-                    return matchup.split(' vs. ')[1].strip()
-                return ''
-                
-            df['OPP_ABBR'] = df.apply(get_opp_abbr, axis=1)
-            df['OPP_TEAM_ID'] = df['OPP_ABBR'].map(abbr_to_id)
-            
-            team_df = pd.read_parquet(team_cache_file)
-            # Prefix the metric columns so we know they are the opponent's
-            rename_dict = {}
-            for col in team_df.columns:
-                if col not in ['TEAM_ID', 'TEAM_NAME', 'SEASON', 'OPP_ARCHETYPE']:
-                    rename_dict[col] = f"OPP_{col}"
-            team_df = team_df.rename(columns=rename_dict)
-            
-            # Merge on Opponent Team ID and Season
-            df = pd.merge(
-                df, 
-                team_df.drop(columns=['TEAM_NAME'], errors='ignore'), 
-                left_on=['OPP_TEAM_ID', 'SEASON'], 
-                right_on=['TEAM_ID', 'SEASON'], 
-                how='left'
-            )
-            df = df.drop(columns=['TEAM_ID'], errors='ignore')
-        except Exception as e:
-            print(f"Warning: Failed to merge defensive archetypes: {e}")
+    team_df = pd.read_parquet(TEAM_CLUSTERS_FILE)
+    # Prefix the metric columns so we know they are the opponent's
+    rename_dict = {'TEAM_ID': 'OPP_TEAM_ID'}
+    for col in team_df.columns:
+        if col not in ['TEAM_ID', 'TEAM_NAME', 'SEASON', 'OPP_ARCHETYPE']:
+            rename_dict[col] = f"OPP_{col}"
+    team_df = team_df.rename(columns=rename_dict).drop(columns=['TEAM_NAME'], errors='ignore')
+
+    context = (abbr_to_id, team_df)
+    _team_context_cache[TEAM_CLUSTERS_FILE] = (mtime, context)
+    return context
+
+
+def get_season_str(date_obj):
+    year = date_obj.year
+    if date_obj.month >= 10:
+        return f"{year}-{str(year+1)[-2:]}"
+    else:
+        return f"{year-1}-{str(year)[-2:]}"
+
+
+def get_opp_abbr(matchup):
+    if ' @ ' in matchup:
+        return matchup.split(' @ ')[1].strip()
+    elif ' vs. ' in matchup:
+        return matchup.split(' vs. ')[1].strip()
+    return ''
+
+
+def load_point_in_time_context():
+    """
+    Trailing (as-of) opponent metrics built from the team game logs, cached per
+    process and keyed on the inputs' mtimes. None when team_ingestion.py hasn't
+    pulled the team game logs yet, in which case the season-level merge is used.
+    """
+    import opponent_context
+    from team_clustering import SCALER_FILE, KMEANS_FILE
+
+    path = opponent_context.TEAM_GAMES_FILE
+    if not os.path.exists(path):
+        return None
+    key = tuple(os.path.getmtime(f) if os.path.exists(f) else None for f in [path, SCALER_FILE, KMEANS_FILE])
+    cached = _team_context_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    trailing = opponent_context.load_trailing_team_metrics(path)
+    _team_context_cache[path] = (key, trailing)
+    return trailing
+
+
+@register_feature('opponent', outputs=['SEASON', 'OPP_ABBR', 'OPP_TEAM_ID', 'OPP_ARCHETYPE'], prefixes=['OPP_'])
+def compute_opponent(df):
+    try:
+        context = load_team_context()
+        if context is None:
+            return df
+        abbr_to_id, team_df = context
+
+        # Preferred: the opponent's metrics as of the day before this game, so a
+        # December game never sees the opponent's April (full-season) numbers
+        trailing = load_point_in_time_context()
+        if trailing is not None:
+            from opponent_context import attach_opponent_metrics
+            return attach_opponent_metrics(df, trailing, abbr_to_id)
+
+        from opponent_context import season_from_dates
+        df['SEASON'] = season_from_dates(df['GAME_DATE']).values
+        df['OPP_ABBR'] = df['MATCHUP'].fillna('').map(get_opp_abbr)
+        df['OPP_TEAM_ID'] = df['OPP_ABBR'].map(abbr_to_id)
+        
+        # Merge on Opponent Team ID and Season
+        df = pd.merge(df, team_df, on=['OPP_TEAM_ID', 'SEASON'], how='left')
+    except Exception as e:
+        print(f"Warning: Failed to merge defensive archetypes: {e}")
+    return df
+
+
+def load_role_models():
+    """The saved player role (scaler, kmeans), cached per process and keyed on the files' mtimes."""
+    from player_clustering import SCALER_FILE, KMEANS_FILE, load_role_models as load_saved
+    key = tuple(os.path.getmtime(f) if os.path.exists(f) else None for f in [SCALER_FILE, KMEANS_FILE])
+    cached = _team_context_cache.get(KMEANS_FILE)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    models = load_saved()
+    _team_context_cache[KMEANS_FILE] = (key, models)
+    return models
+
+
+@register_feature('player_role', outputs=['PLAYER_ROLE'])
+def compute_player_role(df):
+    # Role from the previous games' box scores (player_clustering.py); 'None' until
+    # the role clustering has been built or the player has ROLE_MIN_GAMES games
+    try:
+        from player_clustering import assign_player_roles
+        return assign_player_roles(df, load_role_models())
+    except Exception as e:
+        print(f"Warning: Failed to assign player roles: {e}")
+        df['PLAYER_ROLE'] = 'None'
+        return df
+
+
+@register_feature('role_matchup', inputs=['player_role', 'opponent'], outputs=['ROLE_ARCHETYPE'])
+def compute_role_matchup(df):
+    # Role x opponent archetype as one categorical, dummy-encoded like OPP_ARCHETYPE,
+    # so the models see e.g. a rim-running big against a rim-protecting defense directly
+    role = df['PLAYER_ROLE'].fillna('None').astype(str) if 'PLAYER_ROLE' in df.columns else pd.Series('None', index=df.index)
+    arch = df['OPP_ARCHETYPE'].fillna('None').astype(str) if 'OPP_ARCHETYPE' in df.columns else pd.Series('None', index=df.index)
+    df['ROLE_ARCHETYPE'] = np.where((role == 'None') | (arch == 'None'), 'None', role + '_' + arch)
+    return df
+
+
+def load_team_availability():
+    """teammates.TEAM_AVAILABILITY_FILE, cached per process and keyed on its mtime (None if missing)."""
+    from teammates import TEAM_AVAILABILITY_FILE
+    if not os.path.exists(TEAM_AVAILABILITY_FILE):
+        return None
+    mtime = os.path.getmtime(TEAM_AVAILABILITY_FILE)
+    cached = _team_context_cache.get(TEAM_AVAILABILITY_FILE)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    table = pd.read_parquet(TEAM_AVAILABILITY_FILE)
+    _team_context_cache[TEAM_AVAILABILITY_FILE] = (mtime, table)
+    return table
+
+
+@register_feature('teammates', outputs=TEAMMATE_FEATURES)
+def compute_teammates(df):
+    # League-wide frames (the master) get each game's real availability from every
+    # player's appearances; a single player's frame gets his team's expected
+    # availability for its next game, so serving never feeds the models a 0 they
+    # were not trained on
+    from teammates import add_teammate_features, attach_expected_availability
+    if 'PLAYER_ID' in df.columns and df['PLAYER_ID'].nunique() > 1:
+        return add_teammate_features(df)
+    return attach_expected_availability(df, load_team_availability())
+
+
+def compute_features(df, columns=None, skip=()):
+    """
+    Engineer features for a raw DataFrame of a player's game logs (e.g., from nba_api).
+    `columns` limits the work to the sub-graph needed for those output/model columns
+    (dummy names such as TZ_SHIFT_1 are understood); None computes every feature.
+    Nodes named in `skip` are left out (process_all_files runs LEAGUE_WIDE_NODES on the master).
+    """
+    df = df.copy()
+    # Sort chronologically
+    df['GAME_DATE'] = pd.to_datetime(df['GAME_DATE'])
+    df = df.sort_values('GAME_DATE').reset_index(drop=True)
     
+    # Target variables: PTS, FG3M, AST, REB, and PRA (Points + Rebounds + Assists)
+    # Ensure they are numeric
+    for stat in ['PTS', 'REB', 'AST', 'FG3M']:
+        if stat in df.columns:
+            df[stat] = pd.to_numeric(df[stat], errors='coerce').fillna(0)
+
+    for name in resolve_feature_nodes(columns):
+        if name in skip:
+            continue
+        df = FEATURE_REGISTRY[name]['compute'](df)
     return df
 
 
-def process_all_files():
-    print("Starting feature engineering phase...")
-    parquet_files = glob.glob(os.path.join(DATA_DIR, "*.parquet"))
+def engineered_features_for_player(df):
+    """
+    Given a raw DataFrame of a player's game logs (e.g., from nba_api), 
+    engineer the required features.
+    """
+    return compute_features(df)
+
+
+# -------------------------------------------------------------
+# Model feature definitions (shared by train and serve)
+# -------------------------------------------------------------
+def model_feature_columns(target_col, available_columns):
+    """Training-time feature list for `target_col`, given the (dummy-encoded) columns present."""
+    features = rolling_feature_names(target_col) + list(CONTEXT_FEATURES)
     
+    # Add optional opponent metrics and teammate availability if present
+    features += [f for f in OPP_METRIC_FEATURES if f in available_columns]
+    features += [f for f in TEAMMATE_FEATURES if f in available_columns]
+            
+    # Add dummy columns that were generated
+    for col in available_columns:
+        if any(col.startswith(f'{d}_') for d in DUMMY_COLUMNS):
+            features.append(col)
+    return features
+
+
+def encode_model_rows(df, expected_features=None):
+    """
+    Turn engineered rows into the numeric matrix a saved model expects: numeric
+    features are copied (missing ones become 0) and categorical columns are one-hot
+    encoded against the dummy names in `expected_features`. When no feature list is
+    given, every model-relevant column present in `df` is returned.
+    """
+    if expected_features is None:
+        expected_features = [c for t in TARGETS for c in rolling_feature_names(t) if c in df.columns]
+        expected_features += [c for c in CONTEXT_FEATURES + OPP_METRIC_FEATURES + TEAMMATE_FEATURES if c in df.columns]
+        for col in DUMMY_COLUMNS:
+            if col in df.columns:
+                values = df[col].dropna().astype(str).unique()
+                expected_features += [f'{col}_{v}' for v in values if v != 'None' or col not in UNKNOWN_DUMMY_COLUMNS]
+
+    encoded = {}
+    for feat in expected_features:
+        if feat in df.columns:
+            encoded[feat] = pd.to_numeric(df[feat], errors='coerce').astype(float).values
+            continue
+        dummy_col = next((d for d in DUMMY_COLUMNS if feat.startswith(f'{d}_') and d in df.columns), None)
+        if dummy_col is not None:
+            value = feat[len(dummy_col) + 1:]
+            encoded[feat] = (df[dummy_col].astype(str) == value).astype(float).values
+        else:
+            encoded[feat] = np.zeros(len(df))
+    return pd.DataFrame(encoded, index=df.index, columns=expected_features)
+
+
+def process_all_files(backend='pandas'):
+    """
+    Engineer every player's logs into processed_data/. backend='polars' runs the
+    per-player nodes as one lazy query over the whole raw store (features_polars.py)
+    and produces the same master dataset.
+    """
+    print("Starting feature engineering phase...")
+    parquet_files = sorted(glob.glob(os.path.join(DATA_DIR, "*_logs.parquet")))
+
+    if backend == 'polars' and parquet_files:
+        try:
+            from features_polars import compute_player_features_polars
+        except ImportError as e:
+            print(f"Warning: polars backend unavailable ({e}); using pandas.")
+        else:
+            master_df, lengths = compute_player_features_polars(parquet_files)
+            save_paths = [os.path.join(PROCESSED_DATA_DIR, os.path.basename(f)) for f in parquet_files]
+            frames = [master_df]
+            del master_df
+            finish_master(frames, save_paths, lengths)
+            return
+
     all_processed = []
+    pending = []
+    save_paths = []
+    lengths = []
     
+    # Per-player work (rolling windows, rest, travel) first; opponent context is then
+    # attached to every row in one league-wide as-of join instead of once per player
     for idx, f in enumerate(parquet_files):
         try:
             df = pd.read_parquet(f)
-            processed_df = engineered_features_for_player(df)
-            
-            # Save the processed individual file
-            base_name = os.path.basename(f)
-            save_path = os.path.join(PROCESSED_DATA_DIR, base_name)
-            processed_df.to_parquet(save_path, index=False)
-            
-            all_processed.append(processed_df)
+            processed_df = compute_features(df, skip=LEAGUE_WIDE_NODES)
+            pending.append(processed_df)
+            lengths.append(len(processed_df))
+            save_paths.append(os.path.join(PROCESSED_DATA_DIR, os.path.basename(f)))
             
         except Exception as e:
             print(f"Error processing {f}: {e}")
+
+        if len(pending) >= MASTER_CHUNK_PLAYERS:
+            all_processed.append(pd.concat(pending, ignore_index=True))
+            pending.clear()
+    if pending:
+        all_processed.append(pd.concat(pending, ignore_index=True))
+        pending.clear()
             
     if all_processed:
-        master_df = pd.concat(all_processed, ignore_index=True)
-        # Save master dataframe
-        master_df.to_parquet(os.path.join(PROCESSED_DATA_DIR, "master_dataset.parquet"), index=False)
-        print(f"Feature engineering complete. Prepared {len(master_df)} records.")
+        finish_master(all_processed, save_paths, lengths)
     else:
         print("No files were processed.")
 
+
+def finish_master(frames, save_paths, lengths):
+    """
+    League-wide steps on the concatenated per-player frames, then write everything out.
+    `frames` is emptied as it's concatenated, and the master is converted to arrow once
+    for both writers and dropped, so no step holds two copies of it that it can avoid.
+    """
+    master_df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    frames.clear()
+    for name in LEAGUE_WIDE_NODES:
+        master_df = FEATURE_REGISTRY[name]['compute'](master_df)
+
+    # What the serving paths use for TEAMMATE_FEATURES until the next refresh
+    from teammates import save_expected_availability
+    save_expected_availability(master_df)
+
+    from parquet_layout import as_table, write_parquet, write_player_files, write_player_files_meta
+    table = as_table(master_df)
+    del master_df
+
+    # Save the processed individual files (one player each, so sorted by date alone)
+    write_player_files_meta(write_player_files(table, save_paths, lengths))
+
+    # Save master dataframe, sorted by player and date within each season
+    write_parquet(table, os.path.join(PROCESSED_DATA_DIR, "master_dataset.parquet"))
+    print(f"Feature engineering complete. Prepared {table.num_rows} records.")
+
+
 if __name__ == "__main__":
-    process_all_files()
+    import sys
+    backend_arg = [a.split('=')[1] for a in sys.argv[1:] if a.startswith('--backend=')]
+    process_all_files(backend=backend_arg[0] if backend_arg else 'pandas')
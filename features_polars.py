@@ -0,0 +1,220 @@
+import os
+import glob
+import time
+import pandas as pd
+import polars as pl
+
+from features import (
+    DATA_DIR, ARENAS, TARGETS, ROLLING_WINDOWS, EWM_SPANS, FEATURE_REGISTRY, LEAGUE_WIDE_NODES,
+    rolling_column_name, trailing_window_means, compute_features, haversine
+)
+
+# Polars backend for the per-player feature nodes: the whole raw store is scanned
+# once and every node becomes a window expression partitioned by source file (one
+# file = one player), so the query optimizer and thread pool see the full plan
+# instead of ~500 separate pandas passes. League-wide steps (opponent context, player
+# roles, teammates) still run in pandas on the result, exactly as in features.py.
+
+# Row partition: one per raw log file, in sorted-filename order like process_all_files
+FILE_KEY = '_FILE'
+SOURCE_COLUMN = '_SOURCE'
+# Consecutive-SEASON_ID run within a file: the 'season' rolling window's partition
+SEASON_RUN = '_SEASON_RUN'
+STAT_COLUMNS = ['PTS', 'REB', 'AST', 'FG3M']
+
+
+def arena_expressions():
+    matchup = pl.col('MATCHUP')
+    home_team = (pl.when(matchup.str.contains('@', literal=True))
+                 .then(matchup.str.split(' @ ').list.get(1, null_on_oob=True))
+                 .otherwise(matchup.str.split(' vs. ').list.get(0, null_on_oob=True)))
+
+    def lookup(key, dtype):
+        return pl.col('HOME_TEAM').replace_strict({k: v[key] for k, v in ARENAS.items()}, default=None,
+                                                  return_dtype=dtype)
+
+    return [
+        [home_team.alias('HOME_TEAM')],
+        [
+            lookup('lat', pl.Float64).alias('LAT'),
+            lookup('lon', pl.Float64).alias('LON'),
+            lookup('elev', pl.Int64).alias('ALTITUDE'),
+            lookup('tz', pl.Int64).alias('TZ'),
+            pl.col('HOME_TEAM').is_in(['DEN', 'UTA']).fill_null(False).cast(pl.Int64).alias('HIGH_ALTITUDE_FLAG'),
+        ],
+    ]
+
+
+def travel_expressions():
+    # Arena-to-arena distances from features.haversine itself: a lookup instead of
+    # per-row trig, and bit-identical to the pandas path (CPython's x**2 rounds
+    # differently from the x*x polars computes)
+    distances = {f"{a}|{b}": haversine(ARENAS[a]['lat'], ARENAS[a]['lon'], ARENAS[b]['lat'], ARENAS[b]['lon'])
+                 for a in ARENAS for b in ARENAS}
+    arena_pair = pl.concat_str([pl.col('HOME_TEAM').shift(1).over(FILE_KEY), pl.col('HOME_TEAM')], separator='|')
+
+    lon_diff = pl.col('LON') - pl.col('PREV_LON')
+    tz_shift = (pl.col('TZ') - pl.col('PREV_TZ')).abs()
+    return [
+        [
+            pl.col('LAT').shift(1).over(FILE_KEY).alias('PREV_LAT'),
+            pl.col('LON').shift(1).over(FILE_KEY).alias('PREV_LON'),
+            pl.col('TZ').shift(1).over(FILE_KEY).alias('PREV_TZ'),
+        ],
+        [
+            arena_pair.replace_strict(distances, default=0.0, return_dtype=pl.Float64).alias('TRAVEL_DIST'),
+            pl.when(pl.col('PREV_LON').is_null() | pl.col('LON').is_null()).then(pl.lit('None'))
+            .when(lon_diff > 0.5).then(pl.lit('Eastward'))
+            .when(lon_diff < -0.5).then(pl.lit('Westward'))
+            .otherwise(pl.lit('None')).alias('TRAVEL_DIR'),
+            pl.when(pl.col('PREV_TZ').is_null() | pl.col('TZ').is_null()).then(pl.lit('0'))
+            .when(tz_shift >= 3).then(pl.lit('3+'))
+            .otherwise(tz_shift.cast(pl.Int64).cast(pl.String)).alias('TZ_SHIFT'),
+        ],
+    ]
+
+
+def running_sums(target):
+    """Exclusive running sum and non-missing count of `target` within each file."""
+    value = pl.col(target).cast(pl.Float64)
+    valid = value.is_not_null() & value.is_not_nan()
+    cs = value.fill_nan(0.0).fill_null(0.0).cum_sum().shift(1, fill_value=0.0).over(FILE_KEY)
+    cnt = valid.cast(pl.Int64).cum_sum().shift(1, fill_value=0).over(FILE_KEY)
+    return cs, cnt
+
+
+def rolling_expressions(targets, season_sums):
+    """
+    features.trailing_window_means as expressions: the same exclusive running sums and
+    counts, differenced at the window's lower bound, so the floats come out bit-identical.
+    `season_sums` says the running sums are materialized as _CS_/_CNT_ columns for the
+    'season' window (a window expression can't be nested inside another partition).
+    """
+    exprs = []
+    for target in targets:
+        cs, cnt = running_sums(target)
+        for w in ROLLING_WINDOWS:
+            if w == 'season':
+                if season_sums:
+                    cs_col, cnt_col = pl.col(f'_CS_{target}'), pl.col(f'_CNT_{target}')
+                    total = cs_col - cs_col.first().over([FILE_KEY, SEASON_RUN])
+                    count = cnt_col - cnt_col.first().over([FILE_KEY, SEASON_RUN])
+                else:
+                    total, count = cs, cnt
+            else:
+                total = cs - cs.shift(int(w), fill_value=0.0).over(FILE_KEY)
+                count = cnt - cnt.shift(int(w), fill_value=0).over(FILE_KEY)
+            exprs.append(pl.when(count > 0).then(total / count.cast(pl.Float64)).otherwise(None)
+                         .alias(rolling_column_name(target, w)))
+        for span in EWM_SPANS:
+            # The numpy kernel per file: polars' ewm_mean agrees only to ~1e-14
+            exprs.append(pl.col(target).cast(pl.Float64)
+                         .map_batches(lambda s, span=span: ewm_kernel(s, span), return_dtype=pl.Float64)
+                         .over(FILE_KEY).alias(f'{target}_ewm{span}'))
+    return exprs
+
+
+def ewm_kernel(series, span):
+    values = series.to_numpy().astype(float)[:, None]
+    return pl.Series(trailing_window_means(values, [], [span])[('ewm', span)][:, 0])
+
+
+def node_expressions(name, schema):
+    """Expression batches (each batch may use the columns of the ones before) per registry node."""
+    if name == 'PRA':
+        if all(c in schema for c in ['PTS', 'REB', 'AST']):
+            return [[(pl.col('PTS') + pl.col('REB') + pl.col('AST')).alias('PRA')]]
+        return []
+    if name == 'rolling':
+        targets = [t for t in TARGETS if t in schema]
+        if not targets:
+            return []
+        season_sums = 'season' in ROLLING_WINDOWS and 'SEASON_ID' in schema
+        if not season_sums:
+            return [rolling_expressions(targets, False)]
+        season_id = pl.col('SEASON_ID')
+        run = (season_id != season_id.shift(1)).fill_null(True).cum_sum().over(FILE_KEY)
+        sums = [expr.alias(f'{prefix}{t}') for t in targets
+                for prefix, expr in zip(['_CS_', '_CNT_'], running_sums(t))]
+        return [[run.alias(SEASON_RUN)] + sums, rolling_expressions(targets, True)]
+    if name == 'rest':
+        days = pl.col('GAME_DATE').diff().dt.total_days().over(FILE_KEY).cast(pl.Float64)
+        return [[days.alias('DAYS_REST')],
+                [(pl.col('DAYS_REST') == 1).fill_null(False).cast(pl.Int64).alias('B2B_FLAG')]]
+    if name == 'games_last_7d':
+        # (t - 7 days, t], the current game included, like pandas' rolling('7D')
+        games = pl.repeat(1.0, pl.len()).rolling_sum_by('GAME_DATE', window_size='7d').over(FILE_KEY)
+        return [[(games - 1).alias('GAMES_LAST_7D')]]
+    if name == 'arena':
+        return arena_expressions()
+    if name == 'travel':
+        return travel_expressions()
+    raise NotImplementedError(f"Feature node '{name}' has no polars expression; add one to features_polars.py")
+
+
+def scan_raw_store(parquet_files):
+    """Lazy frame over every raw log file, typed and ordered like compute_features leaves it."""
+    lf = pl.scan_parquet(parquet_files, include_file_paths=SOURCE_COLUMN)
+    schema = lf.collect_schema()
+    game_date = pl.col('GAME_DATE')
+    game_date = game_date.str.to_datetime(time_unit='ns') if schema['GAME_DATE'] == pl.String else game_date.cast(pl.Datetime('ns'))
+    stats = []
+    for stat in STAT_COLUMNS:
+        if stat in schema:
+            col = pl.col(stat) if schema[stat].is_numeric() else pl.col(stat).cast(pl.Float64, strict=False)
+            stats.append(col.fill_null(0).alias(stat))
+    return (lf.with_columns([game_date.alias('GAME_DATE')] + stats)
+            # Sorted paths rank in the same order as the sorted glob
+            .with_columns((pl.col(SOURCE_COLUMN).rank('dense') - 1).cast(pl.Int32).alias(FILE_KEY))
+            .sort([FILE_KEY, 'GAME_DATE'], maintain_order=True))
+
+
+def build_feature_plan(parquet_files, skip=tuple(LEAGUE_WIDE_NODES)):
+    """The lazy query for every per-player node of the feature registry, in registry order."""
+    lf = scan_raw_store(parquet_files)
+    for name in FEATURE_REGISTRY:
+        if name in skip:
+            continue
+        for batch in node_expressions(name, lf.collect_schema()):
+            lf = lf.with_columns(batch)
+    return lf
+
+
+def compute_player_features_polars(parquet_files):
+    """
+    (master frame before the league-wide steps, rows per file): what process_all_files
+    builds by running compute_features on each file and concatenating.
+    """
+    result = build_feature_plan(parquet_files).collect()
+    rows_per_file = dict(result.group_by(SOURCE_COLUMN).len().iter_rows())
+    lengths = [rows_per_file.get(f, 0) for f in parquet_files]
+    # Helper columns all start with '_'
+    master_df = result.select(pl.exclude('^_.*$')).to_pandas()
+    return master_df, lengths
+
+
+def compute_player_features_pandas(parquet_files):
+    """The pandas reference, as process_all_files runs it."""
+    processed = [compute_features(pd.read_parquet(f), skip=LEAGUE_WIDE_NODES) for f in parquet_files]
+    return pd.concat(processed, ignore_index=True), [len(p) for p in processed]
+
+
+def check_equivalence(parquet_files=None):
+    """Run both backends over the raw store and require identical frames (values, dtypes, column order)."""
+    parquet_files = parquet_files or sorted(glob.glob(os.path.join(DATA_DIR, "*_logs.parquet")))
+    start = time.perf_counter()
+    expected, expected_lengths = compute_player_features_pandas(parquet_files)
+    pandas_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    actual, lengths = compute_player_features_polars(parquet_files)
+    polars_seconds = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+    assert lengths == expected_lengths, "per-file row counts differ"
+    print(f"Identical: {len(actual)} rows x {actual.shape[1]} columns from {len(parquet_files)} files "
+          f"(pandas {pandas_seconds:.2f}s, polars {polars_seconds:.2f}s).")
+    return pandas_seconds, polars_seconds
+
+
+if __name__ == "__main__":
+    check_equivalence()
@@ -75,6 +75,48 @@ def get_robust_session():
     session.mount('https://', adapter)
     return session
 
+def fetch_season_game_log(season, max_retries=8):
+    """
+    Fetch the LeagueGameLog for a single season, retrying through timeouts.
+    Returns the season's DataFrame, or None if every attempt failed.
+    """
+    for attempt in range(max_retries):
+        try:
+            print(f"  Fetching all player logs for {season} (Attempt {attempt+1})...")
+            # Very polite sleep before hitting endpoint
+            time.sleep(random.uniform(3.0, 7.0)) 
+            
+            # nba_api doesn't easily accept a pre-built session object, so we
+            # depend on the wrapper but give it a huge timeout and fresh headers.
+            custom_headers = get_headers()
+        
+            log = leaguegamelog.LeagueGameLog(
+                season=season, 
+                player_or_team_abbreviation='P', 
+                headers=custom_headers, 
+                timeout=120 # Massive timeout
+            )
+            df = log.get_data_frames()[0]
+            
+            if not df.empty:
+                print(f"  -> Successfully retrieved {len(df)} logs for {season}.")
+            return df
+                
+        except ReadTimeout:
+            print(f"API Read Timeout on season {season} (Attempt {attempt+1}). Retrying...")
+            time.sleep(2 ** attempt + random.uniform(5.0, 10.0))
+        except Exception as e:
+            print(f"Error fetching season {season} (Attempt {attempt+1}): {e}")
+            time.sleep(2 ** attempt + random.uniform(5.0, 10.0))
+    return None
+
+
+def player_log_path(player_id, player_name):
+    # features.py expects file format: [Player_Name]_[Player_ID]_logs.parquet
+    filename = f"{player_name.replace(' ', '_')}_{player_id}_logs.parquet"
+    return os.path.join(DATA_DIR, filename)
+
+
 def download_bulk_game_logs(active_players_dict, seasons):
     """
     Download ALL game logs for the specified seasons in bulk.
@@ -82,46 +124,11 @@ def download_bulk_game_logs(active_players_dict, seasons):
     """
     print(f"Downloading bulk game logs for {len(seasons)} seasons...")
     all_seasons_data = []
-    
-    # Use a robust session to handle connection pool timeouts automatically
-    session = get_robust_session()
 
     for season in seasons:
-        max_retries = 8
-        for attempt in range(max_retries):
-            try:
-                print(f"  Fetching all player logs for {season} (Attempt {attempt+1})...")
-                # Very polite sleep before hitting endpoint
-                time.sleep(random.uniform(3.0, 7.0)) 
-                
-                # We inject our robust session 
-                custom_headers = get_headers()
-                session.headers.update(custom_headers)
-                
-                # Custom requests call to bypass nba_api wrapper timeout constraints if needed, 
-                # but nba_api accepts passing proxies. We'll pass our session.
-                # Actually, nba_api doesn't easily accept a pre-built session object.
-                # We will just depend on the wrapper but give it a huge timeout.
-            
-                log = leaguegamelog.LeagueGameLog(
-                    season=season, 
-                    player_or_team_abbreviation='P', 
-                    headers=custom_headers, 
-                    timeout=120 # Massive timeout
-                )
-                df = log.get_data_frames()[0]
-                
-                if not df.empty:
-                    all_seasons_data.append(df)
-                    print(f"  -> Successfully retrieved {len(df)} logs for {season}.")
-                break # Success, exit retry loop
-                    
-            except ReadTimeout:
-                print(f"API Read Timeout on season {season} (Attempt {attempt+1}). Retrying...")
-                time.sleep(2 ** attempt + random.uniform(5.0, 10.0))
-            except Exception as e:
-                print(f"Error fetching season {season} (Attempt {attempt+1}): {e}")
-                time.sleep(2 ** attempt + random.uniform(5.0, 10.0))
+        df = fetch_season_game_log(season)
+        if df is not None and not df.empty:
+            all_seasons_data.append(df)
     
     if len(all_seasons_data) == 0:
         print("CRITICAL: Failed to fetch ANY bulk season data due to persistent timeouts.")
@@ -137,20 +144,97 @@ def download_bulk_game_logs(active_players_dict, seasons):
     print(f"\nExtracted {len(filtered_df)} total games for our {len(active_ids)} active players.")
     
     # Group by player and save to individual parquet files
-    # features.py expects file format: [Player_Name]_[Player_ID]_logs.parquet
     grouped = filtered_df.groupby('PLAYER_ID')
     
     for player_id, group_df in grouped:
         player_name = active_players_dict.get(player_id, "Unknown_Player")
-        filename = f"{player_name.replace(' ', '_')}_{player_id}_logs.parquet"
-        filepath = os.path.join(DATA_DIR, filename)
+        filepath = player_log_path(player_id, player_name)
         
         # Save to parquet
         group_df.to_parquet(filepath, index=False)
         
     print(f"Saved {len(grouped)} individual player parquet files to {DATA_DIR}/")
 
-def run_ingestion():
+
+# ---------------------------------------------------------------------------
+# Streaming ingestion
+# ---------------------------------------------------------------------------
+# Each season is filtered and appended to the per-player files as soon as it
+# arrives, so peak memory is bounded by a single season. A marker file is
+# written per finished season; an interrupted run skips those seasons when it
+# is restarted, and the markers are cleared once every season has landed.
+CHECKPOINT_DIR = os.path.join(DATA_DIR, "_ingest_checkpoints")
+
+
+def season_checkpoint_path(season):
+    return os.path.join(CHECKPOINT_DIR, f"{season}.done")
+
+
+def append_player_logs(filepath, new_df):
+    """Append new game rows to a player's log file, de-duplicating on GAME_ID."""
+    if os.path.exists(filepath):
+        existing_df = pd.read_parquet(filepath)
+        combined = pd.concat([existing_df, new_df], ignore_index=True)
+        combined = combined.drop_duplicates(subset=['GAME_ID'], keep='last')
+    else:
+        combined = new_df
+
+    # Write to a temp file and swap it in so an interruption never leaves a truncated parquet
+    tmp_path = filepath + ".tmp"
+    combined.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, filepath)
+    return len(combined)
+
+
+def stream_game_logs(active_players_dict, seasons):
+    """
+    Streaming alternative to download_bulk_game_logs: fetch one season at a time,
+    filter it to the active players and append it to the per-player files
+    immediately, checkpointing each finished season so a rerun resumes.
+    """
+    if not os.path.exists(CHECKPOINT_DIR):
+        os.makedirs(CHECKPOINT_DIR)
+
+    pending = [s for s in seasons if not os.path.exists(season_checkpoint_path(s))]
+    skipped = len(seasons) - len(pending)
+    if skipped:
+        print(f"Resuming streamed ingestion: {skipped} season(s) already checkpointed.")
+    print(f"Streaming game logs for {len(pending)} seasons...")
+
+    active_ids = list(active_players_dict.keys())
+    failed_seasons = []
+
+    for season in pending:
+        season_df = fetch_season_game_log(season)
+        if season_df is None:
+            print(f"CRITICAL: Giving up on {season} for this run. Rerun to resume from here.")
+            failed_seasons.append(season)
+            continue
+
+        season_df = season_df[season_df['PLAYER_ID'].isin(active_ids)]
+        for player_id, group_df in season_df.groupby('PLAYER_ID'):
+            player_name = active_players_dict.get(player_id, "Unknown_Player")
+            append_player_logs(player_log_path(player_id, player_name), group_df)
+
+        with open(season_checkpoint_path(season), 'w') as f:
+            f.write(f"{len(season_df)}\n")
+        print(f"  -> Appended {len(season_df)} games for {season_df['PLAYER_ID'].nunique()} players and checkpointed {season}.")
+        # Release the season before fetching the next one
+        del season_df
+
+    if failed_seasons:
+        print(f"Streamed ingestion incomplete. Missing seasons: {failed_seasons}")
+        return False
+
+    # Every season landed: clear the markers so the next run refreshes from scratch
+    for season in seasons:
+        marker = season_checkpoint_path(season)
+        if os.path.exists(marker):
+            os.remove(marker)
+    print(f"Streamed ingestion complete for {len(seasons)} seasons.")
+    return True
+
+def run_ingestion(streaming=False):
     print("Starting data ingestion phase...")
     # 1. Get rotational players dynamically
     active_players = get_active_rotational_players()
@@ -159,9 +243,13 @@ def run_ingestion():
         print("Failed to get players. Exiting.")
         return
         
-    # 2. Download game logs in bulk, then split by player
-    download_bulk_game_logs(active_players, SEASONS)
+    # 2. Download game logs, then split by player (streamed season-by-season if requested)
+    if streaming:
+        stream_game_logs(active_players, SEASONS)
+    else:
+        download_bulk_game_logs(active_players, SEASONS)
     print("Data ingestion complete.")
 
 if __name__ == "__main__":
-    run_ingestion()
+    import sys
+    run_ingestion(streaming='--stream' in sys.argv[1:])
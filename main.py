@@ -1,32 +1,347 @@
+import os
+import sys
+import json
+import glob
 import time
-from ingestion import run_ingestion
-from features import process_all_files
-from model import train_and_evaluate
+import hashlib
+import importlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+DATA_DIR = "data"
+PROCESSED_DATA_DIR = "processed_data"
+# Per-stage record of the last successful run (input/output digests, finish time),
+# plus a stat cache so unchanged files are never re-read just to be hashed
+STATE_FILE = os.path.join(PROCESSED_DATA_DIR, "pipeline_state.json")
+
+HOUR = 3600
+# Stages that pull from stats.nba.com have no local inputs to hash; they count as
+# fresh until their last successful run is older than this
+INGEST_TTL = 12 * HOUR
+SCHEDULE_TTL = 6 * HOUR
+DEFAULT_JOBS = 4
+
+PLAYER_LOGS = os.path.join(DATA_DIR, "*_logs.parquet")
+TEAM_METRICS_FILE = os.path.join(DATA_DIR, "team_defensive_metrics.parquet")
+TEAM_GAMES_FILE = os.path.join(DATA_DIR, "team_games.parquet")
+SCHEDULE_FILE = os.path.join(DATA_DIR, "upcoming_games.csv")
+TEAM_CLUSTER_FILES = [os.path.join(PROCESSED_DATA_DIR, f) for f in
+                      ["team_clusters.parquet", "team_scaler.joblib", "team_kmeans.joblib"]]
+PLAYER_ROLE_FILES = [os.path.join(PROCESSED_DATA_DIR, f) for f in
+                     ["player_roles.parquet", "player_role_scaler.joblib", "player_role_kmeans.joblib"]]
+MASTER_FILE = os.path.join(PROCESSED_DATA_DIR, "master_dataset.parquet")
+TEAM_AVAILABILITY_FILE = os.path.join(PROCESSED_DATA_DIR, "team_availability.parquet")
+MODEL_FILES = [os.path.join(PROCESSED_DATA_DIR, f"xgb_{t}_model.joblib") for t in ['pts', 'ast', 'reb', 'pra']]
+TREE_FILES = [f.replace('_model.joblib', '_trees.npz') for f in MODEL_FILES]
+SIMILARITY_FILE = os.path.join(PROCESSED_DATA_DIR, "player_similarity.joblib")
+CONFORMAL_FILE = os.path.join(PROCESSED_DATA_DIR, "conformal_intervals.joblib")
+PROJECTIONS_FILE = os.path.join(DATA_DIR, "upcoming_projections.csv")
+
+# The pipeline, in dependency order. Each stage names the function that runs it
+# ('module:function', imported in a worker process), the stages it waits on, and
+# the files (globs allowed) it reads and writes. Source files are listed as inputs
+# so editing a stage's code reruns it.
+STAGES = {
+    'ingest_players': {
+        'run': 'ingestion:run_ingestion',
+        'deps': [],
+        'inputs': ['ingestion.py'],
+        'outputs': [PLAYER_LOGS],
+        'ttl': INGEST_TTL,
+    },
+    'ingest_team_metrics': {
+        'run': 'team_ingestion:run_team_metrics_ingestion',
+        'deps': [],
+        'inputs': ['team_ingestion.py'],
+        'outputs': [TEAM_METRICS_FILE],
+        'ttl': INGEST_TTL,
+    },
+    'ingest_team_games': {
+        'run': 'team_ingestion:run_team_game_log_ingestion',
+        'deps': [],
+        'inputs': ['team_ingestion.py'],
+        'outputs': [TEAM_GAMES_FILE],
+        'ttl': INGEST_TTL,
+    },
+    'fetch_schedule': {
+        'run': 'fetch_schedule:fetch_remaining_schedule',
+        'deps': [],
+        'inputs': ['fetch_schedule.py'],
+        'outputs': [SCHEDULE_FILE],
+        'ttl': SCHEDULE_TTL,
+    },
+    'team_clusters': {
+        'run': 'team_clustering:build_team_clusters',
+        'deps': ['ingest_team_metrics'],
+        'inputs': ['team_clustering.py', TEAM_METRICS_FILE],
+        'outputs': TEAM_CLUSTER_FILES,
+    },
+    'player_roles': {
+        'run': 'player_clustering:build_player_roles',
+        'deps': ['ingest_players'],
+        'inputs': ['player_clustering.py', PLAYER_LOGS],
+        'outputs': PLAYER_ROLE_FILES,
+    },
+    'features': {
+        'run': 'features:process_all_files',
+        'deps': ['ingest_players', 'ingest_team_games', 'team_clusters', 'player_roles'],
+        'inputs': ['features.py', 'features_polars.py', 'parquet_layout.py', 'opponent_context.py', 'teammates.py',
+                   'player_clustering.py', PLAYER_LOGS, TEAM_GAMES_FILE] + TEAM_CLUSTER_FILES + PLAYER_ROLE_FILES,
+        'outputs': [MASTER_FILE, TEAM_AVAILABILITY_FILE],
+    },
+    'similarity': {
+        'run': 'player_similarity:build_similarity_index',
+        'deps': ['features'],
+        'inputs': ['player_similarity.py', MASTER_FILE],
+        'outputs': [SIMILARITY_FILE],
+    },
+    # Training rows with short histories are blended toward point-in-time neighbour
+    # priors built from the master itself, not the saved (serving) similarity index
+    'train': {
+        'run': 'model:train_all_models',
+        'deps': ['features'],
+        'inputs': ['model.py', 'tree_export.py', 'player_similarity.py', 'parquet_layout.py', MASTER_FILE],
+        'outputs': MODEL_FILES + TREE_FILES,
+    },
+    'conformal': {
+        'run': 'conformal:fit_conformal_intervals',
+        'deps': ['features'],
+        'inputs': ['conformal.py', 'model.py', 'player_similarity.py', 'parquet_layout.py', MASTER_FILE],
+        'outputs': [CONFORMAL_FILE],
+    },
+    'projections': {
+        'run': 'prepare_projections:prepare_and_run_projections',
+        'deps': ['fetch_schedule', 'features', 'train', 'similarity', 'conformal'],
+        'inputs': ['prepare_projections.py', 'predict.py', 'publish.py', 'drift_monitor.py', SCHEDULE_FILE, MASTER_FILE,
+                   TEAM_AVAILABILITY_FILE, SIMILARITY_FILE, CONFORMAL_FILE] + MODEL_FILES + TREE_FILES,
+        'outputs': [PROJECTIONS_FILE],
+    },
+}
+
+
+def expand(patterns):
+    files = []
+    for pattern in patterns:
+        files += sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+    return files
+
+
+class FileHasher:
+    """md5 of file contents, cached by (size, mtime_ns) so a no-op rerun only stats files."""
+
+    def __init__(self, cache=None):
+        self.cache = dict(cache or {})
+
+    def digest(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        cached = self.cache.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        h = hashlib.md5()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        self.cache[path] = [stat.st_size, stat.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def combined(self, patterns):
+        """One digest over every file the patterns match (a missing file hashes as missing)."""
+        h = hashlib.md5()
+        for path in expand(patterns):
+            h.update(f"{path}:{self.digest(path)}\n".encode())
+        return h.hexdigest()
+
+    def to_json(self):
+        return {path: entry for path, entry in self.cache.items() if os.path.exists(path)}
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {'stages': {}, 'files': {}}
+    with open(STATE_FILE) as f:
+        return json.load(f)
+
+
+def save_state(state, hasher):
+    state['files'] = hasher.to_json()
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def outputs_exist(stage):
+    return all(glob.glob(p) if glob.has_magic(p) else os.path.exists(p) for p in stage['outputs'])
+
+
+def stage_status(name, state, hasher, now=None):
+    """(fresh, reason) for one stage given the files on disk right now."""
+    stage = STAGES[name]
+    record = state['stages'].get(name)
+    if not outputs_exist(stage):
+        return False, "outputs missing"
+    if record is None:
+        return False, "no previous run recorded"
+    if 'ttl' in stage and (now or time.time()) - record['finished'] > stage['ttl']:
+        return False, f"last run older than {stage['ttl'] / HOUR:g}h"
+    if hasher.combined(stage['inputs']) != record['inputs']:
+        return False, "inputs changed"
+    if hasher.combined(stage['outputs']) != record['outputs']:
+        return False, "outputs changed since last run"
+    return True, "fresh"
+
+
+def select_stages(only=None, start=None):
+    """Stage names to consider, in dependency order: all, `only` the named ones, or `start` and everything downstream."""
+    names = list(STAGES)
+    unknown = [n for n in (only or []) + ([start] if start else []) if n not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {unknown}. Stages: {', '.join(names)}")
+    if only:
+        return [n for n in names if n in only]
+    if start:
+        selected = {start}
+        for n in names:
+            if any(d in selected for d in STAGES[n]['deps']):
+                selected.add(n)
+        return [n for n in names if n in selected]
+    return names
+
+
+def run_stage(target):
+    """Worker entry point: import 'module:function' and call it."""
+    module_name, func_name = target.split(':')
+    try:
+        getattr(importlib.import_module(module_name), func_name)()
+    finally:
+        sys.stdout.flush()
+
+
+def outputs_touched_since(stage, started):
+    return any(os.path.getmtime(path) >= started for path in expand(stage['outputs']) if os.path.exists(path))
+
+
+def run_pipeline(only=None, start=None, force=False, jobs=DEFAULT_JOBS, dry_run=False):
+    """
+    Run the selected stages, skipping any whose outputs are fresh (inputs unchanged
+    since the run that produced them, and for ingestion stages, within their TTL).
+    Stages whose dependencies have finished run concurrently in up to `jobs`
+    processes. Dependencies outside the selection are taken from disk as they are.
+    """
+    selected = select_stages(only, start)
+    state = load_state()
+    hasher = FileHasher(state.get('files'))
+    pending, done, failed = list(selected), set(), set()
+    running = {}
+    summary = {}
+    pipeline_start = time.time()
+
+    if dry_run:
+        for name in selected:
+            stale_deps = [d for d in STAGES[name]['deps'] if d in selected and summary.get(d) != 'fresh']
+            fresh, reason = stage_status(name, state, hasher)
+            if fresh and stale_deps and not force:
+                fresh, reason = False, f"upstream {stale_deps} will run"
+            summary[name] = 'fresh' if fresh and not force else 'run'
+            print(f"  {name:<20} {'skip' if summary[name] == 'fresh' else 'RUN':<5} {reason}")
+        return summary
+
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp.get_context('spawn')) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = [d for d in STAGES[name]['deps'] if d in selected]
+                if any(d in failed for d in deps):
+                    pending.remove(name)
+                    failed.add(name)
+                    summary[name] = 'skipped (upstream failed)'
+                    print(f"[{name}] Skipped: an upstream stage failed.")
+                    continue
+                if not all(d in done for d in deps):
+                    continue
+                pending.remove(name)
+                fresh, reason = stage_status(name, state, hasher)
+                if fresh and not force:
+                    done.add(name)
+                    summary[name] = 'fresh'
+                    print(f"[{name}] Up to date, skipping.")
+                    continue
+                print(f"[{name}] Running ({'forced' if force else reason})...")
+                inputs = hasher.combined(STAGES[name]['inputs'])
+                future = pool.submit(run_stage, STAGES[name]['run'])
+                running[future] = (name, time.time(), inputs)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, started, inputs = running.pop(future)
+                stage = STAGES[name]
+                elapsed = time.time() - started
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"[{name}] FAILED after {elapsed:.1f}s: {e}")
+                    failed.add(name)
+                    summary[name] = 'failed'
+                    continue
+
+                if not outputs_exist(stage):
+                    print(f"[{name}] FAILED: finished in {elapsed:.1f}s without writing {stage['outputs']}.")
+                    failed.add(name)
+                    summary[name] = 'failed'
+                elif not outputs_touched_since(stage, started):
+                    # The scripts report fetch errors and return; keep going on the
+                    # previous artifacts but don't record a run, so the next one retries
+                    print(f"[{name}] Finished in {elapsed:.1f}s without refreshing its outputs; "
+                          f"continuing with the existing files.")
+                    done.add(name)
+                    summary[name] = 'stale (kept existing outputs)'
+                else:
+                    state['stages'][name] = {
+                        'inputs': inputs,
+                        'outputs': hasher.combined(stage['outputs']),
+                        'finished': time.time(),
+                        'seconds': round(elapsed, 1),
+                    }
+                    save_state(state, hasher)
+                    done.add(name)
+                    summary[name] = f'ran ({elapsed:.1f}s)'
+                    print(f"[{name}] Done in {elapsed:.1f}s.")
+
+    save_state(state, hasher)
+    print(f"\nPipeline finished in {time.time() - pipeline_start:.1f}s:")
+    for name in selected:
+        print(f"  {name:<20} {summary.get(name, 'not run')}")
+    return summary
+
 
 def main():
     print("="*50)
     print("NBA Player Props Predictive Model Pipeline")
     print("="*50)
-    
-    # Phase 1: Data Ingestion
-    print("\n[PHASE 1] Data Ingestion")
-    start_time = time.time()
-    run_ingestion()
-    print(f"Phase 1 completed in {time.time() - start_time:.2f} seconds.")
-    
-    # Phase 2: Feature Engineering
-    print("\n[PHASE 2] Feature Engineering")
-    start_time = time.time()
-    process_all_files()
-    print(f"Phase 2 completed in {time.time() - start_time:.2f} seconds.")
-    
-    # Phase 3: Machine Learning
-    print("\n[PHASE 3] Machine Learning & Validation")
-    start_time = time.time()
-    train_and_evaluate(target='PTS')
-    print(f"Phase 3 completed in {time.time() - start_time:.2f} seconds.")
-    
-    print("\nPipeline execution finished successfully.")
+
+    args = sys.argv[1:]
+    only = [a.split('=', 1)[1].split(',') for a in args if a.startswith('--only=')]
+    start = [a.split('=', 1)[1] for a in args if a.startswith('--from=')]
+    jobs = [int(a.split('=', 1)[1]) for a in args if a.startswith('--jobs=')]
+    try:
+        summary = run_pipeline(
+            only=only[0] if only else None,
+            start=start[0] if start else None,
+            force='--force' in args,
+            jobs=jobs[0] if jobs else DEFAULT_JOBS,
+            dry_run='--dry-run' in args,
+        )
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+    if any(status.startswith(('failed', 'skipped')) for status in summary.values()):
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -1,16 +1,35 @@
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import shap
-from sklearn.ensemble import RandomForestRegressor
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 from sklearn.model_selection import train_test_split
+from features import DUMMY_COLUMNS, model_feature_columns, rolling_feature_names
 
 PROCESSED_DATA_DIR = "processed_data"
 MASTER_FILE = os.path.join(PROCESSED_DATA_DIR, "master_dataset.parquet")
 
+# Shared XGBoost hyperparameters so every script that refits a model trains the same thing
+XGB_PARAMS = dict(n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42, n_jobs=-1)
+
+# Out-of-fold models (one per fold, each trained without that fold's games) let
+# backfill.py score historical rows with a model that never saw them
+OOF_DIR = os.path.join(PROCESSED_DATA_DIR, "oof")
+N_OOF_FOLDS = 5
+
+
+def get_oof_model_file(target):
+    return os.path.join(OOF_DIR, f"xgb_{target.lower()}_oof.joblib")
+
+
+def game_folds(game_ids, n_folds=N_OOF_FOLDS):
+    """
+    Stable fold id per row from a hash of GAME_ID, so every player in a game lands in
+    the same fold and the assignment never changes between runs or chunks.
+    """
+    hashed = pd.util.hash_pandas_object(pd.Series(game_ids, dtype=str), index=False).values
+    return (hashed % np.uint64(n_folds)).astype(np.int64)
+
 def load_data():
     if not os.path.exists(MASTER_FILE):
         print(f"File {MASTER_FILE} not found. Run features.py first.")
@@ -20,33 +39,21 @@ def load_data():
 def prep_for_modeling(df, target_col='PTS'):
     # Drop rows where target is NaN or rolling averages are NaN
     # The first few games for any player will have NaN for 3g/5g/10g avgs
-    cols_to_check = [target_col, f'{target_col}_3g_avg', f'{target_col}_5g_avg', f'{target_col}_10g_avg']
-    df_clean = df.dropna(subset=cols_to_check).copy()
+    cols_to_check = [target_col] + rolling_feature_names(target_col)
+    # One copy of just the rows and columns a model can read (the master is much wider)
+    wanted = set(cols_to_check) | set(model_feature_columns(target_col, df.columns)) | set(DUMMY_COLUMNS)
+    df_clean = df.loc[df[cols_to_check].notna().all(axis=1), [c for c in df.columns if c in wanted]]
+
+    # Rows with short histories get the same neighbour-prior blend serving applies
+    from player_similarity import blend_cold_start_rows
+    blend_cold_start_rows(df, df_clean)
     
     # We also need to map categorical text columns to dummies or drop
-    dummy_cols = ['TRAVEL_DIR', 'TZ_SHIFT']
-    if 'OPP_ARCHETYPE' in df_clean.columns:
-        dummy_cols.append('OPP_ARCHETYPE')
-        
+    dummy_cols = [c for c in DUMMY_COLUMNS if c in df_clean.columns]
     df_clean = pd.get_dummies(df_clean, columns=dummy_cols, drop_first=True)
     
-    features = [
-        f'{target_col}_3g_avg', f'{target_col}_5g_avg', f'{target_col}_10g_avg',
-        'B2B_FLAG', 'GAMES_LAST_7D',
-        'ALTITUDE', 'HIGH_ALTITUDE_FLAG',
-        'TRAVEL_DIST'
-    ]
-    
-    # Add optional opponent metrics if present
-    opp_features = ['OPP_PACE', 'OPP_DEF_RATING', 'OPP_EFG_PCT', 'OPP_TM_TOV_PCT', 'OPP_DREB_PCT']
-    for opp_f in opp_features:
-        if opp_f in df_clean.columns:
-            features.append(opp_f)
-            
-    # Add dummy columns that were generated
-    for col in df_clean.columns:
-        if col.startswith('TRAVEL_DIR_') or col.startswith('TZ_SHIFT_') or col.startswith('OPP_ARCHETYPE_'):
-            features.append(col)
+    # The feature list itself is defined once in features.py and shared with the serving path
+    features = model_feature_columns(target_col, df_clean.columns)
             
     # Ensure all features handle NaNs (e.g., from first games without prev lag)
     df_clean = df_clean.dropna(subset=features)
@@ -88,7 +95,7 @@ def train_and_evaluate(target='PTS'):
     base_mae = mean_absolute_error(y_test, base_test)
     
     # XGBoost Regressor
-    xgb_model = XGBRegressor(n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42, n_jobs=-1)
+    xgb_model = XGBRegressor(**XGB_PARAMS)
     xgb_model.fit(X_train, y_train)
     xgb_preds = xgb_model.predict(X_test)
     
@@ -107,8 +114,48 @@ def train_and_evaluate(target='PTS'):
     import joblib
     MODEL_FILE = os.path.join(PROCESSED_DATA_DIR, f"xgb_{target.lower()}_model.joblib")
     features = list(X.columns)
-    joblib.dump({'model': xgb_model, 'features': features}, MODEL_FILE)
+    # What drift_monitor.py compares live inputs and errors against
+    from drift_monitor import training_profile
+    profile = training_profile(X_train, y_test.to_numpy() - xgb_preds)
+    joblib.dump({'model': xgb_model, 'features': features, 'training_profile': profile}, MODEL_FILE)
     print(f"Saved {target} model to {MODEL_FILE}")
+    # xgboost-free copy for the serving paths
+    from tree_export import export_model
+    export_model(MODEL_FILE)
+
+def train_oof_models(target='PTS', n_folds=N_OOF_FOLDS):
+    """Fit one model per GAME_ID-hash fold on every other fold and save them together."""
+    import joblib
+
+    print(f"\n--- Training {n_folds} out-of-fold models for {target} ---")
+    df = load_data()
+    if df is None: return None
+
+    X, y, _ = prep_for_modeling(df, target_col=target)
+    if len(X) < 100:
+        print(f"Not enough data to train for {target}.")
+        return None
+    folds = game_folds(df.loc[X.index, 'GAME_ID'], n_folds)
+
+    fold_models = []
+    for k in range(n_folds):
+        xgb_model = XGBRegressor(**XGB_PARAMS)
+        xgb_model.fit(X[folds != k], y[folds != k])
+        held_out = folds == k
+        mae = mean_absolute_error(y[held_out], xgb_model.predict(X[held_out]))
+        print(f"  Fold {k}: trained on {int((~held_out).sum())} rows, held-out MAE {mae:.2f}")
+        fold_models.append(xgb_model)
+
+    os.makedirs(OOF_DIR, exist_ok=True)
+    oof_file = get_oof_model_file(target)
+    joblib.dump({
+        'models': fold_models,
+        'features': list(X.columns),
+        'n_folds': n_folds,
+        # Rows after this date were never in any fold's training data
+        'max_game_date': str(pd.to_datetime(df.loc[X.index, 'GAME_DATE']).max().date()),
+    }, oof_file)
+    print(f"Saved {target} out-of-fold models to {oof_file}")
 
 def train_all_models():
     targets = ['PTS', 'AST', 'REB', 'PRA']
@@ -116,4 +163,9 @@ def train_all_models():
         train_and_evaluate(target=t)
 
 if __name__ == "__main__":
-    train_all_models()
+    import sys
+    if '--oof' in sys.argv[1:]:
+        for t in ['PTS', 'AST', 'REB', 'PRA']:
+            train_oof_models(target=t)
+    else:
+        train_all_models()
@@ -0,0 +1,136 @@
+import os
+import numpy as np
+import pandas as pd
+
+DATA_DIR = "data"
+# Team-level LeagueGameLog rows for every season (written by team_ingestion.py)
+TEAM_GAMES_FILE = os.path.join(DATA_DIR, "team_games.parquet")
+
+# Same metric names as the season-level Advanced table, so models and the saved
+# team scaler/KMeans consume point-in-time values without any renaming
+METRIC_COLUMNS = ['PACE', 'DEF_RATING', 'EFG_PCT', 'TM_TOV_PCT', 'DREB_PCT']
+
+# Box-score components summed season-to-date; every metric is a ratio of these sums
+COMPONENTS = ['POSS', 'OPP_POSS', 'MIN', 'OPP_PTS', 'FGM', 'FG3M', 'FGA', 'TOV', 'DREB', 'OPP_OREB']
+
+# Season-to-date sums are seeded with this many games at last season's per-game
+# rates, so a team's first few games of a new season don't produce wild values
+PRIOR_GAMES = 5
+
+
+def season_from_dates(dates):
+    """Vectorized 'YYYY-YY' season label (seasons start in October)."""
+    dates = pd.Series(dates)
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    start = pd.Series(np.where(dates.dt.month >= 10, dates.dt.year, dates.dt.year - 1), index=dates.index)
+    # A handful of distinct seasons, so format each label once instead of once per row
+    return start.map({year: f"{year}-{(year + 1) % 100:02d}" for year in start.unique()})
+
+
+def game_components(team_games):
+    """One row per (team, game) with the team's and its opponent's possession components."""
+    cols = ['TEAM_ID', 'GAME_ID', 'GAME_DATE', 'MIN', 'PTS', 'FGM', 'FGA', 'FG3M', 'FTA', 'OREB', 'DREB', 'TOV']
+    tg = team_games[cols].copy()
+    tg['GAME_DATE'] = pd.to_datetime(tg['GAME_DATE'])
+    for c in cols[3:]:
+        tg[c] = pd.to_numeric(tg[c], errors='coerce').astype(float)
+    tg['SEASON'] = season_from_dates(tg['GAME_DATE']).values
+    tg['POSS'] = tg['FGA'] + 0.44 * tg['FTA'] - tg['OREB'] + tg['TOV']
+
+    opp = tg[['GAME_ID', 'TEAM_ID', 'POSS', 'PTS', 'OREB']].rename(columns={
+        'TEAM_ID': 'OPP_ID', 'POSS': 'OPP_POSS', 'PTS': 'OPP_PTS', 'OREB': 'OPP_OREB'
+    })
+    tg = tg.merge(opp, on='GAME_ID')
+    return tg[tg['TEAM_ID'] != tg['OPP_ID']].drop(columns=['OPP_ID'])
+
+
+def metrics_from_sums(sums):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            # Possessions per 48 minutes, averaged over both sides (MIN is team minutes, 5 on court)
+            'PACE': 48 * ((sums['POSS'] + sums['OPP_POSS']) / 2) / (sums['MIN'] / 5),
+            # Points allowed per 100 opponent possessions
+            'DEF_RATING': 100 * sums['OPP_PTS'] / sums['OPP_POSS'],
+            'EFG_PCT': (sums['FGM'] + 0.5 * sums['FG3M']) / sums['FGA'],
+            'TM_TOV_PCT': sums['TOV'] / sums['POSS'],
+            'DREB_PCT': sums['DREB'] / (sums['DREB'] + sums['OPP_OREB']),
+        }, index=sums.index).replace([np.inf, -np.inf], np.nan)
+
+
+def build_trailing_team_metrics(team_games, prior_games=PRIOR_GAMES):
+    """
+    Season-to-date team metrics as of the end of each team game (inclusive).
+    Joined with allow_exact_matches=False, a player's game therefore only ever sees
+    the opponent's games played strictly before it. One sort plus grouped cumsums:
+    linear in the number of team games.
+    """
+    comp = game_components(team_games).sort_values(['TEAM_ID', 'GAME_DATE', 'GAME_ID']).reset_index(drop=True)
+    grouped = comp.groupby(['TEAM_ID', 'SEASON'], sort=False)
+    sums = grouped[COMPONENTS].cumsum()
+
+    if prior_games:
+        # Previous season's per-game rates for the same team, scaled to `prior_games` games
+        per_game = comp.groupby(['TEAM_ID', 'SEASON'])[COMPONENTS].mean()
+        prev = per_game.groupby(level='TEAM_ID').shift(1) * prior_games
+        prior = comp[['TEAM_ID', 'SEASON']].merge(prev.reset_index(), on=['TEAM_ID', 'SEASON'], how='left')
+        sums = sums + prior[COMPONENTS].fillna(0).values
+
+    out = pd.concat([comp[['TEAM_ID', 'SEASON', 'GAME_DATE']], metrics_from_sums(sums)], axis=1)
+    out['GP'] = grouped.cumcount() + 1
+    return out.sort_values('GAME_DATE').reset_index(drop=True)
+
+
+def assign_trailing_archetypes(trailing):
+    """Label each point-in-time metric row with the saved team KMeans (stable Type_N ids)."""
+    from team_clustering import load_cluster_models
+
+    models = load_cluster_models()
+    trailing = trailing.copy()
+    trailing['OPP_ARCHETYPE'] = pd.Series(None, index=trailing.index, dtype=object)
+    if models is None:
+        return trailing
+    scaler, kmeans = models
+    feature_cols = list(scaler.feature_names_in_)
+    if any(c not in trailing.columns for c in feature_cols):
+        return trailing
+    ok = trailing[feature_cols].notna().all(axis=1)
+    if ok.any():
+        labels = kmeans.predict(scaler.transform(trailing.loc[ok, feature_cols]))
+        trailing.loc[ok, 'OPP_ARCHETYPE'] = [f"Type_{x}" for x in labels]
+    return trailing
+
+
+def load_trailing_team_metrics(path=TEAM_GAMES_FILE):
+    if not os.path.exists(path):
+        return None
+    trailing = build_trailing_team_metrics(pd.read_parquet(path))
+    return assign_trailing_archetypes(trailing)
+
+
+def attach_opponent_metrics(df, trailing, abbr_to_id):
+    """
+    Add SEASON, OPP_ABBR, OPP_TEAM_ID, OPP_ARCHETYPE and OPP_<metric> to `df` (one
+    player or the whole league), each as of the opponent's last game strictly before
+    GAME_DATE. A single sorted merge_asof handles every row at once.
+    """
+    df['SEASON'] = season_from_dates(df['GAME_DATE']).values
+    df['OPP_ABBR'] = df['MATCHUP'].fillna('').str.extract(r'(?: @ | vs\. )(.*)$')[0].fillna('').str.strip().values
+    df['OPP_TEAM_ID'] = df['OPP_ABBR'].map(abbr_to_id)
+
+    left = pd.DataFrame({
+        'GAME_DATE': pd.to_datetime(df['GAME_DATE']).values,
+        'OPP_TEAM_ID': df['OPP_TEAM_ID'].fillna(-1).astype(np.int64).values,
+        '_ROW': np.arange(len(df)),
+    }).sort_values('GAME_DATE', kind='stable')
+
+    right = trailing.rename(columns={'TEAM_ID': 'OPP_TEAM_ID'})
+    right = right.rename(columns={m: f'OPP_{m}' for m in METRIC_COLUMNS})
+    right = right[['GAME_DATE', 'OPP_TEAM_ID', 'OPP_ARCHETYPE'] + [f'OPP_{m}' for m in METRIC_COLUMNS]]
+    right = right.astype({'OPP_TEAM_ID': np.int64})
+
+    merged = pd.merge_asof(left, right, on='GAME_DATE', by='OPP_TEAM_ID', allow_exact_matches=False)
+    merged = merged.sort_values('_ROW')
+    for col in ['OPP_ARCHETYPE'] + [f'OPP_{m}' for m in METRIC_COLUMNS]:
+        df[col] = merged[col].values
+    return df
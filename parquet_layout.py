@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+
+PROCESSED_DATA_DIR = "processed_data"
+MASTER_FILE = os.path.join(PROCESSED_DATA_DIR, "master_dataset.parquet")
+PLAYER_FILES_META = os.path.join(PROCESSED_DATA_DIR, "player_files.meta.json")
+
+# Layout of the parquet files features.py writes (see benchmarks/master_layout.py)
+PARQUET_COMPRESSION = 'zstd'
+COMPRESSION_LEVEL = 3
+# Small enough that a one-player or two-week read skips most of the master, large
+# enough that per-group dictionaries and overhead don't grow the file or slow full reads
+ROW_GROUP_ROWS = 16384
+# Columns whose distinct values are at most this fraction of the rows get dictionary
+# pages; near-unique columns are stored plain instead of building a dictionary parquet
+# would abandon anyway
+DICTIONARY_MAX_FRACTION = 0.1
+SORT_COLUMNS = ['PLAYER_ID', 'GAME_DATE']
+
+
+def season_start_year(dates):
+    """Start year of each date's season (seasons start in October, as in opponent_context)."""
+    dates = pd.to_datetime(pd.Series(dates))
+    return (dates.dt.year - (dates.dt.month < 10)).to_numpy()
+
+
+def sidecar_path(path):
+    return f"{path}.meta.json"
+
+
+def as_table(data):
+    """An arrow table as is; a DataFrame converted once, without its index."""
+    import pyarrow as pa
+    return data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+
+
+def dictionary_columns(table):
+    import pyarrow.compute as pc
+    limit = max(DICTIONARY_MAX_FRACTION * table.num_rows, 1)
+    return [c for c in table.column_names if pc.count_distinct(table[c]).as_py() <= limit]
+
+
+def date_range(dates):
+    dates = pd.to_datetime(pd.Series(dates)).dropna()
+    if dates.empty:
+        return None, None
+    return str(dates.min().date()), str(dates.max().date())
+
+
+def writer_options(table, sort_columns):
+    import pyarrow.parquet as pq
+    return {
+        'compression': PARQUET_COMPRESSION,
+        'compression_level': COMPRESSION_LEVEL,
+        'use_dictionary': dictionary_columns(table),
+        'sorting_columns': pq.SortingColumn.from_ordering(table.schema, [(c, 'ascending') for c in sort_columns]),
+    }
+
+
+def is_identity(order):
+    return bool((order == np.arange(len(order))).all())
+
+
+def write_parquet(data, path, sort_columns=SORT_COLUMNS, cluster_by_season=True, sidecar=True):
+    """
+    Write `data` (a DataFrame or an arrow table) sorted by `sort_columns` with the tuned
+    codec, dictionary and row-group settings. With `cluster_by_season` the rows are
+    ordered season first and no row group spans two seasons, so GAME_DATE statistics
+    still prune a date-filtered read while PLAYER_ID statistics prune a player-filtered
+    one within each season. Rows are gathered one season at a time, so the sorted copy
+    never exceeds a season. Returns the sidecar metadata (also written next to the file
+    when `sidecar`).
+    """
+    import pyarrow.parquet as pq
+    import pyarrow.compute as pc
+
+    start = time.perf_counter()
+    table = as_table(data)
+    dates = table['GAME_DATE'].to_numpy()
+    keys = [table[c].to_numpy() for c in reversed(sort_columns)]
+    seasons = season_start_year(dates) if cluster_by_season else np.zeros(table.num_rows, dtype=int)
+    # np.lexsort sorts by its last key first and is stable
+    order = np.lexsort(keys + [seasons])
+    del keys
+    seasons, dates = seasons[order], dates[order]
+
+    options = writer_options(table, sort_columns)
+    # Each write_table call starts a new row group, so one call per season keeps them apart
+    boundaries = np.flatnonzero(np.diff(seasons)) + 1
+    bounds = np.concatenate([[0], boundaries, [table.num_rows]]).astype(int)
+    in_order = is_identity(order)
+    with pq.ParquetWriter(path, table.schema, **options) as writer:
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if hi > lo:
+                part = table.slice(lo, hi - lo) if in_order else table.take(order[lo:hi])
+                writer.write_table(part, row_group_size=ROW_GROUP_ROWS)
+                del part
+
+    date_min, date_max = date_range(dates)
+    meta = {
+        'rows': table.num_rows,
+        'date_min': date_min,
+        'date_max': date_max,
+        'players': pc.count_distinct(table['PLAYER_ID']).as_py() if 'PLAYER_ID' in table.column_names else None,
+        'sort_columns': list(sort_columns),
+        'clustered_by_season': cluster_by_season,
+        'compression': f"{PARQUET_COMPRESSION}:{COMPRESSION_LEVEL}",
+        'row_group_rows': ROW_GROUP_ROWS,
+        'dictionary_columns': options['use_dictionary'],
+        'write_seconds': round(time.perf_counter() - start, 3),
+    }
+    if cluster_by_season:
+        meta['seasons'] = {}
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            lo_date, hi_date = date_range(dates[lo:hi])
+            meta['seasons'][f"{seasons[lo]}-{(seasons[lo] + 1) % 100:02d}"] = {
+                'rows': int(hi - lo), 'date_min': lo_date, 'date_max': hi_date}
+    if sidecar:
+        with open(sidecar_path(path), 'w') as f:
+            json.dump(meta, f, indent=2)
+    return meta
+
+
+def write_player_files(data, save_paths, lengths):
+    """
+    Write each player's consecutive block of `data` (a DataFrame or an arrow table,
+    `lengths` rows per save path) sorted by GAME_DATE, with the master's codec and
+    dictionary columns. The frame is converted to arrow at most once and sliced,
+    instead of once per file, and reordered only when some block isn't date-sorted
+    already (compute_features sorts each player's games). Returns the per-file
+    sidecar entries, which also carry the GAME_ID and team of each file's latest
+    game so the prediction cache and schedule lookup don't have to open it.
+    """
+    import pyarrow.parquet as pq
+
+    table = as_table(data)
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(int)
+    dates = table['GAME_DATE'].to_numpy()
+    block = np.repeat(np.arange(len(lengths)), lengths)
+    order = np.lexsort([dates, block])
+    del block
+    if not is_identity(order):
+        table, dates = table.take(order), dates[order]
+    game_ids = table['GAME_ID'] if 'GAME_ID' in table.column_names else None
+    matchups = table['MATCHUP'] if 'MATCHUP' in table.column_names else None
+
+    options = writer_options(table, ['GAME_DATE'])
+    entries = {}
+    for save_path, lo, hi in zip(save_paths, offsets[:-1], offsets[1:]):
+        pq.write_table(table.slice(lo, hi - lo), save_path, row_group_size=ROW_GROUP_ROWS, **options)
+        valid = dates[lo:hi][~np.isnat(dates[lo:hi])]
+        # NaT dates sort last, so the latest dated game is the last valid row
+        last = lo + len(valid) - 1
+        entries[os.path.basename(save_path)] = {
+            'rows': int(hi - lo),
+            'date_min': str(pd.Timestamp(valid.min()).date()) if len(valid) else None,
+            'date_max': str(pd.Timestamp(valid.max()).date()) if len(valid) else None,
+            'last_game_id': str(game_ids[last].as_py()) if len(valid) and game_ids is not None else None,
+            'team': str(matchups[last].as_py()).split(' ')[0] if len(valid) and matchups is not None else None,
+        }
+    return entries
+
+
+def read_sidecar(path):
+    meta_path = sidecar_path(path)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def read_filters(player_ids=None, start_date=None, end_date=None):
+    """pyarrow filters for a player and/or inclusive GAME_DATE range (None when unfiltered)."""
+    filters = []
+    if player_ids is not None:
+        filters.append(('PLAYER_ID', 'in', [int(p) for p in player_ids]))
+    if start_date is not None:
+        filters.append(('GAME_DATE', '>=', pd.Timestamp(start_date)))
+    if end_date is not None:
+        filters.append(('GAME_DATE', '<=', pd.Timestamp(end_date)))
+    return filters or None
+
+
+def read_parquet(path=MASTER_FILE, columns=None, player_ids=None, start_date=None, end_date=None):
+    """
+    Read a file written by write_parquet, skipping every row group whose PLAYER_ID or
+    GAME_DATE statistics rule it out. Unfiltered it's a plain pd.read_parquet.
+    """
+    return pd.read_parquet(path, columns=columns, filters=read_filters(player_ids, start_date, end_date))
+
+
+def write_player_files_meta(entries, path=PLAYER_FILES_META):
+    """Sidecar for the per-player files: {file name: {rows, date_min, date_max, last_game_id, team}}."""
+    with open(path, 'w') as f:
+        json.dump(entries, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    meta = read_sidecar(MASTER_FILE)
+    if meta is None:
+        print(f"No sidecar for {MASTER_FILE}. Run features.py first.")
+    else:
+        print(f"{MASTER_FILE}: {meta['rows']} rows, {meta['players']} players, "
+              f"{meta['date_min']} to {meta['date_max']} ({meta['compression']}, "
+              f"{meta['row_group_rows']}-row groups)")
+        for season, info in meta.get('seasons', {}).items():
+            print(f"  {season}: {info['rows']} rows, {info['date_min']} to {info['date_max']}")
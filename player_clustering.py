@@ -0,0 +1,244 @@
+import os
+import glob
+import json
+import numpy as np
+import pandas as pd
+import joblib
+
+DATA_DIR = "data"
+PROCESSED_DATA_DIR = "processed_data"
+
+if not os.path.exists(PROCESSED_DATA_DIR):
+    os.makedirs(PROCESSED_DATA_DIR)
+
+OUTPUT_FILE = os.path.join(PROCESSED_DATA_DIR, "player_roles.parquet")
+SCALER_FILE = os.path.join(PROCESSED_DATA_DIR, "player_role_scaler.joblib")
+KMEANS_FILE = os.path.join(PROCESSED_DATA_DIR, "player_role_kmeans.joblib")
+# Log file mtimes and games already folded into the centroids, per player-season
+STATE_FILE = os.path.join(PROCESSED_DATA_DIR, "player_role_state.json")
+
+N_ROLES = 6
+# Box-score totals a role profile is built from (raw log columns)
+ROLE_STATS = ['MIN', 'PTS', 'FGA', 'FG3A', 'FTA', 'AST', 'REB', 'OREB', 'BLK', 'STL', 'TOV']
+PER36_STATS = ['PTS', 'FGA', 'AST', 'REB', 'OREB', 'BLK', 'STL', 'TOV']
+ROLE_FEATURES = ['MIN_PG'] + [f'{s}_PER36' for s in PER36_STATS] + ['FG3A_RATE', 'FTA_RATE']
+# Player-seasons the centroids learn from: enough games and minutes for stable rates
+MIN_SEASON_GAMES = 10
+MIN_SEASON_MINUTES = 100
+# A game's PLAYER_ROLE comes from the player's previous ROLE_WINDOW games (at least
+# ROLE_MIN_GAMES of them), so it never sees the game itself and carries across seasons
+ROLE_WINDOW = 20
+ROLE_MIN_GAMES = 5
+BATCH_SIZE = 1024
+
+
+def role_profiles(sums, games):
+    """Minutes per game, per-36 rates and shot mix from summed ROLE_STATS and game counts."""
+    sums = {s: np.asarray(sums[s], dtype=float) for s in ROLE_STATS}
+    games = np.asarray(games, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profile = {'MIN_PG': sums['MIN'] / games}
+        for stat in PER36_STATS:
+            profile[f'{stat}_PER36'] = 36 * sums[stat] / sums['MIN']
+        profile['FG3A_RATE'] = sums['FG3A'] / sums['FGA']
+        profile['FTA_RATE'] = sums['FTA'] / sums['FGA']
+    return pd.DataFrame(profile)[ROLE_FEATURES].replace([np.inf, -np.inf], np.nan)
+
+
+def season_profiles(logs):
+    """One row per (PLAYER_ID, SEASON) with GAMES, total MIN and the ROLE_FEATURES."""
+    from opponent_context import season_from_dates
+
+    logs = logs.copy()
+    logs['SEASON'] = season_from_dates(logs['GAME_DATE']).values
+    for stat in ROLE_STATS:
+        logs[stat] = pd.to_numeric(logs[stat], errors='coerce').fillna(0).astype(float)
+    grouped = logs.groupby(['PLAYER_ID', 'SEASON'])
+    sums = grouped[ROLE_STATS].sum()
+    games = grouped.size()
+    profiles = role_profiles(sums, games.values)
+    out = sums.index.to_frame(index=False)
+    out['GAMES'] = games.values
+    out['TOTAL_MIN'] = sums['MIN'].values
+    return pd.concat([out, profiles], axis=1)
+
+
+def trailing_role_profiles(df, window=ROLE_WINDOW):
+    """
+    ROLE_FEATURES over each row's previous `window` games of the same player (the row
+    itself excluded), plus the number of games they cover. One sort and one prefix sum
+    over the whole frame, however many players it holds.
+    """
+    n = len(df)
+    dates = pd.to_datetime(df['GAME_DATE']).to_numpy()
+    players = df['PLAYER_ID'].to_numpy() if 'PLAYER_ID' in df.columns else np.zeros(n, dtype=np.int64)
+    order = np.lexsort([dates, players])
+
+    values = np.column_stack([pd.to_numeric(df[s], errors='coerce').fillna(0).to_numpy(dtype=float)[order]
+                              if s in df.columns else np.zeros(n) for s in ROLE_STATS])
+    prefix = np.vstack([np.zeros((1, len(ROLE_STATS))), np.cumsum(values, axis=0)])
+
+    sorted_players = players[order]
+    position = np.arange(n)
+    is_start = np.r_[True, sorted_players[1:] != sorted_players[:-1]] if n else np.zeros(0, dtype=bool)
+    group_start = np.maximum.accumulate(np.where(is_start, position, 0)) if n else position
+    lower = np.maximum(group_start, position - window)
+    sums = prefix[position] - prefix[lower]
+    games = position - lower
+
+    profiles = role_profiles({s: sums[:, j] for j, s in enumerate(ROLE_STATS)}, games)
+    profiles['ROLE_GAMES'] = games
+    # Back to the caller's row order
+    unsorted = np.empty(n, dtype=np.int64)
+    unsorted[order] = position
+    return profiles.iloc[unsorted].set_index(df.index)
+
+
+def load_role_models():
+    """Return the saved (scaler, kmeans) pair, or None if either is missing."""
+    if not (os.path.exists(SCALER_FILE) and os.path.exists(KMEANS_FILE)):
+        return None
+    return joblib.load(SCALER_FILE), joblib.load(KMEANS_FILE)
+
+
+def predict_roles(profiles, scaler, kmeans):
+    """Role_N labels for profile rows, None where any ROLE_FEATURE is missing."""
+    labels = pd.Series(None, index=profiles.index, dtype=object)
+    ok = profiles[ROLE_FEATURES].notna().all(axis=1)
+    if ok.any():
+        ids = kmeans.predict(scaler.transform(profiles.loc[ok, ROLE_FEATURES]))
+        labels.loc[ok] = [f"Role_{x}" for x in ids]
+    return labels
+
+
+def assign_player_roles(df, models=None):
+    """
+    PLAYER_ROLE for every row of `df` (one player or the whole league) from its trailing
+    games, added in place like the other feature nodes' columns (the master is too big
+    to copy for one column). Returns `df`.
+    """
+    models = models if models is not None else load_role_models()
+    if models is None or not all(c in df.columns for c in ['GAME_DATE', 'MIN']):
+        df['PLAYER_ROLE'] = 'None'
+        return df
+    profiles = trailing_role_profiles(df)
+    roles = predict_roles(profiles, *models)
+    roles[profiles['ROLE_GAMES'] < ROLE_MIN_GAMES] = None
+    df['PLAYER_ROLE'] = roles.fillna('None').values
+    return df
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {'files': {}, 'games': {}}
+    with open(STATE_FILE) as f:
+        return json.load(f)
+
+
+def read_player_logs(files):
+    frames = []
+    for f in files:
+        try:
+            frames.append(pd.read_parquet(f, columns=['PLAYER_ID', 'GAME_DATE'] + ROLE_STATS))
+        except Exception as e:
+            print(f"Warning: could not read {f}: {e}")
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def fit_role_clusters(profiles):
+    """Cold start: scaler plus MiniBatchKMeans over every eligible player-season, weighted by games."""
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.cluster import MiniBatchKMeans
+
+    print(f"Clustering {len(profiles)} player-seasons into {N_ROLES} roles...")
+    scaler = StandardScaler().fit(profiles[ROLE_FEATURES])
+    kmeans = MiniBatchKMeans(n_clusters=N_ROLES, batch_size=BATCH_SIZE, n_init=10, random_state=42)
+    kmeans.fit(scaler.transform(profiles[ROLE_FEATURES]), sample_weight=profiles['GAMES'].to_numpy(dtype=float))
+    return scaler, kmeans
+
+
+def build_player_roles(refit=False):
+    """
+    Keep the player role clustering current with the raw logs.
+
+    Only log files whose mtime changed since the last run are read. Their player-seasons'
+    new games are folded into the saved centroids with MiniBatchKMeans.partial_fit
+    (weighted by the number of new games), so a nightly refresh costs a handful of
+    file reads and one small update rather than a refit over every season. The
+    first run, or refit=True (`--refit`), fits from scratch; a refit keeps the previous
+    Role_N ids where the centroids still match, like team_clustering.
+    """
+    from team_clustering import align_to_previous_labels
+
+    files = sorted(glob.glob(os.path.join(DATA_DIR, "*_logs.parquet")))
+    if not files:
+        print(f"No player logs in {DATA_DIR}. Run ingestion.py first.")
+        return None
+
+    previous_models = load_role_models()
+    cold = refit or previous_models is None
+    state = {'files': {}, 'games': {}} if cold else load_state()
+    mtimes = {os.path.basename(f): os.path.getmtime(f) for f in files}
+    changed = [f for f in files if state['files'].get(os.path.basename(f)) != mtimes[os.path.basename(f)]]
+    print(f"Player roles: {len(changed)} of {len(files)} log files changed since the last run.")
+
+    logs = read_player_logs(changed) if changed else None
+    profiles = season_profiles(logs) if logs is not None else None
+    if profiles is not None:
+        eligible = profiles[(profiles['GAMES'] >= MIN_SEASON_GAMES) & (profiles['TOTAL_MIN'] >= MIN_SEASON_MINUTES)]
+        eligible = eligible.dropna(subset=ROLE_FEATURES)
+        keys = eligible['PLAYER_ID'].astype(str) + '|' + eligible['SEASON']
+        new_games = eligible['GAMES'].to_numpy() - np.array([state['games'].get(k, 0) for k in keys])
+
+        if cold:
+            if len(eligible) < N_ROLES:
+                print(f"Only {len(eligible)} eligible player-seasons; need at least {N_ROLES}.")
+                return None
+            scaler, kmeans = fit_role_clusters(eligible)
+            if previous_models is not None:
+                kmeans = align_to_previous_labels(scaler, kmeans, previous_models)
+                print("Aligned role ids with the previously saved clustering.")
+        else:
+            scaler, kmeans = previous_models
+            update = new_games > 0
+            if update.any():
+                kmeans.partial_fit(scaler.transform(eligible.loc[update, ROLE_FEATURES]),
+                                   sample_weight=new_games[update].astype(float))
+                print(f"Folded {int(new_games[update].sum())} new games from {int(update.sum())} "
+                      f"player-seasons into the role centroids.")
+        joblib.dump(scaler, SCALER_FILE)
+        joblib.dump(kmeans, KMEANS_FILE)
+        state['games'].update(dict(zip(keys, eligible['GAMES'].astype(int).tolist())))
+    else:
+        scaler, kmeans = previous_models
+
+    state['files'] = mtimes
+    with open(STATE_FILE, 'w') as f:
+        json.dump(state, f)
+
+    # Player-season table: unchanged players carried over, every row relabelled with
+    # the current centroids
+    table = profiles
+    if not cold and os.path.exists(OUTPUT_FILE):
+        kept = pd.read_parquet(OUTPUT_FILE)
+        if profiles is not None:
+            kept = kept[~kept['PLAYER_ID'].isin(profiles['PLAYER_ID'])]
+        table = pd.concat([kept.drop(columns=['PLAYER_ROLE'], errors='ignore'), profiles], ignore_index=True)
+    if table is None or table.empty:
+        return None
+    table = table.sort_values(['PLAYER_ID', 'SEASON']).reset_index(drop=True)
+    table['PLAYER_ROLE'] = predict_roles(table, scaler, kmeans).fillna('None').values
+    table.to_parquet(OUTPUT_FILE, index=False)
+    print(f"Saved roles for {len(table)} player-seasons to {OUTPUT_FILE}")
+
+    centers = pd.DataFrame(scaler.inverse_transform(kmeans.cluster_centers_), columns=ROLE_FEATURES,
+                           index=[f"Role_{i}" for i in range(kmeans.n_clusters)])
+    print("\nRole centroids:")
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(centers.round(2))
+    return table
+
+
+if __name__ == "__main__":
+    import sys
+    build_player_roles(refit='--refit' in sys.argv[1:])
@@ -0,0 +1,271 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.neighbors import KDTree
+from sklearn.preprocessing import StandardScaler
+
+from features import TARGETS, ROLLING_WINDOWS, rolling_column_name
+
+PROCESSED_DATA_DIR = "processed_data"
+MASTER_FILE = os.path.join(PROCESSED_DATA_DIR, "master_dataset.parquet")
+SIMILARITY_FILE = os.path.join(PROCESSED_DATA_DIR, "player_similarity.joblib")
+
+# Per-game box-score profile players are matched on (standardized before indexing)
+PROFILE_STATS = ['MIN', 'PTS', 'REB', 'AST', 'FG3M', 'FGA', 'FG3A', 'FTA', 'OREB', 'STL', 'BLK', 'TOV']
+# Players with at least this many games are indexed, profiled on their most recent PROFILE_GAMES
+ESTABLISHED_GAMES = 30
+PROFILE_GAMES = 60
+N_NEIGHBORS = 10
+# Below this many games a player's rolling averages are blended toward their neighbours'
+COLD_START_GAMES = max(w for w in ROLLING_WINDOWS if w != 'season')
+
+_index_cache = {}
+
+
+def profile_vector(logs):
+    """Per-game means of PROFILE_STATS over the given games, as a plain float array."""
+    columns = []
+    for c in PROFILE_STATS:
+        if c not in logs.columns:
+            columns.append(np.full(len(logs), np.nan))
+        elif logs[c].dtype == object:
+            columns.append(pd.to_numeric(logs[c], errors='coerce').to_numpy(dtype=float))
+        else:
+            # Numeric columns skip pd.to_numeric, which dominates the lookup time
+            columns.append(logs[c].to_numpy(dtype=float))
+    stats = np.column_stack(columns)
+    with np.errstate(invalid='ignore'):
+        return np.nanmean(stats, axis=0) if len(stats) else np.full(len(PROFILE_STATS), np.nan)
+
+
+def index_profiles(profiles):
+    """
+    Similarity index over per-game profiles (one row per player, PROFILE_STATS columns),
+    with each player's per-game target averages as the priors for look-alike rookies.
+    None when fewer than N_NEIGHBORS players have a complete profile.
+    """
+    profiles = profiles.dropna()
+    if len(profiles) < N_NEIGHBORS:
+        return None
+    prior_targets = [t for t in TARGETS if t == 'PRA' or t in PROFILE_STATS]
+    priors = np.column_stack([profiles['PTS'] + profiles['REB'] + profiles['AST'] if t == 'PRA' else profiles[t]
+                              for t in prior_targets])
+
+    scaler = StandardScaler().fit(profiles.values)
+    return {
+        'scaler': scaler,
+        'tree': KDTree(scaler.transform(profiles.values)),
+        'player_ids': profiles.index.to_numpy(),
+        # Per-game averages of each indexed player, columns in `prior_targets` order
+        'priors': priors,
+        'prior_targets': prior_targets,
+        'stats': PROFILE_STATS,
+    }
+
+
+def build_similarity_index(df=None):
+    """
+    Index every established player's recent per-game profile in a KD-tree and save it
+    with their per-game target averages, which become the priors for look-alike
+    rookies. Run once per refresh, after features.py. Serving only: training rows get
+    point-in-time indexes instead (blend_cold_start_rows).
+    """
+    if df is None:
+        if not os.path.exists(MASTER_FILE):
+            print(f"File {MASTER_FILE} not found. Run features.py first.")
+            return None
+        df = pd.read_parquet(MASTER_FILE, columns=['PLAYER_ID', 'GAME_DATE'] + PROFILE_STATS)
+    df = df.sort_values(['PLAYER_ID', 'GAME_DATE'])
+
+    counts = df.groupby('PLAYER_ID').size()
+    established = df[df['PLAYER_ID'].isin(counts[counts >= ESTABLISHED_GAMES].index)]
+    recent = established.groupby('PLAYER_ID').tail(PROFILE_GAMES)
+    stats = recent[PROFILE_STATS].apply(pd.to_numeric, errors='coerce')
+    index = index_profiles(stats.groupby(recent['PLAYER_ID']).mean())
+    if index is None:
+        print(f"Fewer than {N_NEIGHBORS} established players; not enough to build a similarity index.")
+        return None
+
+    joblib.dump(index, SIMILARITY_FILE)
+    print(f"Indexed {len(index['player_ids'])} established players (>= {ESTABLISHED_GAMES} games) to {SIMILARITY_FILE}")
+    return index
+
+
+def load_similarity_index():
+    """The saved index, cached per process and reloaded when the file changes; None if not built."""
+    if not os.path.exists(SIMILARITY_FILE):
+        return None
+    mtime = os.path.getmtime(SIMILARITY_FILE)
+    cached = _index_cache.get(SIMILARITY_FILE)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    index = joblib.load(SIMILARITY_FILE)
+    _index_cache[SIMILARITY_FILE] = (mtime, index)
+    return index
+
+
+def similar_players(index, raw_df, k=N_NEIGHBORS):
+    """
+    (rows, distances) of the k established players closest to this player's per-game
+    profile; index['player_ids'][rows] are their ids.
+    """
+    profile = profile_vector(raw_df)
+    if np.isnan(profile).any():
+        return None, None
+    # Standardize by hand: the scaler's input validation costs more than the tree query
+    scaled = (profile - index['scaler'].mean_) / index['scaler'].scale_
+    dist, idx = index['tree'].query(scaled.reshape(1, -1), k=k)
+    return idx[0], dist[0]
+
+
+def neighbour_priors(index, raw_df, k=N_NEIGHBORS):
+    """Inverse-distance weighted per-game averages of the player's nearest neighbours, per target."""
+    rows, dist = similar_players(index, raw_df, k)
+    if rows is None:
+        return None
+    weights = 1.0 / (dist + 1e-6)
+    blended = weights @ index['priors'][rows] / weights.sum()
+    return dict(zip(index['prior_targets'], blended))
+
+
+def shrink_to_prior(own, prior, n_games, window):
+    """
+    blend_cold_start's shrinkage of rolling averages `own` over `window` games, for
+    `n_games` games played: (n * own + (w - n) * prior) / w, the prior alone where own
+    is missing, and own as is where the window is full or there is no prior.
+    """
+    own = np.asarray(own, dtype=float)
+    with np.errstate(invalid='ignore'):
+        blended = np.where(np.isnan(own), prior, (n_games * own + (window - n_games) * prior) / window)
+    return np.where((window > n_games) & ~np.isnan(prior), blended, own)
+
+
+def blend_cold_start(latest_game, raw_df, index=None):
+    """
+    For players with fewer than COLD_START_GAMES games, shrink each rolling average
+    toward the neighbour prior by the games the window is missing:
+    (n * own + (w - n) * prior) / w. Leaves everyone else untouched.
+    """
+    n_games = len(raw_df)
+    if n_games >= COLD_START_GAMES:
+        return latest_game
+    index = index if index is not None else load_similarity_index()
+    if index is None:
+        return latest_game
+    priors = neighbour_priors(index, raw_df)
+    if priors is None:
+        return latest_game
+
+    latest_game = latest_game.copy()
+    for target, prior in priors.items():
+        for w in ROLLING_WINDOWS:
+            col = rolling_column_name(target, w)
+            if w == 'season' or w <= n_games or col not in latest_game.columns:
+                continue
+            latest_game[col] = shrink_to_prior(latest_game[col].to_numpy(dtype=float), prior, n_games, w)
+    return latest_game
+
+
+def blend_cold_start_rows(df, rows):
+    """
+    blend_cold_start over a master frame, for training: every row with fewer than
+    COLD_START_GAMES prior games is shrunk toward the neighbours of the profile of
+    those prior games, as serving does for a player with that history.
+
+    The neighbours and their priors are point-in-time: each season's cold rows are
+    matched against an index of the players established before that season started,
+    profiled on their games up to then, so no row's features see a later game (and
+    none of a held-out slice's). Rows from the first season on file stay unblended.
+
+    Game counts and profiles come from `df` (every game on file); the blend is
+    written in place into `rows`, a frame with df's index labels such as a filtered
+    copy of it, so the full frame is never copied. Returns `rows`.
+    """
+    if 'PLAYER_ID' not in df.columns:
+        return rows
+
+    dates = pd.to_datetime(df['GAME_DATE']).to_numpy()
+    order = np.lexsort((dates, df['PLAYER_ID'].to_numpy()))
+    player_ids, dates = df['PLAYER_ID'].to_numpy()[order], dates[order]
+    codes = pd.factorize(player_ids)[0]
+    n_games = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    cold = (n_games > 0) & (n_games < COLD_START_GAMES) & df.index[order].isin(rows.index)
+    if not cold.any():
+        return rows
+
+    def stat_rows(positions):
+        return np.column_stack([pd.to_numeric(df[c], errors='coerce').to_numpy(dtype=float)[order[positions]]
+                                for c in PROFILE_STATS])
+
+    # A cold row's history is its player's first games, so the per-game profile of
+    # each row's prior games is an exclusive cumulative mean over those alone
+    early = np.flatnonzero(n_games < COLD_START_GAMES)
+    stats = stat_rows(early)
+    present = ~np.isnan(stats)
+    values = np.where(present, stats, 0.0)
+    sums = pd.DataFrame(values).groupby(codes[early]).cumsum().to_numpy() - values
+    counts = pd.DataFrame(present.astype(float)).groupby(codes[early]).cumsum().to_numpy() - present
+    with np.errstate(invalid='ignore', divide='ignore'):
+        profiles = sums / counts
+    keep = cold[early] & ~np.isnan(profiles).any(axis=1)
+    cold_rows, profiles = early[keep], profiles[keep]
+    if not len(cold_rows):
+        return rows
+
+    from parquet_layout import season_start_year
+    seasons = season_start_year(dates[cold_rows])
+    n_players = codes.max() + 1
+    for season in np.unique(seasons):
+        # Players established before the season starts, profiled on their games up to then
+        before = dates < np.datetime64(f"{season}-10-01")
+        played = np.bincount(codes[before], minlength=n_players)[codes]
+        recent = np.flatnonzero(before & (played >= ESTABLISHED_GAMES) & (n_games >= played - PROFILE_GAMES))
+        if not len(recent):
+            continue
+        index = index_profiles(pd.DataFrame(stat_rows(recent), columns=PROFILE_STATS)
+                               .groupby(player_ids[recent]).mean())
+        if index is None:
+            continue
+
+        # A cold row's player has too few games to be in the index, so never matches themselves
+        in_season = seasons == season
+        scaled = (profiles[in_season] - index['scaler'].mean_) / index['scaler'].scale_
+        dist, idx = index['tree'].query(scaled, k=N_NEIGHBORS)
+        weights = 1.0 / (np.asarray(dist, dtype=float) + 1e-6)
+        priors = np.einsum('rk,rkt->rt', weights, index['priors'][np.asarray(idx)]) / weights.sum(axis=1, keepdims=True)
+
+        labels = df.index[order[cold_rows[in_season]]]
+        n = n_games[cold_rows[in_season]].astype(float)
+        for t, target in enumerate(index['prior_targets']):
+            for w in ROLLING_WINDOWS:
+                col = rolling_column_name(target, w)
+                if w == 'season' or col not in rows.columns:
+                    continue
+                rows.loc[labels, col] = shrink_to_prior(rows.loc[labels, col].to_numpy(dtype=float), priors[:, t], n, w)
+    return rows
+
+
+if __name__ == "__main__":
+    index = build_similarity_index()
+    if index is not None:
+        # Lookup latency over every short-history player on file
+        import glob
+        rookies = []
+        for path in glob.glob(os.path.join("data", "*_logs.parquet")):
+            logs = pd.read_parquet(path)
+            if 0 < len(logs) < COLD_START_GAMES:
+                rookies.append((os.path.basename(path).rsplit('_', 2)[0].replace('_', ' '), logs))
+        timings = []
+        for name, logs in rookies:
+            priors = neighbour_priors(index, logs)
+            start = time.perf_counter()
+            for _ in range(20):
+                neighbour_priors(index, logs)
+            timings.append((time.perf_counter() - start) * 1000 / 20)
+            if priors is not None:
+                print(f"  {name} ({len(logs)} games): prior PTS {priors['PTS']:.1f}, REB {priors['REB']:.1f}, AST {priors['AST']:.1f}")
+        if timings:
+            print(f"{len(timings)} short-history players, median lookup {np.median(timings):.3f} ms "
+                  f"(max {np.max(timings):.3f} ms)")
@@ -1,9 +1,11 @@
 import os
-import pandas as pd
-import numpy as np
-import joblib
-from xgboost import XGBRegressor
-from nba_api.stats.static import players
+import time
+import random
+
+# Heavy dependencies (pandas, joblib/xgboost, nba_api endpoints, features) are
+# imported inside the functions that need them so the CLI starts instantly and
+# only pays for the code path it actually runs. Models are served from their
+# exported NumPy trees (tree_export.py) when present, so xgboost isn't needed at all.
 
 PROCESSED_DATA_DIR = "processed_data"
 MASTER_FILE = os.path.join(PROCESSED_DATA_DIR, "master_dataset.parquet")
@@ -12,6 +14,7 @@ def get_model_file(target):
     return os.path.join(PROCESSED_DATA_DIR, f"xgb_{target.lower()}_model.joblib")
 
 def get_player_id(player_name):
+    from nba_api.stats.static import players
     nba_players = players.get_players()
     # Try exact match first
     matched = [p for p in nba_players if p['full_name'].lower() == player_name.lower()]
@@ -30,11 +33,6 @@ def get_player_id(player_name):
         
     return None
 
-import time
-import random
-from nba_api.stats.endpoints import playergamelog
-from features import engineered_features_for_player
-
 def get_headers():
     user_agents = [
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -47,9 +45,9 @@ def get_headers():
         'Referer': 'https://stats.nba.com/'
     }
 
-from nba_api.stats.endpoints import leaguegamelog
-
 def fetch_live_player_logs(player_id, season='2025-26'):
+    from nba_api.stats.endpoints import playergamelog
+
     print(f"Fetching live up-to-date data for player ID {player_id}...")
     
     max_retries = 3
@@ -81,21 +79,25 @@ def fetch_live_player_logs(player_id, season='2025-26'):
                 
     return None
 
-def load_latest_features(player_id, master_df, next_opponent='LAL'):
+def find_player_log_file(player_id, data_dir="data"):
     """
-    Get the most recent games for the player, fetch live data, and generate features 
-    for the UPCOMING game.
+    Locate a player's raw log file by ID alone ([Player_Name]_[Player_ID]_logs.parquet),
+    so lookups don't depend on the static name list matching the file name.
     """
+    import glob
+    matches = glob.glob(os.path.join(data_dir, f"*_{player_id}_logs.parquet"))
+    return matches[0] if matches else None
+
+def load_player_history(player_id):
+    """The player's local raw logs merged with any newer live games, sorted by date (None if empty)."""
+    import pandas as pd
+
     # 1. Fetch live data for current season to get games missed by the last full ingestion
     live_logs = fetch_live_player_logs(player_id)
     
     # 2. Get the player's historical raw logs directly
-    nba_players = players.get_players()
-    matched = [p for p in nba_players if p['id'] == player_id]
-    p_name = matched[0]['full_name'].replace(' ', '_') if matched else "Unknown"
-    
-    raw_file = os.path.join("data", f"{p_name}_{player_id}_logs.parquet")
-    if os.path.exists(raw_file):
+    raw_file = find_player_log_file(player_id)
+    if raw_file is not None:
         raw_df = pd.read_parquet(raw_file)
     else:
         print("Warning: Could not find raw historical game logs. Using only live data.")
@@ -112,9 +114,33 @@ def load_latest_features(player_id, master_df, next_opponent='LAL'):
     if combined_raw.empty:
         return None
         
-    # Sort chronologically before appending dummy row
+    # Sort chronologically before appending dummy rows
     combined_raw['GAME_DATE'] = pd.to_datetime(combined_raw['GAME_DATE'])
-    combined_raw = combined_raw.sort_values('GAME_DATE').reset_index(drop=True)
+    return combined_raw.sort_values('GAME_DATE').reset_index(drop=True)
+
+
+def player_team_abbr(history):
+    """The team a player currently plays for, from his most recent MATCHUP (e.g. 'BOS @ MIA' -> BOS)."""
+    return str(history['MATCHUP'].iloc[-1]).split(' ')[0]
+
+
+def format_matchup(team, opponent, home=True):
+    return f"{team} vs. {opponent}" if home else f"{team} @ {opponent}"
+
+
+def load_latest_features(player_id, master_df=None, next_opponent='LAL', expected_features=None, home=True):
+    """
+    Get the most recent games for the player, fetch live data, and generate features 
+    for the UPCOMING game. Only the features in `expected_features` (a saved model's
+    feature list) are computed; None computes and returns every model feature.
+    """
+    import pandas as pd
+    from features import compute_features, encode_model_rows, OPP_METRIC_FEATURES
+    from player_similarity import blend_cold_start
+
+    combined_raw = load_player_history(player_id)
+    if combined_raw is None:
+        return None
     
     # 4. Create a dummy "Upcoming Game" row. 
     # This forces features.py to calculate trailing averages (PTS_3g_avg, etc) 
@@ -124,83 +150,251 @@ def load_latest_features(player_id, master_df, next_opponent='LAL'):
     # Set date to tomorrow relative to their last game
     dummy_row['GAME_DATE'] = combined_raw['GAME_DATE'].iloc[-1] + pd.Timedelta(days=1)
     
-    # Use the requested opponent abbreviation! E.g., 'LAL vs. BOS' meaning playing Boston at home
-    dummy_row['MATCHUP'] = f"LAL vs. {next_opponent}"
+    # Use the requested opponent abbreviation from the player's own team's side,
+    # e.g. 'BOS vs. LAL' (home) or 'BOS @ LAL' (away), so arena and travel are real
+    dummy_row['MATCHUP'] = format_matchup(player_team_abbr(combined_raw), next_opponent, home)
     
     combined_raw = pd.concat([combined_raw, dummy_row], ignore_index=True)
 
     print(f"Engineering features across {len(combined_raw)-1} historical games against test opponent {next_opponent}...")
     
-    # 5. Run feature engineering on the combined dataset
-    engineered_df = engineered_features_for_player(combined_raw)
+    # 5. Run feature engineering on the combined dataset, limited to what the model consumes
+    engineered_df = compute_features(combined_raw, expected_features)
     
     # 6. Extract the dummy row (which now contains the accurate shifting averages)
     engineered_df = engineered_df.sort_values('GAME_DATE')
-    latest_game = engineered_df.iloc[-1].copy()
-    
-    # Extract only needed features
-    features_list = [
-        'B2B_FLAG', 'GAMES_LAST_7D',
-        'ALTITUDE', 'HIGH_ALTITUDE_FLAG',
-        'TRAVEL_DIST'
-    ]
-    
-    # Add target features for all 4 targets
-    for t in ['PTS', 'AST', 'REB', 'PRA']:
-        if f'{t}_3g_avg' in latest_game:
-            features_list.extend([f'{t}_3g_avg', f'{t}_5g_avg', f'{t}_10g_avg'])
-    
-    opp_features = ['OPP_PACE', 'OPP_DEF_RATING', 'OPP_EFG_PCT', 'OPP_TM_TOV_PCT', 'OPP_DREB_PCT']
-    for opp_f in opp_features:
-        if opp_f in latest_game:
-            features_list.append(opp_f)
-    
-    feat_dict = {}
-    for f in features_list:
-        feat_dict[f] = latest_game.get(f, 0)
-        
-    # Handle the dummy columns that the model expects
-    travel_dir = latest_game.get('TRAVEL_DIR', 'None')
-    tz_shift = latest_game.get('TZ_SHIFT', '0')
-    opp_arch = latest_game.get('OPP_ARCHETYPE', 'None')
+    latest_game = engineered_df.iloc[-1:]
+    # Short histories lean on similar veterans' averages (player_similarity.py)
+    latest_game = blend_cold_start(latest_game, combined_raw.iloc[:-1])
     
-    feat_dict[f'TRAVEL_DIR_{travel_dir}'] = 1
-    feat_dict[f'TZ_SHIFT_{tz_shift}'] = 1
-    if pd.notna(opp_arch) and opp_arch != 'None':
-        feat_dict[f'OPP_ARCHETYPE_{opp_arch}'] = 1
+    # Encode it exactly the way the training matrix was built
+    X_pred = encode_model_rows(latest_game, expected_features).reset_index(drop=True)
         
+    opp_arch = latest_game['OPP_ARCHETYPE'].iloc[0] if 'OPP_ARCHETYPE' in latest_game.columns else 'None'
     print(f"[DEBUG] Opponent: {next_opponent} | Archetype Loaded: {opp_arch}")
-    for opp_f in opp_features:
-        print(f"[DEBUG] {opp_f}: {feat_dict.get(opp_f, 'MISSING')}")
+    for opp_f in OPP_METRIC_FEATURES:
+        print(f"[DEBUG] {opp_f}: {X_pred[opp_f].iloc[0] if opp_f in X_pred.columns else 'MISSING'}")
     
-    return pd.DataFrame([feat_dict])
+    return X_pred
+
+
+def build_scenario_features(player_id, opponents=None, expected_features=None, game_date=None):
+    """
+    Engineered rows for the player's next game against every opponent, home and away.
+
+    Everything that only depends on the player's history (rolling averages, rest)
+    is computed once on history + one upcoming row. The matchup-dependent nodes
+    (arena, travel, opponent) then run once over a small frame of
+    [last game, scenario] pairs, so each scenario's travel is measured from the
+    player's real last arena. Returns (scenario_df, team_abbr) or None.
+    """
+    import pandas as pd
+    from features import compute_features, resolve_feature_nodes, FEATURE_REGISTRY, MATCHUP_NODES, ARENAS
+    from player_similarity import blend_cold_start
+
+    history = load_player_history(player_id)
+    if history is None:
+        return None
+    team = player_team_abbr(history)
+    if opponents is None:
+        opponents = sorted(a for a in ARENAS if a != team)
+    if game_date is None:
+        game_date = history['GAME_DATE'].iloc[-1] + pd.Timedelta(days=1)
+    game_date = pd.to_datetime(game_date)
+
+    # Pass 1: player-only features, once
+    upcoming = history.iloc[-1:].copy()
+    upcoming['GAME_ID'] = 'COMING_SOON'
+    upcoming['GAME_DATE'] = game_date
+    upcoming['MATCHUP'] = format_matchup(team, opponents[0])
+    base = compute_features(pd.concat([history, upcoming], ignore_index=True), expected_features, skip=MATCHUP_NODES)
+    base_row = blend_cold_start(base.iloc[-1:], history)
+
+    # Pass 2: matchup-dependent nodes over (last game, scenario) pairs
+    scenarios = [(opp, home) for opp in opponents for home in (True, False)]
+    last_game = history.iloc[-1:]
+    pair_rows = []
+    for opp, home in scenarios:
+        row = base_row.copy()
+        row['MATCHUP'] = format_matchup(team, opp, home)
+        pair_rows += [last_game, row]
+    pairs = pd.concat(pair_rows, ignore_index=True)
+
+    for name in resolve_feature_nodes(expected_features):
+        if name in MATCHUP_NODES:
+            pairs = FEATURE_REGISTRY[name]['compute'](pairs)
+
+    scenario_df = pairs.iloc[1::2].reset_index(drop=True)
+    scenario_df['OPPONENT'] = [opp for opp, _ in scenarios]
+    scenario_df['HOME_AWAY'] = ['HOME' if home else 'AWAY' for _, home in scenarios]
+    return scenario_df, team
+
+
+def predict_scenarios(player_name, targets=('PTS', 'REB', 'AST', 'PRA'), opponents=None, game_date=None,
+                      use_cache=True):
+    """
+    What-if grid: the player's projection for every target against every opponent,
+    home and away, from one feature-engineering pass and one batched predict per model.
+    Returns a DataFrame with one row per (opponent, home/away) scenario. A repeat
+    request is served whole from the prediction cache.
+    """
+    import pandas as pd
+    from tree_export import load_serving_model
+
+    player_id = get_player_id(player_name)
+    if not player_id:
+        print(f"Could not find exact match for player: {player_name}")
+        return None
+
+    model_files = {}
+    for target in targets:
+        model_file = get_model_file(target)
+        if os.path.exists(model_file):
+            model_files[target] = model_file
+        else:
+            print(f"No {target} model found at {model_file}; skipping it.")
+    if not model_files:
+        print("No models available. You must run model.py to train the models.")
+        return None
+
+    cache, key = None, None
+    if use_cache:
+        from prediction_cache import get_cache
+        cache = get_cache()
+        requested = ','.join(opponents) if opponents is not None else 'ALL'
+        scenario_date = str(pd.to_datetime(game_date).date()) if game_date is not None else None
+        key = cache_key(player_id, requested, 'BOTH', scenario_date, list(model_files.values()),
+                        kind='scenarios:' + ','.join(model_files))
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"Serving cached scenario grid for {player_name}.")
+            return pd.DataFrame(cached['grid'])
+
+    models = {target: load_serving_model(model_file) for target, model_file in model_files.items()}
+
+    from features import encode_model_rows
+    needed_features = sorted(set().union(*(m['features'] for m in models.values())))
+    built = build_scenario_features(player_id, opponents, needed_features, game_date)
+    if built is None:
+        print(f"No valid historical data found for {player_name} to base a prediction on.")
+        return None
+    scenario_df, team = built
+
+    grid = pd.DataFrame({
+        'PLAYER_NAME': player_name,
+        'TEAM': team,
+        'OPPONENT': scenario_df['OPPONENT'],
+        'HOME_AWAY': scenario_df['HOME_AWAY'],
+        'MATCHUP': scenario_df['MATCHUP'],
+        'GAME_DATE': scenario_df['GAME_DATE'].dt.strftime('%Y-%m-%d'),
+    })
+    for col in ['ALTITUDE', 'TRAVEL_DIST', 'OPP_ARCHETYPE']:
+        if col in scenario_df.columns:
+            grid[col] = scenario_df[col].round(1) if col == 'TRAVEL_DIST' else scenario_df[col]
+    for target, saved in models.items():
+        X = encode_model_rows(scenario_df, saved['features'])
+        grid[f'PREDICTED_{target}'] = saved['model'].predict(X).astype(float).round(1)
+    if cache is not None:
+        cache.put(key, {'grid': grid.astype(object).to_dict('records')})
+    return grid
+
+
+def export_scenarios(grid, path):
+    """Write the scenario grid as CSV or (records-oriented) JSON, based on the file extension."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.endswith('.json'):
+        grid.to_json(path, orient='records', date_format='iso', indent=2)
+    else:
+        grid.to_csv(path, index=False)
+    print(f"Saved {len(grid)} scenarios to {path}")
 
 
 def train_and_save_model():
     """
     Trains the XGBoost model on all data and saves it to disk for quick predictions.
     """
+    import pandas as pd
+    import joblib
+    from xgboost import XGBRegressor
+    import model as mdl
+
     print("Training production model on complete dataset...")
     df = pd.read_parquet(MASTER_FILE)
     
-    import model as mdl
     X, y, _ = mdl.prep_for_modeling(df, target_col='PTS')
     features = list(X.columns)
 
     
-    model = XGBRegressor(n_estimators=100, max_depth=5, learning_rate=0.1, random_state=42, n_jobs=-1)
+    model = XGBRegressor(**mdl.XGB_PARAMS)
     model.fit(X, y)
     
     # Save the model and the expected feature columns
-    joblib.dump({'model': model, 'features': features}, MODEL_FILE)
-    print(f"Model saved to {MODEL_FILE}")
+    model_file = get_model_file('PTS')
+    joblib.dump({'model': model, 'features': features}, model_file)
+    print(f"Model saved to {model_file}")
     return model, features
 
-from nba_api.stats.endpoints import playernextngames
+SCHEDULE_FILE = os.path.join("data", "upcoming_games.csv")
+
+
+def local_player_team(player_id):
+    """
+    (team abbreviation, date of last game) of the player's latest local game, or
+    (None, None). Read from the per-player files sidecar while it's newer than the raw
+    log, else from the log itself (games appended since the last feature refresh).
+    """
+    from prediction_cache import PLAYER_FILES_META, player_file_entry
+    raw_file = find_player_log_file(player_id)
+    if raw_file is None:
+        return None, None
+    entry = player_file_entry(raw_file)
+    if entry.get('team') and os.path.getmtime(PLAYER_FILES_META) >= os.path.getmtime(raw_file):
+        return entry['team'], entry['date_max']
+
+    import pandas as pd
+    logs = pd.read_parquet(raw_file, columns=['GAME_DATE', 'MATCHUP'])
+    if logs.empty:
+        return None, None
+    logs['GAME_DATE'] = pd.to_datetime(logs['GAME_DATE'])
+    logs = logs.sort_values('GAME_DATE')
+    return player_team_abbr(logs), str(logs['GAME_DATE'].iloc[-1].date())
+
+
+def next_game_from_schedule(team, after_date=None, schedule_file=SCHEDULE_FILE):
+    """(opponent, home) of the team's first game in the local schedule after `after_date`, or (None, None)."""
+    import csv
+    if team is None or not os.path.exists(schedule_file):
+        return None, None
+    with open(schedule_file, newline='') as f:
+        # ISO dates (YYYY-MM-DD) compare correctly as strings
+        games = [g for g in csv.DictReader(f)
+                 if team in (g['HOME_TEAM'], g['AWAY_TEAM'])
+                 and (after_date is None or g['GAME_DATE'][:10] > str(after_date)[:10])]
+    if not games:
+        return None, None
+    game = min(games, key=lambda g: g['GAME_DATE'])
+    home = game['HOME_TEAM'] == team
+    return (game['AWAY_TEAM'] if home else game['HOME_TEAM']), home
+
 
 def get_next_opponent(player_id):
-    """Fetches the player's true next scheduled opponent abbreviation from the NBA API."""
+    """
+    (opponent abbreviation, home) of the player's next scheduled game, from the local
+    schedule (data/upcoming_games.csv) or else the NBA API. (None, None) if neither
+    knows. The local lookup needs neither pandas nor the network, so a cached
+    prediction is served without either.
+    """
     print("Finding the player's next scheduled opponent...")
+    team, last_date = local_player_team(player_id)
+    try:
+        opponent, home = next_game_from_schedule(team, last_date)
+        if opponent is not None:
+            return opponent, home
+    except Exception as e:
+        print(f"Warning: could not read {SCHEDULE_FILE}: {e}")
+
+    # Fall back to the live schedule for games the local one doesn't have
+    from nba_api.stats.endpoints import playernextngames
     max_retries = 2
     for attempt in range(max_retries):
         try:
@@ -212,17 +406,12 @@ def get_next_opponent(player_id):
             )
             df = log.get_data_frames()[0]
             if not df.empty:
-                # Matchup format is usually e.g. "LAL vs. BOS" or "LAL @ DEN"
-                matchup = df['GAME_DATE'].iloc[0] # Note: the endpoint puts the matchup text in different columns sometimes
-                # Let's cleanly grab it from the standard opponent abbreviation columns if they exist
-                if 'VS_TEAM_ABBREVIATION' in df.columns:
-                    return df['VS_TEAM_ABBREVIATION'].iloc[0]
-                
-                # Fallback text parsing if the column is missing
-                for col in df.columns:
-                    val = str(df[col].iloc[0])
-                    if ' vs. ' in val: return val.split(' vs. ')[1][:3]
-                    if ' @ ' in val: return val.split(' @ ')[1][:3]
+                # One row per game with both sides' abbreviations; the player's side
+                # comes from his latest game (the team he's on now)
+                row = df.iloc[0]
+                home_team, away_team = row.get('HOME_TEAM_ABBREVIATION'), row.get('VISITOR_TEAM_ABBREVIATION')
+                if team is not None and team in (home_team, away_team):
+                    return (away_team, True) if team == home_team else (home_team, False)
             break
                     
         except Exception as e:
@@ -230,37 +419,49 @@ def get_next_opponent(player_id):
                 time.sleep(1)
             else:
                 pass
-                
-    # Fallback to local projections/schedule data if API fails
-    try:
-        proj_csv = os.path.join("data", "upcoming_projections.csv")
-        if os.path.exists(proj_csv):
-            proj_df = pd.read_csv(proj_csv)
-            nba_players = players.get_players()
-            matched = [p for p in nba_players if p['id'] == player_id]
-            if matched:
-                p_name = matched[0]['full_name']
-                player_row = proj_df[proj_df['PLAYER_NAME'] == p_name]
-                if not player_row.empty:
-                    return player_row['OPPONENT'].iloc[0]
-    except Exception as e:
-        pass
-        
-    return None
+    return None, None
 
 
-def predict_player_points(player_name, next_opponent=None, target='PTS'):
+def print_prediction(player_name, next_opponent, target, prediction, baseline_val, features, home=True):
+    print("\n[DEBUG] Final features passed to XGBoost:")
+    for col, value in features.items():
+        print(f"  {col}: {value}")
+
+    print("\n" + "="*50)
+    print(f" PREDICTION FOR: {player_name.upper()} {'vs' if home else '@'} {next_opponent} ({target})")
+    print("="*50)
+    print(f" Baseline (Last 5 Games Avg): {baseline_val:.1f} {target}")
+    print(f" XGBoost Model Prediction:    {prediction:.1f} {target}")
+    print("="*50 + "\n")
+
+
+def cache_key(player_id, opponent, home, game_date, model_files, kind='point'):
+    """
+    Prediction cache key (prediction_cache.py). The game date defaults to today's
+    slate, so an entry never outlives the day even when the live fetch could add a
+    game the last ingestion hasn't stored yet; the model hash and the latest ingested
+    GAME_ID (with the raw log's size and mtime) invalidate it as soon as a retrain or
+    a new game lands. Everything here is stdlib: no pandas, no network.
+    """
+    from prediction_cache import prediction_key, artifact_hash, latest_game_id
+    return prediction_key(player_id, opponent, home, game_date or time.strftime('%Y-%m-%d'),
+                          artifact_hash(model_files), latest_game_id(find_player_log_file(player_id)), kind)
+
+
+def predict_player_points(player_name, next_opponent=None, target='PTS', use_cache=True, home=None):
+    """
+    Predict `target` for the player's next game. The opponent and home/away come from
+    the schedule unless given; `home` (True/False) overrides the schedule's venue and
+    defaults to a home game when neither says.
+    """
     # Load data
     if not os.path.exists(MASTER_FILE):
         print(f"File {MASTER_FILE} not found. You must run main.py first to build the dataset.")
         return
         
-    df = pd.read_parquet(MASTER_FILE)
-    # Apply dummy encoding immediately so load_latest_features can find them
-    dummy_cols = ['TRAVEL_DIR', 'TZ_SHIFT']
-    if 'OPP_ARCHETYPE' in df.columns:
-        dummy_cols.append('OPP_ARCHETYPE')
-    df = pd.get_dummies(df, columns=dummy_cols, drop_first=True)
+    # The master dataset is only checked for existence here: the upcoming-game features
+    # are rebuilt from the player's raw logs, so reading (and dummy-encoding) the whole
+    # league table would only slow the CLI down.
     
     # Find player
     player_id = get_player_id(player_name)
@@ -268,9 +469,9 @@ def predict_player_points(player_name, next_opponent=None, target='PTS'):
         print(f"Could not find exact match for player: {player_name}")
         return
         
-    # Automatically get the next opponent if not strictly provided
+    # Automatically get the next opponent (and venue) if not strictly provided
     if not next_opponent:
-        next_opponent = get_next_opponent(player_id)
+        next_opponent, scheduled_home = get_next_opponent(player_id)
         if not next_opponent:
             print(f"\n[!] The live NBA API is currently rate-limiting your connection.")
             print(f"    Could not automatically fetch the schedule for {player_name}.")
@@ -278,52 +479,60 @@ def predict_player_points(player_name, next_opponent=None, target='PTS'):
             print(f"    Example: python predict.py \"{player_name}\" HOU\n")
             return
             
-        print(f"-> Automatically detected next opponent: {next_opponent}")
+        print(f"-> Automatically detected next opponent: {next_opponent} "
+              f"({'home' if scheduled_home else 'away'})")
+        if home is None:
+            home = scheduled_home
+    if home is None:
+        home = True
         
-    # Try to load model, if it doesn't exist, train it
     model_file = get_model_file(target)
-    if os.path.exists(model_file):
-        print(f"Loading existing {target} model...")
-        saved_data = joblib.load(model_file)
-        model = saved_data['model']
-        expected_features = saved_data['features']
-    else:
+    if not os.path.exists(model_file):
         print(f"No {target} model found. You must run model.py to train the models.")
         return
+
+    # Repeat queries skip the live fetch, feature engineering and model load entirely
+    cache, key = None, None
+    if use_cache:
+        from prediction_cache import get_cache
+        cache = get_cache()
+        key = cache_key(player_id, next_opponent, home, None, [model_file])
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"Serving cached {target} prediction (latest ingested game and model unchanged).")
+            print_prediction(player_name, next_opponent, target, cached['prediction'], cached['baseline'],
+                             cached['features'], home)
+            return
+
+    import pandas as pd
+    from tree_export import load_serving_model
+
+    print(f"Loading existing {target} model...")
+    saved_data = load_serving_model(model_file)
+    model = saved_data['model']
+    expected_features = saved_data['features']
         
     # Get player's latest features
-    X_pred = load_latest_features(player_id, df, next_opponent)
+    # (columns come back aligned and ordered exactly as the model was trained on)
+    X_pred = load_latest_features(player_id, next_opponent=next_opponent, expected_features=expected_features,
+                                  home=home)
     
     if X_pred is None:
         print(f"No valid historical data found for {player_name} to base a prediction on.")
         return
-        
-    # Ensure columns match what the model was trained on
-    # Add missing dummy columns with 0
-    for col in expected_features:
-        if col not in X_pred.columns:
-            X_pred[col] = 0
-            
-    # Order columns exactly as the model expects
-    X_pred = X_pred[expected_features]
-    
-    print("\n[DEBUG] Final features passed to XGBoost:")
-    for col in X_pred.columns:
-        print(f"  {col}: {X_pred[col].iloc[0]}")
     
     # Predict
-    prediction = model.predict(X_pred)[0]
+    prediction = float(model.predict(X_pred)[0])
     
     # Get their baseline (last 5 game average) for comparison
     baseline = X_pred.get(f'{target}_5g_avg', pd.Series([0]))
-    baseline_val = baseline.iloc[0] if not baseline.empty else 0
-    
-    print("\n" + "="*50)
-    print(f" PREDICTION FOR: {player_name.upper()} vs {next_opponent} ({target})")
-    print("="*50)
-    print(f" Baseline (Last 5 Games Avg): {baseline_val:.1f} {target}")
-    print(f" XGBoost Model Prediction:    {prediction:.1f} {target}")
-    print("="*50 + "\n")
+    baseline_val = float(baseline.iloc[0]) if not baseline.empty else 0.0
+
+    # The feature vector as plain Python values, in the model's column order
+    features = X_pred.iloc[:1].astype(object).to_dict('records')[0]
+    print_prediction(player_name, next_opponent, target, prediction, baseline_val, features, home)
+    if cache is not None:
+        cache.put(key, {'prediction': prediction, 'baseline': baseline_val, 'features': features})
 
 if __name__ == "__main__":
     import sys
@@ -332,16 +541,28 @@ if __name__ == "__main__":
         # Parse optional target e.g. --target=AST
         args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
         target_arg = [arg.split('=')[1] for arg in sys.argv[1:] if arg.startswith('--target=')]
+        out_arg = [arg.split('=', 1)[1] for arg in sys.argv[1:] if arg.startswith('--out=')]
         
         target = target_arg[0].upper() if target_arg else 'PTS'
+        use_cache = '--no-cache' not in sys.argv[1:]
         
         player = " ".join(args)
+        if '--scenarios' in sys.argv[1:]:
+            grid = predict_scenarios(player, use_cache=use_cache)
+            if grid is not None:
+                print(grid.to_string(index=False))
+                out_path = out_arg[0] if out_arg else os.path.join("data", f"scenarios_{player.replace(' ', '_')}.csv")
+                export_scenarios(grid, out_path)
+            sys.exit(0)
         opponent = None
         if len(args) >= 2 and len(args[-1]) == 3 and args[-1].isupper():
             opponent = args[-1]
             player = " ".join(args[:-1])
             
-        predict_player_points(player, opponent, target=target)
+        # --home / --away override the venue the schedule reports
+        venue = True if '--home' in sys.argv[1:] else False if '--away' in sys.argv[1:] else None
+        predict_player_points(player, opponent, target=target, use_cache=use_cache, home=venue)
     else:
-        print("Usage: python predict.py \"Player Name\" [OPTIONAL_OPPONENT_ABBR] [--target=PTS|AST|REB|PRA]")
+        print("Usage: python predict.py \"Player Name\" [OPTIONAL_OPPONENT_ABBR] [--target=PTS|AST|REB|PRA] [--home|--away] [--no-cache]")
+        print("       python predict.py \"Player Name\" --scenarios [--out=path.csv|path.json] [--no-cache]")
         print("Example: python predict.py \"LeBron James\" --target=AST")
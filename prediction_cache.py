@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from collections import OrderedDict
+
+# Stdlib only: predict.py consults the cache before it pays for
+# pandas, the live fetch, feature engineering or model loading.
+
+PROCESSED_DATA_DIR = "processed_data"
+CACHE_DB = os.path.join(PROCESSED_DATA_DIR, "prediction_cache.sqlite")
+# Written by parquet_layout.write_player_files_meta (kept in sync by name, not imported)
+PLAYER_FILES_META = os.path.join(PROCESSED_DATA_DIR, "player_files.meta.json")
+
+# Entries kept per process (dashboard/notebook sessions asking for the same players)
+MEMORY_ENTRIES = 256
+# Entries kept on disk across predict.py runs; the least recently used go first
+DISK_ENTRIES = 20000
+
+STAT_NAMES = ['memory_hits', 'disk_hits', 'misses', 'stores', 'evictions']
+
+# model file -> ((mtime_ns, size), md5) so repeated lookups don't re-hash the model
+_signature_cache = {}
+# sidecar path -> (mtime, {file name: entry})
+_meta_cache = {}
+
+
+def artifact_hash(model_files):
+    """
+    One hash over the model files a prediction came from. Each file's md5 is the
+    tree_export.model_signature of the .joblib, so a retrained model gets a new key
+    whether it's served from the booster or the exported trees.
+    """
+    signatures = []
+    for path in model_files:
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = _signature_cache.get(path)
+        if cached is None or cached[0] != stamp:
+            with open(path, 'rb') as f:
+                cached = (stamp, hashlib.md5(f.read()).hexdigest())
+            _signature_cache[path] = cached
+        signatures.append(cached[1])
+    return signatures[0] if len(signatures) == 1 else hashlib.md5('|'.join(signatures).encode()).hexdigest()
+
+
+def player_file_entry(log_file, meta_file=PLAYER_FILES_META):
+    """
+    The player's entry in the per-player files sidecar (parquet_layout.py), keyed by
+    the log file's name; {} without one. The sidecar is reread only when it changes.
+    """
+    if log_file is None or not os.path.exists(meta_file):
+        return {}
+    mtime = os.path.getmtime(meta_file)
+    cached = _meta_cache.get(meta_file)
+    if cached is None or cached[0] != mtime:
+        try:
+            with open(meta_file) as f:
+                cached = (mtime, json.load(f))
+        except (OSError, ValueError):
+            return {}
+        _meta_cache[meta_file] = cached
+    return cached[1].get(os.path.basename(log_file), {})
+
+
+def latest_game_id(log_file):
+    """
+    GAME_ID of the most recent game in a player's log as of the last feature refresh,
+    plus the raw log's (size, mtime) so games appended since (watcher.py, a new
+    ingestion) change it too. 'NONE' without a log file.
+    """
+    if log_file is None or not os.path.exists(log_file):
+        return 'NONE'
+    stat = os.stat(log_file)
+    game_id = player_file_entry(log_file).get('last_game_id')
+    return f"{game_id}@{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def prediction_key(player_id, opponent, home, game_date, model_hash, game_id, kind='point'):
+    """
+    (player, opponent, home/away, game date, model artifact hash, latest ingested GAME_ID)
+    as one string. A newly ingested game or a retrained model changes the key, so
+    stale entries are never served; they simply age out of the LRU.
+    """
+    venue = {True: 'HOME', False: 'AWAY'}.get(home, str(home))
+    return '|'.join([kind, str(player_id), str(opponent), venue, str(game_date), model_hash, str(game_id)])
+
+
+class PredictionCache:
+    """
+    Bounded LRU of prediction results (and the feature vectors behind them): an
+    OrderedDict in front of a sqlite table ordered by last access. Values are dicts
+    of plain Python values, stored as JSON. Hit/miss counts are kept per process
+    and, on disk, across runs (`python prediction_cache.py` prints them).
+    """
+
+    def __init__(self, path=CACHE_DB, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.memory = OrderedDict()
+        self.session = dict.fromkeys(STAT_NAMES, 0)
+        self._conn = None
+
+    def connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=10)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY, value TEXT NOT NULL,
+                    created REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0);
+                CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+                CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, count INTEGER NOT NULL);
+            """)
+        return self._conn
+
+    def count(self, name, n=1):
+        """Add to a hit/miss counter, for this process and in the on-disk totals."""
+        self.session[name] += n
+        try:
+            with self.connect() as conn:
+                conn.execute("INSERT INTO stats (name, count) VALUES (?, ?) "
+                             "ON CONFLICT(name) DO UPDATE SET count = count + excluded.count", (name, n))
+        except sqlite3.Error:
+            pass
+
+    def remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """The cached value for `key`, or None on a miss."""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.count('memory_hits')
+            return self.memory[key]
+        try:
+            with self.connect() as conn:
+                row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                                 (time.time(), key))
+        except sqlite3.Error as e:
+            print(f"Warning: prediction cache unavailable ({e}); computing from scratch.")
+            row = None
+        if row is None:
+            self.count('misses')
+            return None
+        self.count('disk_hits')
+        value = json.loads(row[0])
+        self.remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self.remember(key, value)
+        now = time.time()
+        try:
+            with self.connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO entries (key, value, created, last_access, hits) "
+                             "VALUES (?, ?, ?, ?, 0)", (key, json.dumps(value), now, now))
+                evicted = conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_entries,)).rowcount
+        except sqlite3.Error as e:
+            print(f"Warning: could not store the prediction in {self.path}: {e}")
+            return
+        self.count('stores')
+        if evicted:
+            self.count('evictions', evicted)
+
+    def stats(self):
+        """{'session': this process's counts, 'total': counts across runs, 'entries': rows on disk}."""
+        totals = dict.fromkeys(STAT_NAMES, 0)
+        entries = 0
+        if os.path.exists(self.path):
+            conn = self.connect()
+            totals.update(dict(conn.execute("SELECT name, count FROM stats").fetchall()))
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {'session': dict(self.session), 'total': totals, 'entries': entries,
+                'memory_entries': len(self.memory)}
+
+    def clear(self):
+        self.memory.clear()
+        if os.path.exists(self.path):
+            with self.connect() as conn:
+                conn.execute("DELETE FROM entries")
+                conn.execute("DELETE FROM stats")
+
+
+def hit_rate(counts):
+    hits = counts['memory_hits'] + counts['disk_hits']
+    lookups = hits + counts['misses']
+    return hits / lookups if lookups else 0.0
+
+
+def format_stats(counts):
+    return (f"{counts['memory_hits']} memory hits, {counts['disk_hits']} disk hits, {counts['misses']} misses "
+            f"({hit_rate(counts):.0%} hit rate), {counts['stores']} stored, {counts['evictions']} evicted")
+
+
+_cache = None
+
+
+def get_cache():
+    """The process-wide cache, so repeated calls in one session share the in-memory LRU."""
+    global _cache
+    if _cache is None:
+        _cache = PredictionCache()
+    return _cache
+
+
+if __name__ == "__main__":
+    import sys
+    cache = get_cache()
+    if '--clear' in sys.argv[1:]:
+        cache.clear()
+        print(f"Cleared {cache.path}.")
+    else:
+        stats = cache.stats()
+        print(f"{cache.path}: {stats['entries']} of {cache.disk_entries} entries")
+        print(f"  All runs: {format_stats(stats['total'])}")
@@ -2,9 +2,12 @@ import os
 import time
 import pandas as pd
 import numpy as np
-import joblib
+from tree_export import load_serving_model
 from predict import fetch_live_player_logs
-from features import engineered_features_for_player
+from features import compute_features, encode_model_rows
+from player_similarity import blend_cold_start
+from conformal import MIN_WINDOW, add_prediction_intervals
+from drift_monitor import DriftMonitor
 from nba_api.stats.static import players
 
 DATA_DIR = "data"
@@ -26,6 +29,95 @@ def get_active_rotational_players():
     active_players = [p for p in nba_players if p['is_active']]
     return {p['id']: p['full_name'] for p in active_players}
 
+def load_projection_models():
+    """(models, expected features per model, union of every model's inputs)."""
+    models = {}
+    model_features = {} # Store expected features per model
+    for name, mfile in MODEL_FILES.items():
+        saved_data = load_serving_model(mfile)
+        models[name] = saved_data['model']
+        model_features[name] = saved_data['features']
+    # Union of every model's inputs: the feature registry computes just this sub-graph
+    needed_features = sorted(set().union(*model_features.values()))
+    return models, model_features, needed_features
+
+
+def project_player(p_name, raw_df, upcoming_window, models, model_features, needed_features, label='',
+                   monitor=None):
+    """
+    Project one player's next game in `upcoming_window` from their raw logs. Returns the
+    projection row, or None when their team has no game in the window or they have been
+    out for more than 14 days. A DriftMonitor, if given, records the model inputs and
+    predictions until the game's result lands.
+    """
+    last_matchup = raw_df.iloc[-1]['MATCHUP']
+    # Extract team they play FOR from the matchup (e.g. LAL @ BOS -> LAL)
+    team_abbr = last_matchup.split(' ')[0]
+    
+    # Check if this team is playing in our window
+    team_games = upcoming_window[(upcoming_window['HOME_TEAM'] == team_abbr) | (upcoming_window['AWAY_TEAM'] == team_abbr)]
+    if team_games.empty:
+        return None # No games soon
+        
+    next_game = team_games.iloc[0]
+    opponent = next_game['AWAY_TEAM'] if next_game['HOME_TEAM'] == team_abbr else next_game['HOME_TEAM']
+    format_matchup = f"{team_abbr} vs. {opponent}" if next_game['HOME_TEAM'] == team_abbr else f"{team_abbr} @ {opponent}"
+    
+    # INJURY / INACTIVE FILTERING (14-DAY THRESHOLD)
+    last_game_date = pd.to_datetime(raw_df.iloc[-1]['GAME_DATE'])
+    next_game_date = pd.to_datetime(next_game['GAME_DATE'])
+    days_missed = (next_game_date - last_game_date).days
+    
+    if days_missed > 14:
+        print(f"Skipping {p_name} ({team_abbr}) - Inactive/Injured (missed {days_missed} days).")
+        return None
+        
+    print(f"{label}Projecting {p_name} ({team_abbr}) vs {opponent} on {next_game_date.date()}...")
+    
+    # 2. Append dummy row exactly like predict.py
+    dummy_row = raw_df.iloc[-1:].copy()
+    dummy_row['GAME_ID'] = str(next_game['GAME_ID'])
+    dummy_row['GAME_DATE'] = next_game['GAME_DATE']
+    dummy_row['MATCHUP'] = format_matchup
+    
+    combined_raw = pd.concat([raw_df, dummy_row], ignore_index=True)
+    
+    # 3. Engineer only the features some model actually consumes
+    engineered_df = compute_features(combined_raw, needed_features)
+    engineered_df = engineered_df.sort_values('GAME_DATE')
+    latest_game = engineered_df.iloc[-1:]
+    # Short histories: the models see rolling averages leaned toward statistically
+    # similar veterans; the reported baseline stays the player's own
+    model_row = blend_cold_start(latest_game, raw_df)
+        
+    # 4. Predict across all 4 models, each encoded against its own expected columns
+    preds, model_inputs = {}, {}
+    for m_name, m_obj in models.items():
+        X_model = encode_model_rows(model_row, model_features[m_name])
+        preds[m_name] = float(m_obj.predict(X_model)[0])
+        if monitor is not None:
+            model_inputs.update(X_model.iloc[0].to_dict())
+    if monitor is not None:
+        monitor.record_projection(raw_df['PLAYER_ID'].iloc[-1], next_game['GAME_DATE'], model_inputs, preds)
+        
+    baseline_pts = latest_game['PTS_5g_avg'].iloc[0] if 'PTS_5g_avg' in latest_game.columns else 0
+    # Picks the minutes bucket of the conformal interval tables
+    recent_min = pd.to_numeric(raw_df['MIN'], errors='coerce').tail(MIN_WINDOW).mean() if 'MIN' in raw_df.columns else np.nan
+        
+    return {
+        'PLAYER_NAME': p_name,
+        'TEAM': team_abbr,
+        'OPPONENT': opponent,
+        'GAME_DATE': next_game['GAME_DATE'].date(),
+        'PREDICTED_PTS': round(preds.get('PTS', 0), 1),
+        'PREDICTED_AST': round(preds.get('AST', 0), 1),
+        'PREDICTED_REB': round(preds.get('REB', 0), 1),
+        'PREDICTED_PRA': round(preds.get('PRA', 0), 1),
+        'BASELINE_5G_PTS': round(baseline_pts, 1),
+        'MIN_5G_AVG': round(recent_min, 1),
+    }
+
+
 def prepare_and_run_projections():
     print("Loading schedule and models...")
     if not os.path.exists(SCHEDULE_FILE):
@@ -44,17 +136,11 @@ def prepare_and_run_projections():
     schedule_df = pd.read_csv(SCHEDULE_FILE)
     schedule_df['GAME_DATE'] = pd.to_datetime(schedule_df['GAME_DATE'])
     
-    # Load all models
-    models = {}
-    model_features = {} # Store expected features per model
-    for name, mfile in MODEL_FILES.items():
-        saved_data = joblib.load(mfile)
-        models[name] = saved_data['model']
-        model_features[name] = saved_data['features']
+    models, model_features, needed_features = load_projection_models()
     
-    master_df = pd.read_parquet(MASTER_FILE)
     # Get team-level defensive stats from the master dataset to map onto upcoming games
-    opp_stats_df = master_df[['OPP_TEAM_ID', 'SEASON_ID', 'OPP_PACE', 'OPP_DEF_RATING', 'OPP_EFG_PCT', 'OPP_TM_TOV_PCT', 'OPP_DREB_PCT']].drop_duplicates()
+    opp_cols = ['OPP_TEAM_ID', 'SEASON_ID', 'OPP_PACE', 'OPP_DEF_RATING', 'OPP_EFG_PCT', 'OPP_TM_TOV_PCT', 'OPP_DREB_PCT']
+    opp_stats_df = pd.read_parquet(MASTER_FILE, columns=opp_cols).drop_duplicates()
     
     active_players = get_active_rotational_players()
     
@@ -85,6 +171,8 @@ def prepare_and_run_projections():
     player_ids_with_data = [int(f.split('_')[-2]) for f in local_files if f.endswith('_logs.parquet')]
     
     players_to_predict = [pid for pid in player_ids_with_data if pid in active_players]
+    # Earlier projections whose games are now in the logs update the drift statistics
+    monitor = DriftMonitor()
     
     
     for count, pid in enumerate(players_to_predict):
@@ -95,111 +183,44 @@ def prepare_and_run_projections():
         p_file = os.path.join(DATA_DIR, f"{p_name.replace(' ', '_')}_{pid}_logs.parquet")
         raw_df = pd.read_parquet(p_file)
         if raw_df.empty: continue
+        monitor.resolve(raw_df)
         
-        last_matchup = raw_df.iloc[-1]['MATCHUP']
-        # Extract team they play FOR from the matchup (e.g. LAL @ BOS -> LAL)
-        team_abbr = last_matchup.split(' ')[0]
-        
-        # Check if this team is playing in our window
-        team_games = upcoming_window[(upcoming_window['HOME_TEAM'] == team_abbr) | (upcoming_window['AWAY_TEAM'] == team_abbr)]
-        if team_games.empty:
-            continue # No games soon
-            
-        next_game = team_games.iloc[0]
-        opponent = next_game['AWAY_TEAM'] if next_game['HOME_TEAM'] == team_abbr else next_game['HOME_TEAM']
-        format_matchup = f"{team_abbr} vs. {opponent}" if next_game['HOME_TEAM'] == team_abbr else f"{team_abbr} @ {opponent}"
-        
-        # INJURY / INACTIVE FILTERING (14-DAY THRESHOLD)
-        last_game_date = pd.to_datetime(raw_df.iloc[-1]['GAME_DATE'])
-        next_game_date = pd.to_datetime(next_game['GAME_DATE'])
-        days_missed = (next_game_date - last_game_date).days
-        
-        if days_missed > 14:
-            print(f"Skipping {p_name} ({team_abbr}) - Inactive/Injured (missed {days_missed} days).")
-            continue
-            
-        print(f"[{count+1}/{len(players_to_predict)}] Projecting {p_name} ({team_abbr}) vs {opponent} on {next_game_date.date()}...")
-        
-        # 2. Append dummy row exactly like predict.py
-        dummy_row = raw_df.iloc[-1:].copy()
-        dummy_row['GAME_ID'] = str(next_game['GAME_ID'])
-        dummy_row['GAME_DATE'] = next_game['GAME_DATE']
-        dummy_row['MATCHUP'] = format_matchup
-        
-        combined_raw = pd.concat([raw_df, dummy_row], ignore_index=True)
-        
-        # 3. Engineer features
-        engineered_df = engineered_features_for_player(combined_raw)
-        engineered_df = engineered_df.sort_values('GAME_DATE')
-        latest_game = engineered_df.iloc[-1].copy()
-        
-        # 4. Fill Feature dict
-        features_list = [
-            'B2B_FLAG', 'GAMES_LAST_7D',
-            'ALTITUDE', 'HIGH_ALTITUDE_FLAG',
-            'TRAVEL_DIST'
-        ]
-        
-        # Add target features for all 4 targets
-        for t in ['PTS', 'AST', 'REB', 'PRA']:
-            features_list.extend([f'{t}_3g_avg', f'{t}_5g_avg', f'{t}_10g_avg'])
-            
-        feat_dict = {}
-        for f in features_list:
-            feat_dict[f] = latest_game.get(f, 0)
-            
-        # Add opponent defensive stats from Master table (if available)
-        opp_feat = ['OPP_PACE', 'OPP_DEF_RATING', 'OPP_EFG_PCT', 'OPP_TM_TOV_PCT', 'OPP_DREB_PCT']
-        for o_f in opp_feat:
-            feat_dict[o_f] = latest_game.get(o_f, 0) # Usually these come out of the inner join in features.py if team_clusters exist
-            
-        travel_dir = latest_game.get('TRAVEL_DIR', 'None')
-        tz_shift = latest_game.get('TZ_SHIFT', '0')
-        opp_arch = latest_game.get('OPP_ARCHETYPE', 'None')
-        
-        feat_dict[f'TRAVEL_DIR_{travel_dir}'] = 1
-        feat_dict[f'TZ_SHIFT_{tz_shift}'] = 1
-        if pd.notna(opp_arch) and opp_arch != 'None':
-            feat_dict[f'OPP_ARCHETYPE_{opp_arch}'] = 1
-            
-        # Re-initialize the base dataframe with all features
-        X_pred = pd.DataFrame([feat_dict])
-            
-        # 5. Predict across all 4 models
-        preds = {}
-        for m_name, m_obj in models.items():
-            expected_features = model_features[m_name]
-            
-            # Align with this specific model's expected columns
-            X_model = X_pred.copy()
-            for col in expected_features:
-                if col not in X_model.columns:
-                    X_model[col] = 0
-            X_model = X_model[expected_features]
-            
-            preds[m_name] = float(m_obj.predict(X_model)[0])
-            
-        all_projections.append({
-            'PLAYER_NAME': p_name,
-            'TEAM': team_abbr,
-            'OPPONENT': opponent,
-            'GAME_DATE': next_game['GAME_DATE'].date(),
-            'PREDICTED_PTS': round(preds.get('PTS', 0), 1),
-            'PREDICTED_AST': round(preds.get('AST', 0), 1),
-            'PREDICTED_REB': round(preds.get('REB', 0), 1),
-            'PREDICTED_PRA': round(preds.get('PRA', 0), 1),
-            'BASELINE_5G_PTS': round(feat_dict.get('PTS_5g_avg', 0), 1),
-        })
+        projection = project_player(p_name, raw_df, upcoming_window, models, model_features, needed_features,
+                                    label=f"[{count+1}/{len(players_to_predict)}] ", monitor=monitor)
+        if projection is not None:
+            all_projections.append(projection)
 
     if all_projections:
         results_df = pd.DataFrame(all_projections)
         results_df = results_df.sort_values('PREDICTED_PTS', ascending=False)
-        results_df.to_csv(PROJECTIONS_FILE, index=False)
+        
+        # Price any supplied prop lines with the Monte Carlo over/under engine
+        from prop_probabilities import add_prop_probabilities
+        results_df = add_prop_probabilities(results_df)
+        # Split-conformal PRED_LOW_/PRED_HIGH_ columns from the calibrated quantile tables
+        results_df = add_prediction_intervals(results_df)
+        
+        # Swap the CSV in whole so the dashboard never reads a half-written file
+        tmp_path = PROJECTIONS_FILE + ".tmp"
+        results_df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, PROJECTIONS_FILE)
         print(f"\nSuccessfully saved {len(results_df)} projections to {PROJECTIONS_FILE}")
+
+        from publish import publish_artifacts
+        publish_artifacts()
+        monitor.save()
+        print("\nDrift vs training distribution:")
+        monitor.print_summary()
         print("\nTop 5 Projections:")
         print(results_df.head().to_string(index=False))
     else:
         print("\nNo players had matches in the upcoming 3 days to project.")
 
 if __name__ == "__main__":
-    prepare_and_run_projections()
+    import sys
+    if '--season' in sys.argv[1:]:
+        # Every remaining scheduled game, not just each team's next one
+        from season_projections import project_rest_of_season
+        project_rest_of_season()
+    else:
+        prepare_and_run_projections()
@@ -0,0 +1,176 @@
+import os
+import numpy as np
+import pandas as pd
+
+DATA_DIR = "data"
+PROCESSED_DATA_DIR = "processed_data"
+MASTER_FILE = os.path.join(PROCESSED_DATA_DIR, "master_dataset.parquet")
+RESIDUAL_MODEL_FILE = os.path.join(PROCESSED_DATA_DIR, "residual_model.joblib")
+PROJECTIONS_FILE = os.path.join(DATA_DIR, "upcoming_projections.csv")
+# Optional sportsbook lines: PLAYER_NAME plus any of LINE_PTS, LINE_REB, LINE_AST, LINE_PRA
+LINES_FILE = os.path.join(DATA_DIR, "prop_lines.csv")
+
+# Stats drawn jointly so their correlation is preserved; PRA is derived from their sum
+SIM_STATS = ['PTS', 'REB', 'AST']
+LINE_TARGETS = ['PTS', 'REB', 'AST', 'PRA']
+
+# Cap on stored residual rows so the artifact stays small and sampling stays cache friendly
+MAX_RESIDUAL_ROWS = 20000
+
+
+def fit_residual_model(holdout_frac=0.2):
+    """
+    Fit the joint residual distribution from out-of-sample errors.
+
+    For each simulated stat we refit the production XGBoost configuration on the
+    earliest (1 - holdout_frac) of game dates and predict the most recent slice.
+    Residuals are standardized by sqrt(prediction) (count-like stats get noisier
+    as their mean grows) and only rows with all three stats are kept, so each
+    stored row is one real game's joint (PTS, REB, AST) error.
+    """
+    import joblib
+    from xgboost import XGBRegressor
+    import model as mdl
+
+    if not os.path.exists(MASTER_FILE):
+        print(f"File {MASTER_FILE} not found. Run features.py first.")
+        return None
+
+    df = pd.read_parquet(MASTER_FILE)
+    cutoff = df['GAME_DATE'].quantile(1 - holdout_frac)
+    print(f"Fitting residual model on games after {pd.Timestamp(cutoff).date()}...")
+
+    z_cols = {}
+    for stat in SIM_STATS:
+        X, y, _ = mdl.prep_for_modeling(df, target_col=stat)
+        is_holdout = (df.loc[X.index, 'GAME_DATE'] > cutoff).values
+
+        xgb_model = XGBRegressor(**mdl.XGB_PARAMS)
+        xgb_model.fit(X[~is_holdout], y[~is_holdout])
+        preds = np.clip(xgb_model.predict(X[is_holdout]), 0, None)
+
+        resid = y[is_holdout].values - preds
+        z_cols[stat] = pd.Series(resid / np.sqrt(np.maximum(preds, 1.0)), index=X.index[is_holdout])
+        print(f"  {stat}: {is_holdout.sum()} held-out games | residual std {resid.std():.2f}")
+
+    # Align on the original master row so each row is one player-game's joint error
+    z_df = pd.DataFrame(z_cols).dropna()
+    if len(z_df) > MAX_RESIDUAL_ROWS:
+        z_df = z_df.sample(MAX_RESIDUAL_ROWS, random_state=42)
+
+    residual_model = {
+        'stats': SIM_STATS,
+        'z': z_df[SIM_STATS].to_numpy(dtype=np.float32),
+        'corr': z_df[SIM_STATS].corr().to_numpy(),
+        'cutoff': str(pd.Timestamp(cutoff).date()),
+    }
+    joblib.dump(residual_model, RESIDUAL_MODEL_FILE)
+    print(f"Saved residual model ({len(z_df)} joint residuals) to {RESIDUAL_MODEL_FILE}")
+    print("Residual correlation (PTS, REB, AST):")
+    print(np.round(residual_model['corr'], 2))
+    return residual_model
+
+
+def simulate_slate(point_preds, z, n_samples=5000, seed=42):
+    """
+    Draw correlated stat lines for a whole slate at once.
+
+    point_preds: (players, stats) array of model predictions.
+    z: (n_residuals, stats) standardized joint residuals.
+    Returns a float32 tensor of shape (players, n_samples, stats).
+    """
+    rng = np.random.default_rng(seed)
+    point_preds = np.asarray(point_preds, dtype=np.float32)
+    scale = np.sqrt(np.maximum(point_preds, 1.0))
+
+    # Bootstrap whole residual rows so cross-stat correlation comes along for free
+    idx = rng.integers(0, len(z), size=(point_preds.shape[0], n_samples))
+    draws = z[idx]
+    draws *= scale[:, None, :]
+    draws += point_preds[:, None, :]
+
+    # Box score stats are non-negative integers
+    np.clip(draws, 0, None, out=draws)
+    np.rint(draws, out=draws)
+    return draws
+
+
+def over_under_probabilities(samples, lines):
+    """
+    samples: (players, n_samples) simulated values; lines: (players,) with NaN where no line.
+    Returns (p_over, p_under); a push (sample == line) counts toward neither side.
+    """
+    lines = np.asarray(lines, dtype=np.float32)[:, None]
+    p_over = (samples > lines).mean(axis=1)
+    p_under = (samples < lines).mean(axis=1)
+    missing = np.isnan(lines[:, 0])
+    p_over[missing] = np.nan
+    p_under[missing] = np.nan
+    return p_over, p_under
+
+
+def attach_over_under(projections_df, lines_df, residual_model, n_samples=5000, seed=42):
+    """Add LINE_*/P_OVER_*/P_UNDER_* columns for every target with a line."""
+    df = projections_df.copy()
+    line_cols = [f'LINE_{t}' for t in LINE_TARGETS if f'LINE_{t}' in lines_df.columns]
+    df = df.drop(columns=line_cols, errors='ignore')
+    df = df.merge(lines_df[['PLAYER_NAME'] + line_cols].drop_duplicates('PLAYER_NAME'), on='PLAYER_NAME', how='left')
+
+    point_preds = df[[f'PREDICTED_{s}' for s in SIM_STATS]].fillna(0).to_numpy(dtype=np.float32)
+    draws = simulate_slate(point_preds, residual_model['z'], n_samples=n_samples, seed=seed)
+
+    for target in LINE_TARGETS:
+        line_col = f'LINE_{target}'
+        if line_col not in df.columns:
+            continue
+        if target == 'PRA':
+            # Sum the joint draws, re-centred on the dedicated PRA model's projection
+            samples = draws.sum(axis=2)
+            samples += (df['PREDICTED_PRA'].to_numpy(dtype=np.float32) - point_preds.sum(axis=1))[:, None]
+        else:
+            samples = draws[:, :, SIM_STATS.index(target)]
+        p_over, p_under = over_under_probabilities(samples, df[line_col].to_numpy())
+        df[f'P_OVER_{target}'] = np.round(p_over, 3)
+        df[f'P_UNDER_{target}'] = np.round(p_under, 3)
+
+    return df
+
+
+def load_residual_model():
+    import joblib
+    if not os.path.exists(RESIDUAL_MODEL_FILE):
+        return None
+    return joblib.load(RESIDUAL_MODEL_FILE)
+
+
+def add_prop_probabilities(projections_df, n_samples=5000):
+    """
+    Hook used by prepare_projections: attach over/under probabilities if both the
+    residual model and a lines file are available, otherwise return the input unchanged.
+    """
+    if not os.path.exists(LINES_FILE):
+        return projections_df
+    residual_model = load_residual_model()
+    if residual_model is None:
+        print(f"Lines found at {LINES_FILE} but no residual model. Run prop_probabilities.py --fit first.")
+        return projections_df
+
+    lines_df = pd.read_csv(LINES_FILE)
+    print(f"Simulating {n_samples} stat lines per player for {len(projections_df)} projections...")
+    return attach_over_under(projections_df, lines_df, residual_model, n_samples=n_samples)
+
+
+if __name__ == "__main__":
+    import sys
+    if '--fit' in sys.argv[1:]:
+        fit_residual_model()
+    else:
+        if not os.path.exists(PROJECTIONS_FILE):
+            print(f"File {PROJECTIONS_FILE} missing! Run prepare_projections.py first.")
+        elif not os.path.exists(LINES_FILE):
+            print(f"File {LINES_FILE} missing! Add PLAYER_NAME,LINE_PTS,... lines to price.")
+        else:
+            proj_df = pd.read_csv(PROJECTIONS_FILE)
+            proj_df = add_prop_probabilities(proj_df)
+            proj_df.to_csv(PROJECTIONS_FILE, index=False)
+            print(f"Updated {PROJECTIONS_FILE} with over/under probabilities.")
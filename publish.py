@@ -0,0 +1,168 @@
+import os
+import io
+import json
+import gzip
+import time
+import shutil
+import hashlib
+import pandas as pd
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DATA_DIR = "data"
+PROJECTIONS_FILE = os.path.join(DATA_DIR, "upcoming_projections.csv")
+SCHEDULE_FILE = os.path.join(DATA_DIR, "upcoming_games.csv")
+
+# Versioned, precompressed dashboard artifacts served by dashboard_server.py:
+#   published/v<N>/{projections,games}.{json,csv}[.gz|.br], published/v<N>/teams/<TEAM>.json[.gz|.br]
+#   published/manifest.json  -> current version, per-file ETags, per-row change versions
+# A version directory is complete before manifest.json is swapped to point at it,
+# so the server never sees a half-written publish.
+PUBLISH_DIR = os.path.join(DATA_DIR, "published")
+MANIFEST_FILE = os.path.join(PUBLISH_DIR, "manifest.json")
+KEEP_VERSIONS = 5
+ROW_KEY = ['PLAYER_NAME', 'TEAM', 'GAME_DATE']
+
+
+def version_dir(version):
+    return os.path.join(PUBLISH_DIR, f"v{version}")
+
+
+def published_versions():
+    """Version numbers that have a v<N> directory on disk."""
+    if not os.path.isdir(PUBLISH_DIR):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(PUBLISH_DIR)
+                  if name.startswith('v') and name[1:].isdigit())
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return None
+    with open(MANIFEST_FILE) as f:
+        return json.load(f)
+
+
+def read_rows(path):
+    """Rows exactly as the dashboard sees them through PapaParse: every value a string."""
+    if not os.path.exists(path):
+        return []
+    return pd.read_csv(path, dtype=str, keep_default_na=False).to_dict('records')
+
+
+def row_key(row):
+    return '|'.join(str(row.get(c, '')) for c in ROW_KEY)
+
+
+def row_hash(row):
+    return hashlib.md5(json.dumps(row, sort_keys=True).encode()).hexdigest()
+
+
+def write_encoded(path, payload):
+    """Write `payload` plus .gz (and .br when brotli is installed) siblings; returns the raw ETag."""
+    with open(path, 'wb') as f:
+        f.write(payload)
+    with open(path + ".gz", 'wb') as f:
+        f.write(gzip.compress(payload, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", 'wb') as f:
+            f.write(brotli.compress(payload))
+    return hashlib.md5(payload).hexdigest()
+
+
+def to_csv_bytes(rows):
+    buf = io.StringIO()
+    pd.DataFrame(rows).to_csv(buf, index=False)
+    return buf.getvalue().encode()
+
+
+def to_json_bytes(rows):
+    return json.dumps(rows, separators=(',', ':')).encode()
+
+
+def publish_artifacts(projections_file=PROJECTIONS_FILE, schedule_file=SCHEDULE_FILE):
+    """
+    Publish the current projections and schedule as the next artifact version.
+    Each projection row remembers the version it last changed in, which is what
+    the server's `?since=` delta endpoint filters on; rows that disappeared are
+    kept as tombstones with the version they were removed in, until that version
+    is older than the oldest one still on disk (clients behind that floor get a
+    full resend instead of a delta).
+    """
+    previous = load_manifest()
+    # Continue past any version directories left behind, e.g. if manifest.json was lost
+    version = max([previous['version'] if previous else 0] + published_versions()) + 1
+    prev_rows = previous['rows'] if previous else {}
+    removed = dict(previous.get('removed', {})) if previous else {}
+
+    projections = read_rows(projections_file)
+    games = [g for g in read_rows(schedule_file) if g.get('HOME_TEAM') != 'Unknown_None']
+
+    rows = {}
+    for row in projections:
+        key, digest = row_key(row), row_hash(row)
+        old = prev_rows.get(key)
+        rows[key] = {'hash': digest, 'version': old['version'] if old and old['hash'] == digest else version}
+        removed.pop(key, None)
+    for key in prev_rows:
+        if key not in rows:
+            removed[key] = version
+
+    out_dir = version_dir(version)
+    staging = out_dir + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, "teams"))
+
+    files = {
+        'projections.json': write_encoded(os.path.join(staging, "projections.json"), to_json_bytes(projections)),
+        'projections.csv': write_encoded(os.path.join(staging, "projections.csv"), to_csv_bytes(projections)),
+        'games.json': write_encoded(os.path.join(staging, "games.json"), to_json_bytes(games)),
+        'games.csv': write_encoded(os.path.join(staging, "games.csv"), to_csv_bytes(games)),
+    }
+    teams = sorted({r['TEAM'] for r in projections if r.get('TEAM')})
+    for team in teams:
+        shard = {
+            'team': team,
+            'projections': [r for r in projections if r.get('TEAM') == team],
+            'games': [g for g in games if team in (g.get('HOME_TEAM'), g.get('AWAY_TEAM'))],
+        }
+        files[f'teams/{team}.json'] = write_encoded(os.path.join(staging, "teams", f"{team}.json"),
+                                                    json.dumps(shard, separators=(',', ':')).encode())
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(staging, out_dir)
+
+    # Old versions are only needed by requests already being served
+    for old in published_versions():
+        if old <= version - KEEP_VERSIONS:
+            shutil.rmtree(version_dir(old), ignore_errors=True)
+    # Without the previous manifest there is no row history to diff against
+    oldest = min(published_versions()) if previous else version
+    removed = {key: v for key, v in removed.items() if v >= oldest}
+
+    manifest = {
+        'version': version,
+        'published': time.time(),
+        'encodings': ['gzip'] + (['br'] if brotli is not None else []),
+        'files': files,
+        'teams': teams,
+        'rows': rows,
+        'removed': removed,
+        'oldest': oldest,
+    }
+    tmp_path = MANIFEST_FILE + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+    changed = sum(1 for r in rows.values() if r['version'] == version)
+    print(f"Published dashboard artifacts v{version} to {out_dir}: {len(projections)} projections "
+          f"({changed} changed, {sum(1 for v in removed.values() if v == version)} removed), "
+          f"{len(games)} games, {len(teams)} team shards.")
+    return version
+
+
+if __name__ == "__main__":
+    publish_artifacts()
@@ -0,0 +1,307 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from tree_export import load_serving_model
+from features import (
+    compute_features, encode_model_rows, resolve_feature_nodes, rolling_column_name, FEATURE_REGISTRY,
+    MATCHUP_NODES, SCHEDULE_NODES, ROLLING_WINDOWS, EWM_SPANS
+)
+from prepare_projections import MODEL_FILES, SCHEDULE_FILE, get_active_rotational_players
+from player_similarity import (
+    COLD_START_GAMES, blend_cold_start, load_similarity_index, neighbour_priors, shrink_to_prior
+)
+
+DATA_DIR = "data"
+SEASON_GAMES_FILE = os.path.join(DATA_DIR, "season_projections.csv")
+SEASON_TOTALS_FILE = os.path.join(DATA_DIR, "season_totals.csv")
+
+# Same inactive rule as the next-game projections
+INACTIVE_DAYS = 14
+
+
+def load_models():
+    models, model_features = {}, {}
+    for name, mfile in MODEL_FILES.items():
+        if not os.path.exists(mfile):
+            print(f"Model {name} missing at {mfile}! Run model.py first.")
+            return None
+        saved_data = load_serving_model(mfile)
+        models[name] = saved_data['model']
+        model_features[name] = saved_data['features']
+    return models, model_features
+
+
+def team_schedules(schedule_df):
+    """{team_abbr: DataFrame of its remaining games (GAME_ID, GAME_DATE, OPPONENT, MATCHUP from its side)} in date order."""
+    schedule_df = schedule_df.sort_values(['GAME_DATE', 'GAME_ID'])
+    home = pd.DataFrame({'TEAM': schedule_df['HOME_TEAM'], 'OPPONENT': schedule_df['AWAY_TEAM'],
+                         'MATCHUP': schedule_df['HOME_TEAM'] + ' vs. ' + schedule_df['AWAY_TEAM']})
+    away = pd.DataFrame({'TEAM': schedule_df['AWAY_TEAM'], 'OPPONENT': schedule_df['HOME_TEAM'],
+                         'MATCHUP': schedule_df['AWAY_TEAM'] + ' @ ' + schedule_df['HOME_TEAM']})
+    sides = pd.concat([home, away])
+    sides['GAME_ID'] = pd.concat([schedule_df['GAME_ID'], schedule_df['GAME_ID']]).astype(str).values
+    sides['GAME_DATE'] = pd.concat([schedule_df['GAME_DATE'], schedule_df['GAME_DATE']]).values
+    sides = sides.sort_values(['GAME_DATE', 'GAME_ID'], kind='stable')
+    return {team: g for team, g in sides.groupby('TEAM', sort=False)}
+
+
+def engineer_player_season(raw_df, team_games, needed_features):
+    """
+    History + one row per remaining scheduled game, as predict.build_scenario_features
+    does for one game. Everything that only depends on the player's history (role,
+    teammate availability, rolling averages) is computed once on history + the first
+    scheduled game and carried forward, so no node ever treats a placeholder as a game
+    played; the rolled targets' averages are then overwritten by the roll-forward.
+    Only the schedule and matchup nodes run over the future rows, which carry their
+    real dates and matchups, so rest, B2B, GAMES_LAST_7D, the arena/travel chain and
+    opponent context are exact. Returns (history_rows, future_rows).
+    """
+    upcoming = raw_df.iloc[-1:].copy()
+    upcoming['GAME_ID'] = team_games['GAME_ID'].iloc[0]
+    upcoming['GAME_DATE'] = pd.to_datetime(team_games['GAME_DATE'].iloc[0])
+    upcoming['MATCHUP'] = team_games['MATCHUP'].iloc[0]
+    future_nodes = SCHEDULE_NODES + MATCHUP_NODES
+    base = compute_features(pd.concat([raw_df, upcoming], ignore_index=True), needed_features, skip=future_nodes)
+    n_hist = len(raw_df)
+    base_row = blend_cold_start(base.iloc[n_hist:], raw_df)
+
+    future = pd.concat([base_row] * len(team_games), ignore_index=True)
+    future['GAME_ID'] = team_games['GAME_ID'].values
+    future['GAME_DATE'] = pd.to_datetime(team_games['GAME_DATE'].values)
+    future['MATCHUP'] = team_games['MATCHUP'].values
+
+    combined = pd.concat([base.iloc[:n_hist], future], ignore_index=True)
+    for name in resolve_feature_nodes(needed_features):
+        if name in future_nodes:
+            combined = FEATURE_REGISTRY[name]['compute'](combined)
+    return combined.iloc[:n_hist], combined.iloc[n_hist:].reset_index(drop=True)
+
+
+def blend_rolled_features(features, priors, n_games, windows=ROLLING_WINDOWS):
+    """
+    blend_cold_start for one roll-forward step: the rolled averages of players with
+    fewer than COLD_START_GAMES games (real plus projected) are shrunk toward their
+    neighbour priors. `priors` is {target: per-player prior, NaN where there is none}.
+    """
+    for target, prior in priors.items():
+        for w in windows:
+            col = rolling_column_name(target, w)
+            if w != 'season' and col in features:
+                features[col] = shrink_to_prior(features[col], prior, n_games, w)
+    return features
+
+
+class RollForward:
+    """
+    Trailing-window state for many players at once, mirroring features.trailing_window_means:
+    per player an exclusive cumulative sum and count of each rolled target over the
+    relevant tail of his history. Each step reads every active player's windows with
+    a handful of vectorized gathers, then appends that step's predictions.
+    """
+
+    def __init__(self, histories, targets, max_future_games, windows=ROLLING_WINDOWS, ewm_spans=EWM_SPANS):
+        self.targets = targets
+        self.windows = windows
+        self.ewm_spans = list(ewm_spans)
+        numeric = [w for w in windows if w != 'season']
+        max_w = max(numeric) if numeric else 0
+
+        tails, season_starts = [], []
+        for hist in histories:
+            n = len(hist)
+            seasons = hist['SEASON_ID'].to_numpy() if 'SEASON_ID' in hist.columns else np.zeros(n)
+            changed = seasons[::-1] != seasons[-1]
+            season_start = n - int(changed.argmax()) if changed.any() else 0
+            keep_from = max(0, n - max_w)
+            if 'season' in windows:
+                keep_from = min(keep_from, season_start)
+            tails.append(hist[targets].to_numpy(dtype=float)[keep_from:])
+            season_starts.append(season_start - keep_from)
+
+        self.n_players = len(histories)
+        self.pos = np.array([len(t) for t in tails])
+        self.season_start = np.array(season_starts)
+        width = (self.pos.max() if self.n_players else 0) + max_future_games + 1
+        self.cs = np.zeros((self.n_players, width, len(targets)))
+        self.cnt = np.zeros((self.n_players, width, len(targets)))
+        for i, tail in enumerate(tails):
+            valid = ~np.isnan(tail)
+            np.cumsum(np.where(valid, tail, 0.0), axis=0, out=self.cs[i, 1:len(tail) + 1])
+            np.cumsum(valid, axis=0, out=self.cnt[i, 1:len(tail) + 1])
+
+        # EWM state (weighted sum and weight) after each player's last real game
+        self.ewm_num, self.ewm_den = {}, {}
+        if self.ewm_spans:
+            from scipy.signal import lfilter
+        for span in self.ewm_spans:
+            decay = 1.0 - 2.0 / (span + 1.0)
+            num = np.zeros((self.n_players, len(targets)))
+            den = np.zeros((self.n_players, len(targets)))
+            for i, hist in enumerate(histories):
+                x = hist[targets].to_numpy(dtype=float)
+                valid = ~np.isnan(x)
+                num[i] = lfilter([1.0], [1.0, -decay], np.where(valid, x, 0.0), axis=0)[-1]
+                den[i] = lfilter([1.0], [1.0, -decay], valid.astype(float), axis=0)[-1]
+            self.ewm_num[span], self.ewm_den[span] = num, den
+
+    def features(self, players):
+        """{column: values} of every rolling feature for the next game of `players`."""
+        pos = self.pos[players]
+        out = {}
+        for w in self.windows:
+            lo = self.season_start[players] if w == 'season' else np.maximum(pos - int(w), 0)
+            total = self.cs[players, pos] - self.cs[players, lo]
+            count = self.cnt[players, pos] - self.cnt[players, lo]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = np.where(count > 0, total / count, np.nan)
+            for j, target in enumerate(self.targets):
+                out[rolling_column_name(target, w)] = means[:, j]
+        for span in self.ewm_spans:
+            num, den = self.ewm_num[span][players], self.ewm_den[span][players]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = np.where(den > 0, num / den, np.nan)
+            for j, target in enumerate(self.targets):
+                out[f'{target}_ewm{span}'] = means[:, j]
+        return out
+
+    def append(self, players, values):
+        """Record predicted `values` (len(players) x n_targets) as each player's next game."""
+        pos = self.pos[players]
+        self.cs[players, pos + 1] = self.cs[players, pos] + values
+        self.cnt[players, pos + 1] = self.cnt[players, pos] + 1
+        for span in self.ewm_spans:
+            decay = 1.0 - 2.0 / (span + 1.0)
+            self.ewm_num[span][players] = decay * self.ewm_num[span][players] + values
+            self.ewm_den[span][players] = decay * self.ewm_den[span][players] + 1
+        self.pos[players] = pos + 1
+
+
+def project_rest_of_season():
+    """
+    Project every remaining scheduled game for every active player.
+
+    Step k predicts every player's k-th remaining game in one batch per model; the
+    predictions are fed back into the rolling windows before step k+1, so recent-form
+    features roll forward on projected values. Schedule-driven features come straight
+    from the real dates and matchups.
+    """
+    print("Loading schedule and models...")
+    if not os.path.exists(SCHEDULE_FILE):
+        print(f"File {SCHEDULE_FILE} missing! Run fetch_schedule.py first.")
+        return None
+    loaded = load_models()
+    if loaded is None:
+        return None
+    models, model_features = loaded
+    needed_features = sorted(set().union(*model_features.values()))
+    # Targets whose rolling windows roll forward on their own model's predictions
+    rolled = [t for t in models if any(f.startswith(f'{t}_') for f in model_features[t])]
+
+    schedule_df = pd.read_csv(SCHEDULE_FILE)
+    schedule_df['GAME_DATE'] = pd.to_datetime(schedule_df['GAME_DATE'])
+    schedules = team_schedules(schedule_df)
+
+    active_players = get_active_rotational_players()
+    local_files = sorted(f for f in os.listdir(DATA_DIR) if f.endswith('_logs.parquet'))
+
+    # Short histories lean on similar veterans' averages, as in the next-game projections
+    index = load_similarity_index()
+    prior_targets = [t for t in rolled if index is not None and t in index['prior_targets']]
+
+    start = time.time()
+    names, player_teams, histories, futures, priors = [], [], [], [], []
+    for f in local_files:
+        pid = int(f.split('_')[-2])
+        if pid not in active_players:
+            continue
+        raw_df = pd.read_parquet(os.path.join(DATA_DIR, f))
+        if raw_df.empty:
+            continue
+        raw_df['GAME_DATE'] = pd.to_datetime(raw_df['GAME_DATE'])
+        raw_df = raw_df.sort_values('GAME_DATE').reset_index(drop=True)
+        team_abbr = raw_df.iloc[-1]['MATCHUP'].split(' ')[0]
+        team_games = schedules.get(team_abbr)
+        if team_games is None or team_games.empty:
+            continue
+        team_games = team_games[team_games['GAME_DATE'] > raw_df['GAME_DATE'].iloc[-1]]
+        if team_games.empty:
+            continue
+        if (team_games['GAME_DATE'].iloc[0] - raw_df['GAME_DATE'].iloc[-1]).days > INACTIVE_DAYS:
+            continue
+
+        history, future = engineer_player_season(raw_df, team_games, needed_features)
+        future['OPPONENT'] = team_games['OPPONENT'].values
+        names.append(active_players[pid])
+        player_teams.append(team_abbr)
+        histories.append(history)
+        futures.append(future)
+        player_priors = neighbour_priors(index, raw_df) if prior_targets and len(raw_df) < COLD_START_GAMES else None
+        priors.append([player_priors[t] if player_priors else np.nan for t in prior_targets])
+    print(f"Engineered schedules for {len(futures)} players in {time.time() - start:.1f}s.")
+    if not futures:
+        print("No active players have remaining scheduled games.")
+        return None
+
+    n_games = np.array([len(f) for f in futures])
+    n_history = np.array([len(h) for h in histories])
+    priors = np.array(priors, dtype=float).reshape(len(futures), len(prior_targets))
+    roll = RollForward(histories, rolled, n_games.max())
+
+    # All future rows in one frame ordered by (step, player): step k is one contiguous slice
+    all_future = pd.concat(futures, ignore_index=True)
+    all_future['_PLAYER'] = np.repeat(np.arange(len(futures)), n_games)
+    all_future['_STEP'] = np.concatenate([np.arange(n) for n in n_games])
+    all_future = all_future.sort_values(['_STEP', '_PLAYER'], kind='stable').reset_index(drop=True)
+    step_bounds = np.concatenate([[0], np.cumsum(np.bincount(all_future['_STEP']))])
+
+    step_frames = []
+    for step in range(n_games.max()):
+        rows = all_future.iloc[step_bounds[step]:step_bounds[step + 1]].copy()
+        players = rows['_PLAYER'].to_numpy()
+        step_features = blend_rolled_features(roll.features(players),
+                                              {t: priors[players, j] for j, t in enumerate(prior_targets)},
+                                              n_history[players] + step)
+        for col, values in step_features.items():
+            rows[col] = values
+
+        preds = {}
+        for m_name, m_obj in models.items():
+            preds[m_name] = m_obj.predict(encode_model_rows(rows, model_features[m_name])).astype(float)
+        roll.append(players, np.column_stack([preds[t] for t in rolled]) if rolled else np.zeros((len(players), 0)))
+
+        step_frames.append(pd.DataFrame({
+            'PLAYER_NAME': [names[i] for i in players],
+            'TEAM': [player_teams[i] for i in players],
+            'OPPONENT': rows['OPPONENT'].values,
+            'MATCHUP': rows['MATCHUP'].values,
+            'GAME_ID': rows['GAME_ID'].values,
+            'GAME_DATE': rows['GAME_DATE'].dt.strftime('%Y-%m-%d').values,
+            **{f'PREDICTED_{m}': np.round(p, 1) for m, p in preds.items()},
+        }))
+    print(f"Projected {int(n_games.sum())} player-games in {n_games.max()} batched steps "
+          f"({time.time() - start:.1f}s total).")
+
+    games_df = pd.concat(step_frames, ignore_index=True).sort_values(['GAME_DATE', 'TEAM', 'PLAYER_NAME'])
+    pred_cols = [c for c in games_df.columns if c.startswith('PREDICTED_')]
+    totals_df = games_df.groupby(['PLAYER_NAME', 'TEAM']).agg(
+        GAMES=('GAME_ID', 'count'), **{c.replace('PREDICTED_', 'TOTAL_'): (c, 'sum') for c in pred_cols}
+    ).reset_index()
+    for c in pred_cols:
+        total_col = c.replace('PREDICTED_', 'TOTAL_')
+        totals_df[total_col] = totals_df[total_col].round(1)
+        totals_df[c.replace('PREDICTED_', 'AVG_')] = (totals_df[total_col] / totals_df['GAMES']).round(1)
+    sort_col = 'TOTAL_PTS' if 'TOTAL_PTS' in totals_df.columns else 'GAMES'
+    totals_df = totals_df.sort_values(sort_col, ascending=False)
+
+    games_df.to_csv(SEASON_GAMES_FILE, index=False)
+    totals_df.to_csv(SEASON_TOTALS_FILE, index=False)
+    print(f"Saved {len(games_df)} game projections to {SEASON_GAMES_FILE}")
+    print(f"Saved {len(totals_df)} season totals to {SEASON_TOTALS_FILE}")
+    print("\nTop 5 Rest-of-Season Totals:")
+    print(totals_df.head().to_string(index=False))
+    return games_df, totals_df
+
+
+if __name__ == "__main__":
+    project_rest_of_season()
@@ -0,0 +1,236 @@
+import os
+import datetime
+import numpy as np
+import pandas as pd
+
+# Roughly what data/ holds today: ~525 active players over 4 seasons
+BASE_PLAYERS = 525
+SYNTHETIC_ID_START = 5000000
+# Where the "current" synthetic season stops; the rest of it becomes the upcoming schedule
+DEFAULT_CUTOFF = datetime.date(2026, 2, 20)
+
+# LeagueGameLog (player_or_team_abbreviation='P') column order
+LOG_COLUMNS = [
+    'SEASON_ID', 'PLAYER_ID', 'PLAYER_NAME', 'TEAM_ID', 'TEAM_ABBREVIATION', 'TEAM_NAME',
+    'GAME_ID', 'GAME_DATE', 'MATCHUP', 'WL', 'MIN', 'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A',
+    'FG3_PCT', 'FTM', 'FTA', 'FT_PCT', 'OREB', 'DREB', 'REB', 'AST', 'STL', 'BLK', 'TOV',
+    'PF', 'PTS', 'PLUS_MINUS', 'FANTASY_PTS', 'VIDEO_AVAILABLE',
+]
+
+
+def get_team_table():
+    """The 30 real franchises, so arena, travel and opponent lookups behave like production."""
+    from nba_api.stats.static import teams
+    nba_teams = sorted(teams.get_teams(), key=lambda t: t['abbreviation'])
+    return pd.DataFrame({
+        'TEAM_ID': [t['id'] for t in nba_teams],
+        'TEAM_ABBREVIATION': [t['abbreviation'] for t in nba_teams],
+        'TEAM_NAME': [t['full_name'] for t in nba_teams],
+    })
+
+
+def season_labels(n_seasons, last_season_start=2025):
+    return [f"{y}-{str(y + 1)[-2:]}" for y in range(last_season_start - n_seasons + 1, last_season_start + 1)]
+
+
+def generate_schedule(season, n_teams, rng):
+    """Random daily slates from late October to mid April (~41 home games per team)."""
+    start_year = int(season[:4])
+    start = datetime.date(start_year, 10, 22)
+    end = datetime.date(start_year + 1, 4, 13)
+    n_days = (end - start).days + 1
+    target_games = n_teams * 41
+
+    games_per_day = rng.poisson(target_games / n_days, size=n_days).clip(0, n_teams // 2)
+    rows = []
+    for day, n_games in enumerate(games_per_day):
+        if n_games == 0:
+            continue
+        order = rng.permutation(n_teams)[:2 * n_games]
+        date = start + datetime.timedelta(days=int(day))
+        for home, away in zip(order[0::2], order[1::2]):
+            rows.append((date, home, away))
+
+    sched = pd.DataFrame(rows, columns=['GAME_DATE', 'HOME_IDX', 'AWAY_IDX'])
+    sched['GAME_ID'] = [f"002{start_year % 100:02d}{i + 1:05d}" for i in range(len(sched))]
+    return sched
+
+
+def make_players(n_players, n_teams, rng):
+    """Per-player talent parameters; extra scale mostly adds deep-bench / two-way style players."""
+    ids = np.arange(SYNTHETIC_ID_START, SYNTHETIC_ID_START + n_players)
+    return pd.DataFrame({
+        'PLAYER_ID': ids,
+        'PLAYER_NAME': [f"Synthetic Player {i}" for i in range(n_players)],
+        'TEAM_IDX': rng.integers(0, n_teams, n_players),
+        'P_PLAY': rng.uniform(0.35, 0.97, n_players),
+        'MIN_MEAN': rng.gamma(4.0, 5.5, n_players).clip(4, 38),
+        'FGA_RATE': rng.uniform(0.2, 0.55, n_players),
+        'FG3_SHARE': rng.uniform(0.05, 0.6, n_players),
+        'FG2_PCT': rng.uniform(0.45, 0.62, n_players),
+        'FG3_PCT': rng.uniform(0.28, 0.42, n_players),
+        'FTA_RATE': rng.uniform(0.03, 0.2, n_players),
+        'FT_PCT': rng.uniform(0.6, 0.92, n_players),
+        'OREB_RATE': rng.uniform(0.01, 0.1, n_players),
+        'DREB_RATE': rng.uniform(0.05, 0.25, n_players),
+        'AST_RATE': rng.uniform(0.03, 0.3, n_players),
+        'BLK_RATE': rng.uniform(0.005, 0.05, n_players),
+        'TOV_RATE': rng.uniform(0.03, 0.1, n_players),
+    })
+
+
+def simulate_season(season, roster, team_table, rng):
+    """Box-score rows for every player appearance in one season, in LeagueGameLog schema."""
+    n_teams = len(team_table)
+    sched = generate_schedule(season, n_teams, rng)
+    home_wins = rng.random(len(sched)) < 0.55
+
+    # One row per (game, side): the team's perspective of the game
+    sides = pd.concat([
+        pd.DataFrame({'GAME_ID': sched['GAME_ID'], 'GAME_DATE': sched['GAME_DATE'],
+                      'TEAM_IDX': sched['HOME_IDX'], 'OPP_IDX': sched['AWAY_IDX'],
+                      'IS_HOME': True, 'WON': home_wins}),
+        pd.DataFrame({'GAME_ID': sched['GAME_ID'], 'GAME_DATE': sched['GAME_DATE'],
+                      'TEAM_IDX': sched['AWAY_IDX'], 'OPP_IDX': sched['HOME_IDX'],
+                      'IS_HOME': False, 'WON': ~home_wins}),
+    ], ignore_index=True)
+
+    # Everyone on the roster is a candidate; each plays with their own probability
+    apps = sides.merge(roster, on='TEAM_IDX')
+    apps = apps[rng.random(len(apps)) < apps['P_PLAY'].values].reset_index(drop=True)
+    n = len(apps)
+
+    minutes = rng.normal(apps['MIN_MEAN'].values, 5.0).clip(1, 48).round().astype(np.int64)
+    fga = rng.poisson(minutes * apps['FGA_RATE'].values)
+    fg3a = rng.binomial(fga, apps['FG3_SHARE'].values)
+    fg3m = rng.binomial(fg3a, apps['FG3_PCT'].values)
+    fg2m = rng.binomial(fga - fg3a, apps['FG2_PCT'].values)
+    fta = rng.poisson(minutes * apps['FTA_RATE'].values)
+    ftm = rng.binomial(fta, apps['FT_PCT'].values)
+    oreb = rng.poisson(minutes * apps['OREB_RATE'].values)
+    dreb = rng.poisson(minutes * apps['DREB_RATE'].values)
+    ast = rng.poisson(minutes * apps['AST_RATE'].values)
+    stl = rng.poisson(minutes * 0.03)
+    blk = rng.poisson(minutes * apps['BLK_RATE'].values)
+    tov = rng.poisson(minutes * apps['TOV_RATE'].values)
+    pf = rng.poisson(minutes * 0.07).clip(0, 6)
+    fgm = fg2m + fg3m
+    pts = 2 * fg2m + 3 * fg3m + ftm
+    reb = oreb + dreb
+
+    def pct(made, att):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(att > 0, np.round(made / np.maximum(att, 1), 3), 0.0)
+
+    abbr = team_table['TEAM_ABBREVIATION'].values
+    team_abbr = abbr[apps['TEAM_IDX'].values]
+    opp_abbr = abbr[apps['OPP_IDX'].values]
+    matchup = np.where(apps['IS_HOME'].values,
+                       pd.Series(team_abbr) + ' vs. ' + pd.Series(opp_abbr),
+                       pd.Series(team_abbr) + ' @ ' + pd.Series(opp_abbr))
+
+    out = pd.DataFrame({
+        'SEASON_ID': f"2{season[:4]}",
+        'PLAYER_ID': apps['PLAYER_ID'].values.astype(np.int64),
+        'PLAYER_NAME': apps['PLAYER_NAME'].values,
+        'TEAM_ID': team_table['TEAM_ID'].values[apps['TEAM_IDX'].values].astype(np.int64),
+        'TEAM_ABBREVIATION': team_abbr,
+        'TEAM_NAME': team_table['TEAM_NAME'].values[apps['TEAM_IDX'].values],
+        'GAME_ID': apps['GAME_ID'].values,
+        'GAME_DATE': pd.to_datetime(apps['GAME_DATE']).dt.strftime('%Y-%m-%d').values,
+        'MATCHUP': matchup,
+        'WL': np.where(apps['WON'].values, 'W', 'L'),
+        'MIN': minutes,
+        'FGM': fgm, 'FGA': fga, 'FG_PCT': pct(fgm, fga),
+        'FG3M': fg3m, 'FG3A': fg3a, 'FG3_PCT': pct(fg3m, fg3a),
+        'FTM': ftm, 'FTA': fta, 'FT_PCT': pct(ftm, fta),
+        'OREB': oreb, 'DREB': dreb, 'REB': reb, 'AST': ast,
+        'STL': stl, 'BLK': blk, 'TOV': tov, 'PF': pf, 'PTS': pts,
+        'PLUS_MINUS': np.round(rng.normal(0, 10, n)).astype(np.int64),
+        'FANTASY_PTS': (pts + 1.2 * reb + 1.5 * ast + 3 * stl + 3 * blk - tov).astype(float),
+        'VIDEO_AVAILABLE': np.ones(n, dtype=np.int64),
+    })
+    int_cols = ['FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'OREB', 'DREB', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
+    out[int_cols] = out[int_cols].astype(np.int64)
+    return out[LOG_COLUMNS], sched
+
+
+def team_game_logs(logs):
+    """
+    Team-level LeagueGameLog rows ('T' mode) summed from the player rows, written as
+    drop-in files for team_ingestion.py's local endpoint.
+    """
+    keys = ['SEASON_ID', 'TEAM_ID', 'TEAM_ABBREVIATION', 'TEAM_NAME', 'GAME_ID', 'GAME_DATE', 'MATCHUP', 'WL']
+    counts = ['FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'OREB', 'DREB', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
+    team = logs.groupby(keys, as_index=False, sort=False)[counts].sum()
+    # Regulation team minutes; synthetic player minutes don't add up to a real 240
+    team['MIN'] = 240
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for made, att, col in [('FGM', 'FGA', 'FG_PCT'), ('FG3M', 'FG3A', 'FG3_PCT'), ('FTM', 'FTA', 'FT_PCT')]:
+            team[col] = np.where(team[att] > 0, np.round(team[made] / team[att].clip(lower=1), 3), 0.0)
+    return team
+
+
+def generate_league(out_dir, scale=1.0, n_seasons=4, seed=42, cutoff=DEFAULT_CUTOFF):
+    """
+    Write a synthetic league into `out_dir` laid out exactly like the real store:
+    data/[Player_Name]_[Player_ID]_logs.parquet per player, data/upcoming_games.csv
+    holding the remainder of the current season after `cutoff`, and the team game
+    logs as local endpoint files (data/local_endpoints/team_game_log_<season>.parquet).
+    Returns a summary dict (players, rows, files).
+    """
+    rng = np.random.default_rng(seed)
+    data_dir = os.path.join(out_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+
+    team_table = get_team_table()
+    n_players = max(int(round(BASE_PLAYERS * scale)), len(team_table))
+    roster = make_players(n_players, len(team_table), rng)
+
+    endpoint_dir = os.path.join(data_dir, "local_endpoints")
+    os.makedirs(endpoint_dir, exist_ok=True)
+
+    season_frames = []
+    upcoming = None
+    for season in season_labels(n_seasons):
+        logs, sched = simulate_season(season, roster, team_table, rng)
+        if cutoff is not None and pd.Timestamp(sched['GAME_DATE'].max()) > pd.Timestamp(cutoff):
+            logs = logs[pd.to_datetime(logs['GAME_DATE']) <= pd.Timestamp(cutoff)]
+            upcoming = sched[pd.to_datetime(sched['GAME_DATE']) > pd.Timestamp(cutoff)]
+        season_frames.append(logs)
+        team_game_logs(logs).to_parquet(os.path.join(endpoint_dir, f"team_game_log_{season}.parquet"), index=False)
+        print(f"  Simulated {season}: {len(logs)} player-games.")
+
+    all_logs = pd.concat(season_frames, ignore_index=True)
+    for player_id, group_df in all_logs.groupby('PLAYER_ID'):
+        name = group_df['PLAYER_NAME'].iloc[0]
+        group_df.to_parquet(os.path.join(data_dir, f"{name.replace(' ', '_')}_{player_id}_logs.parquet"), index=False)
+
+    if upcoming is not None and not upcoming.empty:
+        abbr = team_table['TEAM_ABBREVIATION'].values
+        home = abbr[upcoming['HOME_IDX'].values]
+        away = abbr[upcoming['AWAY_IDX'].values]
+        pd.DataFrame({
+            'GAME_DATE': pd.to_datetime(upcoming['GAME_DATE']).dt.strftime('%Y-%m-%d').values,
+            'GAME_TIME': '7:00 pm ET',
+            'GAME_ID': upcoming['GAME_ID'].values,
+            'HOME_TEAM': home,
+            'AWAY_TEAM': away,
+            'MATCHUP_HOME': [f"{h} vs. {a}" for h, a in zip(home, away)],
+            'MATCHUP_AWAY': [f"{a} @ {h}" for h, a in zip(home, away)],
+        }).to_csv(os.path.join(data_dir, "upcoming_games.csv"), index=False)
+
+    summary = {'players': int(all_logs['PLAYER_ID'].nunique()), 'rows': int(len(all_logs)), 'seasons': n_seasons}
+    print(f"Synthetic league: {summary['players']} players, {summary['rows']} player-games -> {data_dir}")
+    return summary
+
+
+if __name__ == "__main__":
+    import sys
+    out_dir, scale = "synthetic_league", 1.0
+    for arg in sys.argv[1:]:
+        if arg.startswith('--scale='):
+            scale = float(arg.split('=')[1])
+        elif arg.startswith('--out='):
+            out_dir = arg.split('=')[1]
+    generate_league(out_dir, scale=scale)
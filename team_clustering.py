@@ -15,71 +15,143 @@ OUTPUT_FILE = os.path.join(PROCESSED_DATA_DIR, "team_clusters.parquet")
 SCALER_FILE = os.path.join(PROCESSED_DATA_DIR, "team_scaler.joblib")
 KMEANS_FILE = os.path.join(PROCESSED_DATA_DIR, "team_kmeans.joblib")
 
-def build_team_clusters():
-    print("Loading Team Defensive Metrics...")
-    if not os.path.exists(INPUT_FILE):
-        print(f"Error: {INPUT_FILE} not found. Run team_ingestion.py first.")
-        return
-        
-    df = pd.read_parquet(INPUT_FILE)
-    
-    # We want to cluster based on these specific defensive/style metrics
-    # Note: Depending on the exact NBA API version, 'TM_TOV_PCT' might be 'TOV_PCT'
-    # and we want Defensive Rebound % (DREB_PCT) to measure how well they finish defensive possessions.
-    
-    # Try to find the correct column names dynamically in case of slight API changes
+N_ARCHETYPES = 5
+# Defensive/style metrics the archetypes are clustered on
+CLUSTER_FEATURES = ['PACE', 'DEF_RATING', 'EFG_PCT', 'TM_TOV_PCT', 'DREB_PCT']
+
+
+def resolve_feature_cols(df):
+    """The clustering columns, or None (with a message) if the team metrics lack any of them."""
+    # team_ingestion merges Advanced with Four Factors, so these keep the same names
+    # whichever measure supplied them; they are also opponent_context's point-in-time
+    # metrics, which the saved scaler/KMeans label
     cols = df.columns.tolist()
-    
-    pace_col = 'PACE'
-    def_rtg_col = 'DEF_RATING'
-    efg_col = 'EFG_PCT' if 'EFG_PCT' in cols else 'EFG_PCT_ALLOWED'
-    tov_col = 'TM_TOV_PCT' if 'TM_TOV_PCT' in cols else 'TOV_PCT'
-    dreb_col = 'DREB_PCT' if 'DREB_PCT' in cols else 'REB_PCT'
-    
-    feature_cols = [pace_col, def_rtg_col, efg_col, tov_col, dreb_col]
-    
-    # Ensure all columns exist
+    feature_cols = list(CLUSTER_FEATURES)
     for c in feature_cols:
         if c not in cols:
             print(f"CRITICAL: Missing expected column {c} in team metrics!")
             print(f"Available columns: {cols}")
-            return
-            
-    # Clean data (drop any rows missing these metrics)
-    df_clean = df.dropna(subset=feature_cols).copy()
-    
+            return None
+    return feature_cols
+
+
+def load_cluster_models():
+    """Return the saved (scaler, kmeans) pair, or None if either is missing."""
+    if not (os.path.exists(SCALER_FILE) and os.path.exists(KMEANS_FILE)):
+        return None
+    return joblib.load(SCALER_FILE), joblib.load(KMEANS_FILE)
+
+
+def align_to_previous_labels(scaler, kmeans, previous_models):
+    """
+    Permute a freshly fitted KMeans so each cluster keeps the Type_N id of the
+    closest previous centroid. Without this, every refit reshuffles the labels and
+    the OPP_ARCHETYPE_* dummy columns stop meaning what the trained models expect.
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    prev_scaler, prev_kmeans = previous_models
+    if prev_kmeans.n_clusters != kmeans.n_clusters:
+        return kmeans
+    if list(getattr(prev_scaler, 'feature_names_in_', [])) != list(getattr(scaler, 'feature_names_in_', [])):
+        return kmeans
+
+    # Compare both sets of centroids in the new scaled space
+    prev_centers_raw = prev_scaler.inverse_transform(prev_kmeans.cluster_centers_)
+    prev_centers = scaler.transform(pd.DataFrame(prev_centers_raw, columns=scaler.feature_names_in_))
+    cost = ((prev_centers[:, None, :] - kmeans.cluster_centers_[None, :, :]) ** 2).sum(axis=2)
+    prev_idx, new_idx = linear_sum_assignment(cost)
+
+    # Old label i is served by new cluster new_idx[i]
+    order = new_idx[prev_idx.argsort()]
+    kmeans.cluster_centers_ = kmeans.cluster_centers_[order]
+    kmeans.labels_ = order.argsort()[kmeans.labels_]
+    return kmeans
+
+
+def fit_team_clusters(df_clean, feature_cols):
     print(f"Clustering {len(df_clean)} team-season records against {feature_cols}...")
     X = df_clean[feature_cols]
-    
+
     # Scale the features
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
-    
+
     # KMeans Clustering (5 Archetypes)
     # E.g., Fast/Bad D, Slow/Elite D, Average/High Turnovers, etc.
-    kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
-    df_clean['OPP_ARCHETYPE'] = kmeans.fit_predict(X_scaled)
-    
-    # Map the Archetype IDs into string prefixes to easily dummy-encode later
-    df_clean['OPP_ARCHETYPE'] = df_clean['OPP_ARCHETYPE'].apply(lambda x: f"Type_{x}")
-    
+    kmeans = KMeans(n_clusters=N_ARCHETYPES, random_state=42, n_init=10)
+    kmeans.fit(X_scaled)
+
+    previous_models = load_cluster_models()
+    if previous_models is not None:
+        kmeans = align_to_previous_labels(scaler, kmeans, previous_models)
+        print("Aligned archetype ids with the previously saved clustering.")
+
     # Save the Models for predict.py
     joblib.dump(scaler, SCALER_FILE)
     joblib.dump(kmeans, KMEANS_FILE)
     print(f"Saved scaler to {SCALER_FILE}")
     print(f"Saved kmeans model to {KMEANS_FILE}")
-    
+    return scaler, kmeans
+
+
+def assign_archetypes(df, scaler, kmeans):
+    """Label team-season rows with the saved models (no refit, stable Type_N ids)."""
+    feature_cols = list(scaler.feature_names_in_)
+    df_clean = df.dropna(subset=feature_cols).copy()
+    labels = kmeans.predict(scaler.transform(df_clean[feature_cols]))
+    # Map the Archetype IDs into string prefixes to easily dummy-encode later
+    df_clean['OPP_ARCHETYPE'] = [f"Type_{x}" for x in labels]
+    return df_clean
+
+
+def build_team_clusters(refit=False):
+    """
+    Label every team-season with a defensive archetype.
+
+    By default the saved scaler/KMeans are reused and rows are only run through
+    `predict`, so mid-season refreshes are cheap and archetype ids stay fixed.
+    Pass refit=True (or `--refit` on the CLI) to retrain the clustering; the new
+    clusters are matched to the old ids where possible.
+    """
+    print("Loading Team Defensive Metrics...")
+    if not os.path.exists(INPUT_FILE):
+        print(f"Error: {INPUT_FILE} not found. Run team_ingestion.py first.")
+        return
+
+    df = pd.read_parquet(INPUT_FILE)
+
+    models = None if refit else load_cluster_models()
+    if models is None:
+        feature_cols = resolve_feature_cols(df)
+        if feature_cols is None:
+            return
+        # Clean data (drop any rows missing these metrics)
+        df_clean = df.dropna(subset=feature_cols).copy()
+        models = fit_team_clusters(df_clean, feature_cols)
+    else:
+        print(f"Assigning archetypes with saved models (pass --refit to retrain)...")
+
+    scaler, kmeans = models
+    feature_cols = list(scaler.feature_names_in_)
+    missing = [c for c in feature_cols if c not in df.columns]
+    if missing:
+        print(f"CRITICAL: Team metrics are missing {missing} required by the saved scaler. Rerun with --refit.")
+        return
+    df_clean = assign_archetypes(df, scaler, kmeans)
+
     # Save the resulting dataframe (we only need the keys and the new features)
     output_df = df_clean[['TEAM_ID', 'TEAM_NAME', 'SEASON', 'OPP_ARCHETYPE'] + feature_cols]
     output_df.to_parquet(OUTPUT_FILE, index=False)
-    
-    print(f"\nSuccessfully clustered teams into 5 Defensive Archetypes.")
+
+    print(f"\nLabelled {len(output_df)} team-seasons with {kmeans.n_clusters} Defensive Archetypes.")
     print(f"Saved team archetype map to {OUTPUT_FILE}")
-    
+
     # Quick sanity check on the clusters
     print("\nCluster Center Averages:")
     summary = output_df.groupby('OPP_ARCHETYPE')[feature_cols].mean()
     print(summary)
 
 if __name__ == "__main__":
-    build_team_clusters()
+    import sys
+    build_team_clusters(refit='--refit' in sys.argv[1:])
@@ -1,7 +1,9 @@
 import os
 import time
+import threading
+import numpy as np
 import pandas as pd
-from nba_api.stats.endpoints import leaguedashteamstats
+from nba_api.stats.endpoints import leaguedashteamstats, leaguegamelog
 from ingestion import get_headers
 
 DATA_DIR = "data"
@@ -11,53 +13,235 @@ if not os.path.exists(DATA_DIR):
 # We want the same 4 seasons we used for player logs
 SEASONS = ['2022-23', '2023-24', '2024-25', '2025-26']
 TEAM_CACHE_FILE = os.path.join(DATA_DIR, "team_defensive_metrics.parquet")
+# Team-level box scores per game, used for point-in-time (as-of) opponent metrics
+TEAM_GAMES_FILE = os.path.join(DATA_DIR, "team_games.parquet")
+# Drop-in files standing in for the stats.nba.com endpoints (offline runs, benchmarks):
+# team_game_log_<season>.parquet and team_stats_<measure>_<season>.parquet are read
+# instead of calling the API
+LOCAL_ENDPOINT_DIR = os.path.join(DATA_DIR, "local_endpoints")
 
-def fetch_advanced_team_stats(seasons):
+# LeagueDashTeamStats measure types merged into TEAM_CACHE_FILE. Advanced comes first
+# and keeps its column names (PACE, DEF_RATING, EFG_PCT, ... as team_clustering and
+# opponent_context expect); Four Factors adds the opponent shooting/turnover/FT rates
+# (OPP_EFG_PCT, OPP_TOV_PCT, ...) and Opponent the per-game box score allowed
+TEAM_MEASURES = ['Advanced', 'Four Factors', 'Opponent']
+TEAM_KEY_COLUMNS = ['TEAM_ID', 'SEASON']
+TEAM_TEXT_COLUMNS = ['TEAM_NAME']
+# Raw API frames per (measure, season)
+TEAM_STATS_CACHE_DIR = os.path.join(DATA_DIR, "team_stats_cache")
+# Only the current season's numbers change; its cache entries expire like main.py's ingest stages
+CURRENT_SEASON_CACHE_TTL = 12 * 60 * 60
+# One request start every REQUEST_INTERVAL seconds across all workers (the old per-request sleep)
+REQUEST_INTERVAL = 2.0
+MAX_WORKERS = 4
+RETRY_DELAY = 5
+
+
+def local_team_game_log_path(season):
+    return os.path.join(LOCAL_ENDPOINT_DIR, f"team_game_log_{season}.parquet")
+
+
+class RateLimiter:
+    """Spaces request starts at least `interval` seconds apart across every thread."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def measure_slug(measure):
+    return measure.lower().replace(' ', '_')
+
+
+def local_team_stats_path(measure, season):
+    return os.path.join(LOCAL_ENDPOINT_DIR, f"team_stats_{measure_slug(measure)}_{season}.parquet")
+
+
+def team_stats_cache_path(measure, season):
+    return os.path.join(TEAM_STATS_CACHE_DIR, f"{measure_slug(measure)}_{season}.parquet")
+
+
+def cached_team_stats(measure, season, seasons):
+    """The cached (measure, season) frame, or None. Finished seasons never expire."""
+    path = team_stats_cache_path(measure, season)
+    if not os.path.exists(path):
+        return None
+    if season == max(seasons) and time.time() - os.path.getmtime(path) > CURRENT_SEASON_CACHE_TTL:
+        return None
+    return pd.read_parquet(path)
+
+
+def fetch_measure_from_api(measure, season):
+    log = leaguedashteamstats.LeagueDashTeamStats(
+        season=season,
+        measure_type_detailed_defense=measure,
+        per_mode_detailed='PerGame',
+        headers=get_headers(),
+        timeout=30
+    )
+    return log.get_data_frames()[0]
+
+
+def fetch_team_measure(measure, season, seasons, limiter, fetch=fetch_measure_from_api, max_retries=3):
+    """One (measure, season) frame from the local endpoint, the cache or the API, in that order."""
+    local_path = local_team_stats_path(measure, season)
+    if os.path.exists(local_path):
+        df = pd.read_parquet(local_path)
+        df['SEASON'] = season
+        return df, 'local'
+    cached = cached_team_stats(measure, season, seasons)
+    if cached is not None:
+        return cached, 'cache'
+
+    for attempt in range(max_retries):
+        try:
+            limiter.wait()
+            df = fetch(measure, season)
+            if df is None or df.empty:
+                return None, 'empty'
+            df = df.copy()
+            df['SEASON'] = season
+            os.makedirs(TEAM_STATS_CACHE_DIR, exist_ok=True)
+            df.to_parquet(team_stats_cache_path(measure, season), index=False)
+            return df, 'api'
+        except Exception as e:
+            print(f"  Error on {measure} {season} (Attempt {attempt+1}): {e}")
+            time.sleep(RETRY_DELAY)
+    return None, 'failed'
+
+
+def fetch_team_season_stats(seasons, measures=TEAM_MEASURES, fetch=fetch_measure_from_api,
+                            max_workers=MAX_WORKERS, limiter=None):
+    """
+    Every (measure, season) LeagueDashTeamStats frame, fetched concurrently. The
+    threads share one RateLimiter, so stats.nba.com still sees at most one request
+    start per REQUEST_INTERVAL; what runs in parallel is the waiting on responses.
+    Returns {measure: frame of all seasons}.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    limiter = limiter or RateLimiter(REQUEST_INTERVAL)
+    jobs = [(measure, season) for season in seasons for measure in measures]
+    print(f"Fetching {len(measures)} team measures ({', '.join(measures)}) for {len(seasons)} seasons...")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(lambda job: fetch_team_measure(*job, seasons, limiter, fetch), jobs))
+
+    frames = {}
+    for (measure, season), (df, source) in zip(jobs, results):
+        if df is None:
+            print(f"  {measure} {season}: no data ({source})")
+            continue
+        print(f"  {measure} {season}: {len(df)} teams ({source})")
+        frames.setdefault(measure, []).append(df)
+    return {measure: pd.concat(dfs, ignore_index=True) for measure, dfs in frames.items()}
+
+
+def merge_team_measures(frames, measures=TEAM_MEASURES):
     """
-    Independent script to fetch advanced team metrics (Pace, DefRtg, etc) per season.
-    Does not interfere with the player ingestion pipeline.
+    One wide, typed row per (TEAM_ID, SEASON) from the per-measure frames, joined in
+    a single concat on the key index. The first measure keeps all of its columns;
+    later ones add only the columns not seen yet, without their _RANK columns.
     """
-    print(f"Fetching Advanced Team Metrics for {len(seasons)} seasons...")
+    parts, seen = [], set(TEAM_KEY_COLUMNS)
+    for measure in measures:
+        df = frames.get(measure)
+        if df is None or df.empty:
+            continue
+        cols = [c for c in df.columns if c not in seen and (not parts or not c.endswith('_RANK'))]
+        seen.update(cols)
+        keyed = df.drop_duplicates(TEAM_KEY_COLUMNS, keep='last').set_index(TEAM_KEY_COLUMNS)
+        parts.append(keyed[cols])
+    if not parts:
+        return None
+
+    wide = pd.concat(parts, axis=1, join='outer').reset_index()
+    wide['TEAM_ID'] = wide['TEAM_ID'].astype(np.int64)
+    wide['SEASON'] = wide['SEASON'].astype(str)
+    for col in wide.columns:
+        if col in TEAM_KEY_COLUMNS or col in TEAM_TEXT_COLUMNS:
+            continue
+        values = pd.to_numeric(wide[col], errors='coerce')
+        wide[col] = values if pd.api.types.is_integer_dtype(values) else values.astype(np.float64)
+    return wide.sort_values(['SEASON', 'TEAM_ID']).reset_index(drop=True)
+
+
+def fetch_team_game_logs(seasons):
+    """
+    Team-level LeagueGameLog (one row per team per game) for every season. Served
+    from LOCAL_ENDPOINT_DIR when a drop-in file exists for the season.
+    """
+    print(f"Fetching Team Game Logs for {len(seasons)} seasons...")
     all_seasons_data = []
-    
+
     for season in seasons:
+        local_path = local_team_game_log_path(season)
+        if os.path.exists(local_path):
+            df = pd.read_parquet(local_path)
+            print(f"  {season}: {len(df)} team-games from {local_path}")
+            all_seasons_data.append(df)
+            continue
+
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                print(f"  Pulling advanced stats for {season}...")
+                print(f"  Pulling team game logs for {season}...")
                 time.sleep(2) # Polite sleep
-                
-                log = leaguedashteamstats.LeagueDashTeamStats(
+
+                log = leaguegamelog.LeagueGameLog(
                     season=season,
-                    measure_type_detailed_defense='Advanced',
-                    per_mode_detailed='PerGame',
+                    player_or_team_abbreviation='T',
                     headers=get_headers(),
                     timeout=30
                 )
-                
+
                 df = log.get_data_frames()[0]
-                
                 if not df.empty:
-                    df['SEASON'] = season
-                    if attempt == 0 and season == seasons[0]:
-                        print("Returned columns:", df.columns.tolist())
                     all_seasons_data.append(df)
-                    print(f"  -> Success: {len(df)} teams retrieved.")
+                    print(f"  -> Success: {len(df)} team-games retrieved.")
                 break
-                
+
             except Exception as e:
                 print(f"  Error on {season} (Attempt {attempt+1}): {e}")
                 time.sleep(5)
-                
+
     if not all_seasons_data:
+        print("Failed to pull any team game logs.")
+        return None
+
+    return pd.concat(all_seasons_data, ignore_index=True)
+
+
+def run_team_metrics_ingestion(seasons=SEASONS):
+    start = time.time()
+    df = merge_team_measures(fetch_team_season_stats(seasons))
+    if df is None:
         print("Failed to pull any team metrics.")
         return None
-        
-    master_team_df = pd.concat(all_seasons_data, ignore_index=True)
-    return master_team_df
+    df.to_parquet(TEAM_CACHE_FILE, index=False)
+    print(f"\nSaved {len(df)} team-season records x {df.shape[1]} columns to {TEAM_CACHE_FILE} "
+          f"({time.time() - start:.1f}s)")
+    return df
 
-if __name__ == "__main__":
-    df = fetch_advanced_team_stats(SEASONS)
+
+def run_team_game_log_ingestion(seasons=SEASONS):
+    df = fetch_team_game_logs(seasons)
     if df is not None:
-        df.to_parquet(TEAM_CACHE_FILE, index=False)
-        print(f"\nSaved {len(df)} total team-season records to {TEAM_CACHE_FILE}")
+        df.to_parquet(TEAM_GAMES_FILE, index=False)
+        print(f"Saved {len(df)} team-game records to {TEAM_GAMES_FILE}")
+    return df
+
+
+if __name__ == "__main__":
+    import sys
+    if '--games-only' not in sys.argv[1:]:
+        run_team_metrics_ingestion(SEASONS)
+    run_team_game_log_ingestion(SEASONS)
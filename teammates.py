@@ -0,0 +1,202 @@
+import os
+import numpy as np
+import pandas as pd
+
+from features import TEAMMATE_FEATURES
+
+PROCESSED_DATA_DIR = "processed_data"
+# Each team's expected availability for its next game, written with the master
+TEAM_AVAILABILITY_FILE = os.path.join(PROCESSED_DATA_DIR, "team_availability.parquet")
+
+# A player stays part of a team's expected rotation for this many team games after
+# his last appearance (within the same season); each of those he misses counts as
+# an absence for that game
+ROSTER_LOOKBACK = 10
+# Trailing window (player games) behind each player's minutes/usage/scoring norm
+NORM_WINDOW = 10
+
+REQUIRED_COLUMNS = ['PLAYER_ID', 'TEAM_ID', 'GAME_ID', 'GAME_DATE', 'MIN', 'FGA', 'FTA', 'TOV', 'PTS']
+
+
+def player_norms(apps):
+    """
+    Trailing per-player means of minutes, usage (FGA + 0.44*FTA + TOV) and points.
+    Returns (before, after): norms excluding and including the current game.
+    """
+    stats = pd.DataFrame({
+        'MIN': pd.to_numeric(apps['MIN'], errors='coerce'),
+        'USG': pd.to_numeric(apps['FGA'], errors='coerce') + 0.44 * pd.to_numeric(apps['FTA'], errors='coerce')
+               + pd.to_numeric(apps['TOV'], errors='coerce'),
+        'PTS': pd.to_numeric(apps['PTS'], errors='coerce'),
+    }, index=apps.index)
+    grouped = stats.groupby(apps['PLAYER_ID'].values, sort=False)
+    after = grouped.rolling(NORM_WINDOW, min_periods=1).mean().reset_index(level=0, drop=True).loc[apps.index]
+    before = after.groupby(apps['PLAYER_ID'].values, sort=False).shift(1)
+    return before, after
+
+
+def team_game_index(apps):
+    """Number every team's games 0..n-1 in date order, and note where each team-season ends."""
+    games = apps[['TEAM_ID', 'GAME_ID', 'GAME_DATE', 'SEASON_KEY']].drop_duplicates(['TEAM_ID', 'GAME_ID'])
+    games = games.sort_values(['TEAM_ID', 'GAME_DATE', 'GAME_ID']).reset_index(drop=True)
+    games['TEAM_GAME_NO'] = games.groupby('TEAM_ID').cumcount()
+    games['SEASON_END_NO'] = games.groupby(['TEAM_ID', 'SEASON_KEY'])['TEAM_GAME_NO'].transform('max')
+    return games[['TEAM_ID', 'GAME_ID', 'TEAM_GAME_NO', 'SEASON_END_NO']]
+
+
+def absences(apps, after):
+    """
+    One row per (team game, expected-but-missing player) carrying that player's norms
+    as of his last appearance. Sorting appearances by (team, player, game number)
+    means the games a player missed are just the gaps to his next appearance, so the
+    output is proportional to the number of absences rather than roster x games.
+    """
+    order = np.lexsort((apps['TEAM_GAME_NO'].values, apps['PLAYER_ID'].values, apps['TEAM_ID'].values))
+    team = apps['TEAM_ID'].values[order]
+    player = apps['PLAYER_ID'].values[order]
+    game_no = apps['TEAM_GAME_NO'].values[order]
+
+    same_next = np.zeros(len(order), dtype=bool)
+    same_next[:-1] = (team[1:] == team[:-1]) & (player[1:] == player[:-1])
+    next_no = np.empty(len(order), dtype=np.int64)
+    next_no[:-1] = game_no[1:]
+    # Last appearance for this team: expected until the end of that season's games
+    next_no = np.where(same_next, next_no, apps['SEASON_END_NO'].values[order] + 1)
+    # Never carry a player over into the next season
+    next_no = np.minimum(next_no, apps['SEASON_END_NO'].values[order] + 1)
+
+    gap = np.clip(np.minimum(next_no - game_no - 1, ROSTER_LOOKBACK), 0, None)
+    rep = np.repeat(np.arange(len(order)), gap)
+    offset = np.arange(len(rep)) - np.repeat(np.cumsum(gap) - gap, gap) + 1
+
+    norms = after.values[order][rep]
+    return pd.DataFrame({
+        'TEAM_ID': team[rep],
+        'TEAM_GAME_NO': game_no[rep] + offset,
+        'MIN_NORM': norms[:, 0],
+        'USG_NORM': norms[:, 1],
+        'PTS_NORM': norms[:, 2],
+        'IS_ABSENT': 1.0,
+    })
+
+
+def add_teammate_features(df):
+    """
+    League-wide teammate availability features for every row of `df` (the master
+    dataset or any multi-player frame with box-score columns):
+
+      TEAM_MIN_ABSENT  - trailing minutes of rotation teammates missing this game
+      TEAM_USG_ABSENT  - share of the expected rotation's usage that is missing
+      TOP2_SCORER_OUT  - 1 if one of the team's two highest-scoring expected players sat
+
+    Everything comes from one sort of the appearances and groupbys over
+    (TEAM_ID, team game), so cost is linear in rows instead of quadratic per player.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        print(f"Warning: Skipping teammate features, missing columns {missing}")
+        return df
+
+    apps = df[REQUIRED_COLUMNS].copy()
+    apps['GAME_DATE'] = pd.to_datetime(apps['GAME_DATE'])
+    apps['SEASON_KEY'] = df['SEASON_ID'].values if 'SEASON_ID' in df.columns else 0
+    apps = apps.sort_values(['PLAYER_ID', 'GAME_DATE', 'GAME_ID'], kind='stable')
+    before, after = player_norms(apps)
+
+    apps = apps.reset_index().merge(team_game_index(apps), on=['TEAM_ID', 'GAME_ID'], how='left').set_index('index')
+    present = pd.DataFrame({
+        'TEAM_ID': apps['TEAM_ID'].values,
+        'TEAM_GAME_NO': apps['TEAM_GAME_NO'].values,
+        'MIN_NORM': before['MIN'].values,
+        'USG_NORM': before['USG'].values,
+        'PTS_NORM': before['PTS'].values,
+        'IS_ABSENT': 0.0,
+    })
+    candidates = pd.concat([present, absences(apps, after)], ignore_index=True)
+    candidates[['MIN_NORM', 'USG_NORM', 'PTS_NORM']] = candidates[['MIN_NORM', 'USG_NORM', 'PTS_NORM']].fillna(0)
+    candidates['ABSENT_MIN'] = candidates['MIN_NORM'] * candidates['IS_ABSENT']
+    candidates['ABSENT_USG'] = candidates['USG_NORM'] * candidates['IS_ABSENT']
+
+    # Top-2 expected scorers per team game, whether or not they played
+    candidates = candidates.sort_values(['TEAM_ID', 'TEAM_GAME_NO', 'PTS_NORM'], ascending=[True, True, False])
+    keys = ['TEAM_ID', 'TEAM_GAME_NO']
+    candidates['TOP2'] = candidates.groupby(keys, sort=False).cumcount() < 2
+    candidates['TOP2_ABSENT'] = candidates['IS_ABSENT'] * candidates['TOP2']
+
+    team_games = candidates.groupby(keys).agg(
+        ABSENT_MIN=('ABSENT_MIN', 'sum'),
+        ABSENT_USG=('ABSENT_USG', 'sum'),
+        TOTAL_USG=('USG_NORM', 'sum'),
+        TOP2_ABSENT=('TOP2_ABSENT', 'max'),
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        usg_share = np.where(team_games['TOTAL_USG'] > 0, team_games['ABSENT_USG'] / team_games['TOTAL_USG'], 0.0)
+    team_games = pd.DataFrame({
+        'TEAM_MIN_ABSENT': team_games['ABSENT_MIN'].values,
+        'TEAM_USG_ABSENT': usg_share,
+        'TOP2_SCORER_OUT': team_games['TOP2_ABSENT'].values,
+    }, index=team_games.index)
+
+    row_features = team_games.reindex(pd.MultiIndex.from_arrays([apps['TEAM_ID'].values, apps['TEAM_GAME_NO'].values]))
+    row_features.index = apps.index
+    row_features = row_features.loc[df.index].fillna(0)
+    for col in TEAMMATE_FEATURES:
+        df[col] = row_features[col].values
+    return df
+
+
+def expected_availability(df):
+    """
+    Each team's teammate features for its next game, from the same computation the
+    training rows get: the team's latest game is repeated a day later, so whoever
+    played it is expected to play and every rotation player who sat it is still out.
+    One row per team (TEAM_ID, TEAM_ABBR, AS_OF date of that latest game, TEAMMATE_FEATURES).
+    """
+    columns = REQUIRED_COLUMNS + [c for c in ['SEASON_ID', 'TEAM_ABBREVIATION', 'MATCHUP'] if c in df.columns]
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        print(f"Warning: Skipping expected availability, missing columns {missing}")
+        return None
+
+    apps = df[columns].copy()
+    apps['GAME_DATE'] = pd.to_datetime(apps['GAME_DATE'])
+    latest = apps[apps['GAME_DATE'] == apps.groupby('TEAM_ID')['GAME_DATE'].transform('max')].copy()
+    latest['AS_OF'] = latest['GAME_DATE']
+    latest['GAME_ID'] = 'NEXT_' + latest['TEAM_ID'].astype(str)
+    latest['GAME_DATE'] = latest['GAME_DATE'] + pd.Timedelta(days=1)
+
+    combined = pd.concat([apps, latest.drop(columns=['AS_OF'])], ignore_index=True)
+    upcoming = add_teammate_features(combined).iloc[len(apps):]
+    upcoming = upcoming.assign(AS_OF=latest['AS_OF'].values)
+    if 'TEAM_ABBREVIATION' in upcoming.columns:
+        upcoming['TEAM_ABBR'] = upcoming['TEAM_ABBREVIATION']
+    else:
+        upcoming['TEAM_ABBR'] = upcoming['MATCHUP'].astype(str).str.split(' ').str[0]
+    table = upcoming.groupby('TEAM_ID', as_index=False).first()
+    return table[['TEAM_ID', 'TEAM_ABBR', 'AS_OF'] + TEAMMATE_FEATURES]
+
+
+def save_expected_availability(df, path=TEAM_AVAILABILITY_FILE):
+    table = expected_availability(df)
+    if table is not None:
+        table.to_parquet(path, index=False)
+        print(f"Saved expected teammate availability for {len(table)} teams to {path}")
+    return table
+
+
+def attach_expected_availability(df, table):
+    """
+    TEAMMATE_FEATURES for a single player's frame (the serving paths), which can't
+    see his teammates' games: every row gets his team's expected availability for
+    its next game, matched on the team in the last row's MATCHUP. Without the table
+    (features.py not run yet) they fall back to 0, i.e. full availability.
+    """
+    values = {col: 0.0 for col in TEAMMATE_FEATURES}
+    if table is not None and not df.empty and 'MATCHUP' in df.columns:
+        team = str(df['MATCHUP'].iloc[-1]).split(' ')[0]
+        match = table[table['TEAM_ABBR'] == team]
+        if not match.empty:
+            values = match.iloc[-1][TEAMMATE_FEATURES].astype(float).to_dict()
+    for col in TEAMMATE_FEATURES:
+        df[col] = values[col]
+    return df
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import resource
+import numpy as np
+from model import (
+    PROCESSED_DATA_DIR, MASTER_FILE, XGB_PARAMS, N_OOF_FOLDS,
+    prep_for_modeling, game_folds, get_oof_model_file
+)
+
+# Encoded training matrices, one set of .npy files per target:
+#   X_<target>.npy (rows x features, float32), y_<target>.npy, folds_<target>.npy, meta_<target>.json
+# Workers open them with np.load(mmap_mode='r'), so every process shares the same
+# page-cache copy instead of rereading the parquet and rebuilding the pandas frame.
+MATRIX_DIR = os.path.join(PROCESSED_DATA_DIR, "train_matrix")
+TARGETS = ['PTS', 'AST', 'REB', 'PRA']
+
+
+def matrix_paths(target, matrix_dir=MATRIX_DIR):
+    t = target.lower()
+    return {
+        'X': os.path.join(matrix_dir, f"X_{t}.npy"),
+        'y': os.path.join(matrix_dir, f"y_{t}.npy"),
+        'folds': os.path.join(matrix_dir, f"folds_{t}.npy"),
+        'meta': os.path.join(matrix_dir, f"meta_{t}.json"),
+    }
+
+
+def master_signature():
+    """Stamps of the input a matrix is built from, the master dataset."""
+    stat = os.stat(MASTER_FILE)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size}
+
+
+def is_fresh(target, matrix_dir=MATRIX_DIR):
+    """True when the target's matrix exists and was built from the current master dataset."""
+    paths = matrix_paths(target, matrix_dir)
+    if not all(os.path.exists(p) for p in paths.values()):
+        return False
+    with open(paths['meta']) as f:
+        return json.load(f).get('master') == master_signature()
+
+
+def write_array(path, values, dtype):
+    """Write through a .npy memmap to a temp name, then rename, so readers never see a partial file."""
+    tmp_path = path + ".tmp.npy"
+    out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=values.shape)
+    out[:] = values
+    out.flush()
+    del out
+    os.replace(tmp_path, path)
+
+
+def training_columns(targets):
+    """
+    The master columns prep_for_modeling needs for `targets` (keys, targets, model
+    features, categoricals to dummy-encode and the similarity profile stats). Names,
+    matchups and the other columns no model reads are never loaded.
+    """
+    import pyarrow.parquet as pq
+    from features import DUMMY_COLUMNS, model_feature_columns, rolling_feature_names
+    from player_similarity import PROFILE_STATS
+
+    available = pq.read_schema(MASTER_FILE).names
+    wanted = {'PLAYER_ID', 'GAME_ID', 'GAME_DATE'} | set(PROFILE_STATS) | set(DUMMY_COLUMNS)
+    for target in targets:
+        wanted |= {target} | set(rolling_feature_names(target)) | set(model_feature_columns(target, available))
+    return [c for c in available if c in wanted]
+
+
+def build_training_matrices(targets=TARGETS, matrix_dir=MATRIX_DIR, force=False):
+    """
+    Read the master columns the stale targets need once and write each target's
+    encoded matrix. float32 is what XGBoost converts its input to anyway, so models
+    trained from the matrix are identical to ones trained from the pandas frame.
+    """
+    stale = [t for t in targets if force or not is_fresh(t, matrix_dir)]
+    if not stale:
+        print("Training matrices are up to date.")
+        return
+    if not os.path.exists(MASTER_FILE):
+        print(f"File {MASTER_FILE} not found. Run features.py first.")
+        return
+    import pandas as pd
+    df = pd.read_parquet(MASTER_FILE, columns=training_columns(stale))
+    os.makedirs(matrix_dir, exist_ok=True)
+
+    for target in stale:
+        start = time.time()
+        X, y, _ = prep_for_modeling(df, target_col=target)
+        paths = matrix_paths(target, matrix_dir)
+        write_array(paths['X'], X.to_numpy(dtype=np.float32), np.float32)
+        write_array(paths['y'], y.to_numpy(dtype=np.float32), np.float32)
+        write_array(paths['folds'], game_folds(df.loc[X.index, 'GAME_ID']).astype(np.int8), np.int8)
+        with open(paths['meta'], 'w') as f:
+            json.dump({
+                'features': list(X.columns),
+                'rows': int(len(X)),
+                'n_folds': N_OOF_FOLDS,
+                'max_game_date': str(df.loc[X.index, 'GAME_DATE'].max().date()),
+                'master': master_signature(),
+            }, f, indent=2)
+        print(f"Wrote {target} matrix {X.shape} to {paths['X']} in {time.time() - start:.1f}s")
+
+
+def load_training_matrix(target, matrix_dir=MATRIX_DIR):
+    """Read-only, zero-copy views of a target's matrix: {'X', 'y', 'folds', 'meta'}."""
+    paths = matrix_paths(target, matrix_dir)
+    with open(paths['meta']) as f:
+        meta = json.load(f)
+    return {
+        'X': np.load(paths['X'], mmap_mode='r'),
+        'y': np.load(paths['y'], mmap_mode='r'),
+        'folds': np.load(paths['folds'], mmap_mode='r'),
+        'meta': meta,
+    }
+
+
+def memory_usage_mb():
+    """
+    (peak RSS, current PSS) of this process in MB. PSS splits shared mapped pages
+    across the processes mapping them. Peak comes from VmHWM because ru_maxrss
+    survives exec, so a spawned worker would report its parent's peak.
+    """
+    peak, pss = None, None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    pss = int(line.split()[1]) / 1024
+                    break
+    except OSError:
+        pass
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return peak, pss
+
+
+# Rows gathered from the mapped matrix per batch while a fold's training DMatrix is built
+FOLD_BATCH_ROWS = 65536
+
+
+def fit_on_rows(model, X, y, rows, batch_rows=FOLD_BATCH_ROWS):
+    """
+    model.fit(X[rows], y[rows]) without materializing X[rows]: the fold's rows are
+    streamed from the mapped matrix in `batch_rows` batches into a QuantileDMatrix,
+    so only the training rows shape the histogram cuts (as with the pandas fit in
+    model.train_oof_models, which this reproduces exactly) and a worker never holds
+    more than one batch of raw features.
+    """
+    import xgboost as xgb
+
+    class MappedRows(xgb.DataIter):
+        def __init__(self):
+            self.start = 0
+            super().__init__()
+
+        def next(self, input_data):
+            if self.start >= len(rows):
+                return False
+            batch = rows[self.start:self.start + batch_rows]
+            input_data(data=X[batch], label=y[batch])
+            self.start += batch_rows
+            return True
+
+        def reset(self):
+            self.start = 0
+
+    dtrain = xgb.QuantileDMatrix(MappedRows(), max_bin=model.get_xgb_params().get('max_bin') or 256)
+    booster = xgb.train(model.get_xgb_params(), dtrain, num_boost_round=model.n_estimators)
+    model.load_model(bytearray(booster.save_raw()))
+    return model
+
+
+def train_job(job):
+    """
+    Worker entry point: fit one model from the mapped matrix. job = {'target', 'fold'
+    (None = all rows), 'matrix_dir', 'n_jobs'}. Returns the model plus held-out MAE
+    and this worker's memory use.
+
+    A fold never indexes the whole matrix (X[train_rows] would copy most of it into
+    the worker): fit_on_rows streams the training rows in batches, and the held-out
+    MAE is read off one in-place predict over the mapped rows.
+    """
+    from xgboost import XGBRegressor
+
+    mat = load_training_matrix(job['target'], job.get('matrix_dir', MATRIX_DIR))
+    X, y, folds = mat['X'], mat['y'], mat['folds']
+    params = dict(XGB_PARAMS, n_jobs=job.get('n_jobs', XGB_PARAMS['n_jobs']))
+    model = XGBRegressor(**params)
+
+    mae = None
+    if job.get('fold') is None:
+        model.fit(X, y)
+    else:
+        held_out = np.asarray(folds) == job['fold']
+        fit_on_rows(model, X, y, np.flatnonzero(~held_out))
+        mae = float(np.abs(model.predict(X)[held_out] - y[held_out]).mean())
+
+    peak, pss = memory_usage_mb()
+    return {'target': job['target'], 'fold': job.get('fold'), 'model': model,
+            'mae': mae, 'peak_rss_mb': peak, 'pss_mb': pss}
+
+
+def run_parallel(jobs, n_workers=4):
+    """Run train_job over `jobs` in `n_workers` fresh processes sharing the mapped matrices."""
+    import multiprocessing as mp
+
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+    jobs = [dict(job, n_jobs=job.get('n_jobs', threads)) for job in jobs]
+    with mp.get_context('spawn').Pool(n_workers) as pool:
+        return pool.map(train_job, jobs)
+
+
+def train_oof_parallel(targets=TARGETS, n_workers=4, matrix_dir=MATRIX_DIR):
+    """model.train_oof_models for several targets at once: every (target, fold) is one worker job."""
+    import joblib
+
+    build_training_matrices(targets, matrix_dir)
+    jobs = [{'target': t, 'fold': k, 'matrix_dir': matrix_dir}
+            for t in targets for k in range(load_training_matrix(t, matrix_dir)['meta']['n_folds'])]
+    results = run_parallel(jobs, n_workers)
+
+    for target in targets:
+        meta = load_training_matrix(target, matrix_dir)['meta']
+        fold_results = sorted((r for r in results if r['target'] == target), key=lambda r: r['fold'])
+        for r in fold_results:
+            print(f"  {target} fold {r['fold']}: held-out MAE {r['mae']:.2f} "
+                  f"(worker peak RSS {r['peak_rss_mb']:.0f} MB, PSS {r['pss_mb'] or 0:.0f} MB)")
+        oof_file = get_oof_model_file(target)
+        os.makedirs(os.path.dirname(oof_file), exist_ok=True)
+        joblib.dump({
+            'models': [r['model'] for r in fold_results],
+            'features': meta['features'],
+            'n_folds': meta['n_folds'],
+            'max_game_date': meta['max_game_date'],
+        }, oof_file)
+        print(f"Saved {target} out-of-fold models to {oof_file}")
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    workers = [int(a.split('=')[1]) for a in args if a.startswith('--workers=')]
+    if '--oof' in args:
+        train_oof_parallel(n_workers=workers[0] if workers else 4)
+    else:
+        build_training_matrices(force='--force' in args)
@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# Saved boosters flattened into plain NumPy arrays (xgb_<target>_trees.npz next to
+# the .joblib model). Serving code loads these with np.load and never imports
+# xgboost; they are rewritten whenever model.py saves a model, and ignored if the
+# .joblib they came from has changed since (checked by content digest).
+PROCESSED_DATA_DIR = "processed_data"
+# Rows per evaluation block: the (rows x trees) node-index matrix stays in cache
+EVAL_BLOCK_ROWS = 4096
+
+
+def get_trees_file(model_file):
+    return model_file.replace('_model.joblib', '_trees.npz')
+
+
+def model_signature(model_file):
+    with open(model_file, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def parse_base_score(value):
+    # Stored as '0.5' by older versions and '[1.1761214E1]' (one entry per target) by newer ones
+    return float(str(value).strip('[]').split(',')[0])
+
+
+def flatten_booster(booster):
+    """
+    All trees of a gbtree regressor as contiguous arrays with global node ids.
+    Leaves point both children at themselves, so walking every tree for max_depth
+    levels always ends on a leaf whatever the tree's own depth.
+    """
+    model = json.loads(booster.save_raw(raw_format='json'))
+    learner = model['learner']
+    objective = learner['objective']['name']
+    if objective not in ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror'):
+        raise ValueError(f"Only identity-link regression objectives can be exported, not {objective}")
+    trees = learner['gradient_booster']['model']['trees']
+
+    roots, feature, threshold, left, right, default_left, value = [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for tree in trees:
+        lc = np.asarray(tree['left_children'], dtype=np.int64)
+        rc = np.asarray(tree['right_children'], dtype=np.int64)
+        is_leaf = lc == -1
+        node = np.arange(len(lc))
+        roots.append(offset)
+        feature.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.int32))
+        # Leaf values live in split_conditions for leaf nodes
+        threshold.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+        left.append(np.where(is_leaf, node, lc) + offset)
+        right.append(np.where(is_leaf, node, rc) + offset)
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        value.append(np.where(is_leaf, np.asarray(tree['split_conditions'], dtype=np.float32), 0).astype(np.float32))
+
+        depth, frontier = 0, [0]
+        while True:
+            frontier = [c for i in frontier if not is_leaf[i] for c in (lc[i], rc[i])]
+            if not frontier:
+                break
+            depth += 1
+        max_depth = max(max_depth, depth)
+        offset += len(lc)
+
+    return {
+        'roots': np.asarray(roots, dtype=np.int64),
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'default_left': np.concatenate(default_left),
+        'value': np.concatenate(value),
+        'max_depth': np.int64(max_depth),
+        'base_score': np.float32(parse_base_score(learner['learner_model_param']['base_score'])),
+    }
+
+
+class CompiledTrees:
+    """Drop-in for XGBRegressor.predict over a flattened booster."""
+
+    def __init__(self, arrays):
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        # children[2 * node + went_left], so one gather picks the next node
+        self.children = np.stack([arrays['right'], arrays['left']], axis=1).ravel()
+        self.default_left = arrays['default_left']
+        self.value = arrays['value']
+        self.max_depth = int(arrays['max_depth'])
+        self.base_score = float(arrays['base_score'])
+
+    def predict(self, X):
+        # xgboost compares float32 inputs against float32 thresholds: x < t goes left
+        X = np.ascontiguousarray(X.to_numpy(dtype=np.float32) if hasattr(X, 'to_numpy') else X, dtype=np.float32)
+        out = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), EVAL_BLOCK_ROWS):
+            out[start:start + EVAL_BLOCK_ROWS] = self.predict_block(X[start:start + EVAL_BLOCK_ROWS])
+        return out
+
+    def predict_block(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        node = np.broadcast_to(self.roots.astype(np.int32), (n_rows, len(self.roots))).copy()
+        # Level by level: every (row, tree) pair advances one node per step
+        for _ in range(self.max_depth):
+            x = flat[row_offset + self.feature[node]]
+            go_left = x < self.threshold[node]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left[node], go_left)
+            node = self.children[2 * node + go_left]
+        return self.value[node].sum(axis=1, dtype=np.float64) + self.base_score
+
+
+def export_model(model_file):
+    """Flatten the booster saved at `model_file` into its .npz sibling."""
+    import joblib
+    saved = joblib.load(model_file)
+    arrays = flatten_booster(saved['model'].get_booster())
+    trees_file = get_trees_file(model_file)
+    tmp_path = trees_file + ".tmp.npz"
+    # The drift monitor's training profile rides along as JSON so it loads without joblib
+    profile = json.dumps(saved.get('training_profile'))
+    np.savez(tmp_path, features=np.asarray(saved['features']), source=np.asarray(model_signature(model_file)),
+             training_profile=np.asarray(profile), **arrays)
+    os.replace(tmp_path, trees_file)
+    print(f"Exported {len(arrays['roots'])} trees (depth <= {arrays['max_depth']}) to {trees_file}")
+    return trees_file
+
+
+def load_serving_model(model_file):
+    """
+    {'model', 'features'} like the saved .joblib dict, but backed by the exported
+    arrays when they are present and current, so xgboost is never imported.
+    """
+    trees_file = get_trees_file(model_file)
+    if os.path.exists(trees_file):
+        with np.load(trees_file) as data:
+            if str(data['source']) == model_signature(model_file):
+                arrays = {k: data[k] for k in data.files}
+                profile = json.loads(str(arrays['training_profile'])) if 'training_profile' in arrays else None
+                return {'model': CompiledTrees(arrays), 'features': [str(f) for f in arrays['features']],
+                        'training_profile': profile}
+        print(f"{trees_file} is older than {model_file}; loading the booster (run tree_export.py to refresh).")
+    import joblib
+    return joblib.load(model_file)
+
+
+if __name__ == "__main__":
+    for target in ['pts', 'ast', 'reb', 'pra']:
+        model_file = os.path.join(PROCESSED_DATA_DIR, f"xgb_{target}_model.joblib")
+        if os.path.exists(model_file):
+            export_model(model_file)
+        else:
+            print(f"Model missing at {model_file}; skipping it.")
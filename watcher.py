@@ -0,0 +1,214 @@
+import os
+import glob
+import time
+import shutil
+import pandas as pd
+
+from ingestion import SEASONS, get_headers, append_player_logs, player_log_path
+from team_ingestion import LOCAL_ENDPOINT_DIR
+from predict import find_player_log_file
+from drift_monitor import DriftMonitor
+from prepare_projections import (
+    DATA_DIR, SCHEDULE_FILE, PROJECTIONS_FILE, MODEL_FILES,
+    get_active_rotational_players, load_projection_models, project_player
+)
+
+# Stand-in for the live box-score feed: drop LeagueGameLog-shaped player rows
+# (parquet or csv) here and the watcher applies them; handled files move to done/
+BOX_SCORE_DROP_DIR = os.path.join(LOCAL_ENDPOINT_DIR, "box_scores")
+# stats.nba.com is rate-limited; the local drop is just a directory listing
+API_POLL_SECONDS = 60
+LOCAL_POLL_SECONDS = 2
+
+
+def normalize_game_id(game_id):
+    # The schedule CSV round-trips GAME_ID as an int, the logs keep the leading zeros
+    return str(game_id).split('.')[0].zfill(10)
+
+
+def poll_nba_api(since_date):
+    """Player rows for every final game on or after `since_date` (LeagueGameLog only lists finished games)."""
+    from nba_api.stats.endpoints import leaguegamelog
+    try:
+        log = leaguegamelog.LeagueGameLog(
+            season=SEASONS[-1],
+            player_or_team_abbreviation='P',
+            date_from_nullable=since_date.strftime('%m/%d/%Y'),
+            headers=get_headers(),
+            timeout=30
+        )
+        return log.get_data_frames()[0]
+    except Exception as e:
+        print(f"Warning: box score poll failed ({e}); retrying next poll.")
+        return None
+
+
+def poll_local_drop():
+    """(rows, files read) from every file waiting in the drop directory; unreadable files stay for the next poll."""
+    files = sorted(glob.glob(os.path.join(BOX_SCORE_DROP_DIR, "*.parquet")) +
+                   glob.glob(os.path.join(BOX_SCORE_DROP_DIR, "*.csv")))
+    frames, read = [], []
+    for path in files:
+        try:
+            if path.endswith('.csv'):
+                frames.append(pd.read_csv(path, dtype={'GAME_ID': str, 'SEASON_ID': str}))
+            else:
+                frames.append(pd.read_parquet(path))
+            read.append(path)
+        except Exception as e:
+            # Most likely still being written; pick it up next poll
+            print(f"Warning: could not read {path} yet ({e}).")
+    return (pd.concat(frames, ignore_index=True) if frames else None), read
+
+
+class ProjectionWatcher:
+    """
+    Keeps the models, each player's team and the current projections in memory,
+    and applies newly final games incrementally: append the box-score rows to the
+    players who played, then re-project only the players on the two teams involved
+    (their own history or their next opponent changed). Everyone else's projection
+    row is left exactly as it was.
+    """
+
+    def __init__(self):
+        self.models, self.model_features, self.needed_features = load_projection_models()
+        self.active_players = get_active_rotational_players()
+        self.schedule = pd.read_csv(SCHEDULE_FILE)
+        self.schedule['GAME_DATE'] = pd.to_datetime(self.schedule['GAME_DATE'])
+        self.schedule['GAME_KEY'] = self.schedule['GAME_ID'].map(normalize_game_id)
+        self.projections = pd.read_csv(PROJECTIONS_FILE) if os.path.exists(PROJECTIONS_FILE) else pd.DataFrame()
+        self.monitor = DriftMonitor()
+
+        # Every game already in the player logs is final and accounted for
+        self.final_games = set()
+        self.player_team = {}
+        for path in glob.glob(os.path.join(DATA_DIR, "*_logs.parquet")):
+            logs = pd.read_parquet(path, columns=['GAME_ID', 'MATCHUP'])
+            if logs.empty:
+                continue
+            self.final_games.update(logs['GAME_ID'].map(normalize_game_id))
+            self.player_team[int(os.path.basename(path).split('_')[-2])] = logs['MATCHUP'].iloc[-1].split(' ')[0]
+        print(f"Watcher ready: {len(self.player_team)} players, {len(self.final_games)} final games on file, "
+              f"{len(self.projections)} current projections.")
+
+    def latest_game_date(self):
+        played = self.schedule[self.schedule['GAME_KEY'].isin(self.final_games)]
+        return played['GAME_DATE'].max() if not played.empty else pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+
+    def apply_box_scores(self, rows):
+        """Append newly final games to the player logs; returns the player ids whose projections are stale."""
+        rows = rows.copy()
+        rows['GAME_ID'] = rows['GAME_ID'].map(normalize_game_id)
+        rows = rows[~rows['GAME_ID'].isin(self.final_games)]
+        if rows.empty:
+            return set()
+
+        games = sorted(rows['GAME_ID'].unique())
+        teams = set(rows['MATCHUP'].str.split(' ').str[0])
+        print(f"{len(games)} game(s) went final ({', '.join(sorted(teams))}): appending {len(rows)} player rows.")
+        for player_id, player_rows in rows.groupby('PLAYER_ID'):
+            player_id = int(player_id)
+            path = find_player_log_file(player_id, DATA_DIR) or player_log_path(player_id, player_rows['PLAYER_NAME'].iloc[0])
+            append_player_logs(path, player_rows.sort_values('GAME_DATE'))
+            self.player_team[player_id] = player_rows.sort_values('GAME_DATE')['MATCHUP'].iloc[-1].split(' ')[0]
+        self.final_games.update(games)
+        resolved = self.monitor.resolve(rows)
+        if resolved:
+            print(f"Scored {resolved} pending projections against the final box scores.")
+
+        # Played in the game (history changed) or on a team whose next game just moved on
+        return {pid for pid, team in self.player_team.items() if team in teams} | set(rows['PLAYER_ID'].astype(int))
+
+    def reproject(self, player_ids):
+        upcoming_window = self.schedule[~self.schedule['GAME_KEY'].isin(self.final_games)]
+        names, new_rows = set(), []
+        for player_id in sorted(player_ids):
+            p_name = self.active_players.get(player_id)
+            path = find_player_log_file(player_id, DATA_DIR)
+            if p_name is None or path is None:
+                continue
+            names.add(p_name)
+            raw_df = pd.read_parquet(path)
+            if raw_df.empty:
+                continue
+            projection = project_player(p_name, raw_df, upcoming_window, self.models,
+                                        self.model_features, self.needed_features, monitor=self.monitor)
+            if projection is not None:
+                new_rows.append(projection)
+
+        updated = pd.DataFrame(new_rows)
+        if not updated.empty:
+            from prop_probabilities import add_prop_probabilities
+            from conformal import add_prediction_intervals
+            updated = add_prediction_intervals(add_prop_probabilities(updated))
+        kept = self.projections[~self.projections['PLAYER_NAME'].isin(names)] if not self.projections.empty else self.projections
+        self.projections = pd.concat([kept, updated], ignore_index=True)
+        if 'PREDICTED_PTS' in self.projections.columns:
+            self.projections = self.projections.sort_values('PREDICTED_PTS', ascending=False)
+        return len(new_rows)
+
+    def write_projections(self):
+        tmp_path = PROJECTIONS_FILE + ".tmp"
+        self.projections.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, PROJECTIONS_FILE)
+        self.monitor.save()
+        from publish import publish_artifacts
+        publish_artifacts()
+
+    def handle(self, rows, detected_at):
+        stale = self.apply_box_scores(rows)
+        if not stale:
+            return False
+        n = self.reproject(stale)
+        self.write_projections()
+        print(f"Re-projected {n} of {len(stale)} affected players; projections updated "
+              f"{time.time() - detected_at:.1f}s after the box scores arrived.")
+        return True
+
+
+def watch(source='auto', once=False):
+    """
+    Poll for final games and re-project incrementally until interrupted.
+    source: 'local' (BOX_SCORE_DROP_DIR), 'nba_api', or 'auto' (local when the drop directory exists).
+    """
+    for mfile in MODEL_FILES.values():
+        if not os.path.exists(mfile):
+            print(f"Model missing at {mfile}! Run model.py first.")
+            return
+    if not os.path.exists(SCHEDULE_FILE):
+        print(f"File {SCHEDULE_FILE} missing! Run fetch_schedule.py first.")
+        return
+    if source == 'auto':
+        source = 'local' if os.path.isdir(BOX_SCORE_DROP_DIR) else 'nba_api'
+
+    watcher = ProjectionWatcher()
+    interval = LOCAL_POLL_SECONDS if source == 'local' else API_POLL_SECONDS
+    print(f"Watching {'box score drops in ' + BOX_SCORE_DROP_DIR if source == 'local' else 'stats.nba.com'} "
+          f"every {interval}s (Ctrl+C to stop)...")
+    try:
+        while True:
+            if source == 'local':
+                rows, files = poll_local_drop()
+                if rows is not None:
+                    watcher.handle(rows, detected_at=min(os.path.getmtime(f) for f in files))
+                    done_dir = os.path.join(BOX_SCORE_DROP_DIR, "done")
+                    os.makedirs(done_dir, exist_ok=True)
+                    for path in files:
+                        shutil.move(path, os.path.join(done_dir, os.path.basename(path)))
+            else:
+                detected_at = time.time()
+                rows = poll_nba_api(watcher.latest_game_date())
+                if rows is not None and not rows.empty:
+                    watcher.handle(rows, detected_at)
+            if once:
+                return
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    source_arg = [a.split('=')[1] for a in args if a.startswith('--source=')]
+    watch(source=source_arg[0] if source_arg else 'auto', once='--once' in args)